@@ -0,0 +1,138 @@
+import argparse
+import atexit
+import functools
+import logging
+import os
+import shutil
+import tempfile
+import time
+from typing import Any, Callable, Dict, Optional
+
+from CrawlerCore.BenchmarkSite import add_site_arguments, report, site_from_args
+from CrawlerCore.FetchCore import FetchCore, read_proxy_file
+from CrawlerCore.Metrics import setup_logging
+from ParserBroBank import benchmark_crawl as brobank
+from ParserOtzovik import benchmark_crawl as otzovik
+from .scheduler import CrawlScheduler
+
+
+def brobank_base_url(base_url: str) -> str:
+    """brobank открывается через localhost, а otzovik через 127.0.0.1:
+    сервер один, но для RateController это разные хосты, как и в сети"""
+    return base_url.replace("127.0.0.1", "localhost")
+
+
+def render(layouts: dict, base_url: str, path: str) -> Optional[str]:
+    """Страницы обоих сайтов с одного сервера: brobank лежит под /banki/"""
+    if path.lstrip("/").startswith("banki/"):
+        return brobank.render(layouts["brobank"], brobank_base_url(base_url), path)
+    return otzovik.render(layouts["otzovik"], base_url, path)
+
+
+def make_jobs(
+    site, directory: str, args, fetch_core: Optional[FetchCore]
+) -> Dict[str, Callable[[], Any]]:
+    """Создает парсеры обоих сайтов; без fetch_core у каждого свои прокси,
+    соединения и лимиты, как у отдельно запущенных скриптов"""
+    otzovik.Parser.SITE_URL = site.base_url
+    cwd = os.getcwd()
+    os.chdir(directory)  # set_proxy читает proxies.txt из текущей папки
+    try:
+        otzovik_parser = otzovik.Parser(
+            [f"{site.base_url}?official_products={otzovik.COMPANY}"],
+            [],
+            output_file=os.path.join(directory, "otzovik.jsonl"),
+            concurrency=args.concurrency,
+            per_host_limit=args.per_host_limit,
+            cache_dir=None,
+            state_file=os.path.join(directory, "otzovik_crawl_state.json"),
+            frontier_file=None,
+            fetch_core=fetch_core,
+        )
+        brobank_parser = brobank.Parser(
+            [
+                brobank.bank_url(brobank_base_url(site.base_url), f"bank{number}")
+                for number in range(args.banks)
+            ],
+            os.path.join(directory, "brobank.jsonl"),
+            concurrency=args.concurrency,
+            per_host_limit=args.per_host_limit,
+            state_file=os.path.join(directory, "brobank_crawl_state.json"),
+            frontier_file=None,
+            fetch_core=fetch_core,
+        )
+    finally:
+        os.chdir(cwd)
+    return {"otzovik": otzovik_parser.run_async, "brobank": brobank_parser.get_reviews}
+
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(
+        description="Замер обхода otzovik и brobank: по очереди, двумя "
+        "независимыми обходами или планировщиком с общим FetchCore"
+    )
+    argparser.add_argument(
+        "--mode", choices=("sequential", "separate", "scheduled"), default="scheduled"
+    )
+    argparser.add_argument("--services", type=int, default=6)
+    argparser.add_argument("--banks", type=int, default=6)
+    argparser.add_argument("--pages", type=int, default=5)
+    argparser.add_argument("--per-page", type=int, default=20)
+    argparser.add_argument("--filler-kib", type=int, default=60)
+    argparser.add_argument("--concurrency", type=int, default=16)
+    argparser.add_argument("--per-host-limit", type=int, default=8)
+    argparser.add_argument("--verbose", action="store_true")
+    add_site_arguments(argparser)
+    args = argparser.parse_args()
+    setup_logging(logging.INFO if args.verbose else logging.ERROR)
+
+    layouts = {
+        "otzovik": {
+            "services": args.services,
+            "company_pages": 1,
+            "pages": args.pages,
+            "per_page": args.per_page,
+            "filler_kib": args.filler_kib,
+        },
+        "brobank": {
+            "pages": args.pages,
+            "per_page": args.per_page,
+            "filler_kib": args.filler_kib,
+        },
+    }
+    # Папка удаляется при выходе после того, как хранилища допишут метаданные
+    directory = tempfile.mkdtemp(prefix="scheduler-bench-")
+    atexit.register(shutil.rmtree, directory, True)
+    with site_from_args(functools.partial(render, layouts), args) as site:
+        proxies_file = os.path.join(directory, "proxies.txt")
+        site.write_proxies(proxies_file)
+        fetch_core = None
+        if args.mode == "scheduled":
+            fetch_core = FetchCore(
+                read_proxy_file(proxies_file),
+                # Общий лимит равен сумме лимитов двух отдельных обходов
+                concurrency=2 * args.concurrency,
+                per_host_limit=args.per_host_limit,
+            )
+        jobs = make_jobs(site, directory, args, fetch_core)
+        start = time.perf_counter()
+        if args.mode == "sequential":
+            for run in jobs.values():
+                run()
+        else:
+            scheduler = CrawlScheduler()
+            for name, run in jobs.items():
+                scheduler.add_job(name, run)
+            for name, error in scheduler.run().items():
+                if error is not None:
+                    raise error
+        seconds = time.perf_counter() - start
+        report(
+            f"scheduler/{args.mode}",
+            otzovik.count_reviews(os.path.join(directory, "otzovik.jsonl"))
+            + brobank.count_reviews(os.path.join(directory, "brobank.jsonl")),
+            seconds,
+            site.stats(),
+            vars(args),
+            args.output,
+        )
@@ -0,0 +1,85 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from CrawlerCore.FetchCore import FetchCore
+from CrawlerCore.Metrics import setup_logging
+from ParserBroBank import parser as brobank
+from ParserOtzovik import parser as otzovik
+
+logger = logging.getLogger("CrawlScheduler")
+
+
+class CrawlScheduler:
+    """Запускает обходы нескольких сайтов одновременно в одном процессе.
+
+    Каждая задача работает в своем потоке. Парсеры, созданные с одним
+    FetchCore, делят пул прокси, лимиты на хост и общий лимит
+    одновременных запросов, который распределяется между задачами
+    поровну. Пока одна задача разбирает медленные страницы, свободные
+    слоты занимают другие.
+    """
+
+    def __init__(self):
+        self._jobs: Dict[str, Callable[[], Any]] = {}
+
+    def add_job(self, name: str, run: Callable[[], Any]):
+        self._jobs[name] = run
+
+    def run(self) -> Dict[str, Optional[BaseException]]:
+        """Запускает все задачи и ждет их завершения. Ошибка одной задачи
+        не останавливает остальные; возвращает ошибки по задачам"""
+        with ThreadPoolExecutor(max_workers=max(1, len(self._jobs))) as executor:
+            futures = {
+                name: executor.submit(self._run_job, name, run)
+                for name, run in self._jobs.items()
+            }
+        return {name: future.exception() for name, future in futures.items()}
+
+    @staticmethod
+    def _run_job(name: str, run: Callable[[], Any]):
+        logger.info("Started job: %s", name)
+        start = time.perf_counter()
+        try:
+            run()
+        except BaseException:
+            logger.exception("Job failed: %s", name)
+            raise
+        logger.info("Finished job: %s in %.1f s", name, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    # python -m CrawlScheduler.scheduler из корня репозитория
+    setup_logging()
+    fetch_core = FetchCore(concurrency=32, per_host_limit=8)
+    otzovik_parser = otzovik.Parser(
+        otzovik.companies_pages,
+        otzovik.categories_pages,
+        output_file="otzovik_reviews.json",
+        state_file="otzovik_crawl_state.json",
+        frontier_file="otzovik_frontier.sqlite",
+        metrics_file="otzovik_metrics.prom",
+        fetch_core=fetch_core,
+    )
+    brobank_parser = brobank.Parser(
+        {
+            "Газпромбанк": "https://brobank.ru/banki/gazprombank/comments/",
+            "Сбербанк": "https://brobank.ru/banki/sberbank/comments/",
+            "ВТБ": "https://brobank.ru/banki/vtb/comments/",
+        },
+        "brobank_reviews.json",
+        state_file="brobank_crawl_state.json",
+        frontier_file="brobank_frontier.sqlite",
+        metrics_file="brobank_metrics.prom",
+        fetch_core=fetch_core,
+    )
+
+    scheduler = CrawlScheduler()
+    scheduler.add_job("otzovik", otzovik_parser.run_async)
+    scheduler.add_job("brobank", brobank_parser.get_reviews)
+    errors = scheduler.run()
+    fetch_core.close()
+    for name, error in errors.items():
+        if error is not None:
+            logger.error("Job %s failed: %r", name, error)
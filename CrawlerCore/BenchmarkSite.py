@@ -0,0 +1,291 @@
+import argparse
+import http.client
+import json
+import multiprocessing
+import random
+import resource
+import sys
+import threading
+import time
+import urllib.request
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import urlsplit
+
+STATS_PATH = "/__stats__"
+
+Render = Callable[[str, str], Optional[str]]
+
+
+class BenchmarkSite:
+    """Локальная замена сайта и прокси для замеров без выхода в сеть.
+
+    В отдельном процессе (чтобы не влиять на память и процессор парсера)
+    запускаются HTTP-сервер сайта и несколько HTTP-прокси. Сайт отдает
+    страницы, которые строит render(base_url, path), либо 404. Прокси
+    принимают запросы с абсолютным URL, ждут latency секунд (±50%), с
+    вероятностью failure_rate отвечают 502 или рвут соединение, с
+    вероятностью throttle_rate отвечают 429 с Retry-After, а остальные
+    запросы передают сайту. Счетчики запросов отдаются по STATS_PATH.
+
+    render должен быть функцией уровня модуля: процесс запускается
+    через spawn.
+    """
+
+    def __init__(
+        self,
+        render: Render,
+        proxies: int = 8,
+        latency: float = 0.02,
+        failure_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        site_latency: float = 0.0,
+        seed: int = 0,
+    ):
+        self._settings = {
+            "proxies": proxies,
+            "latency": latency,
+            "failure_rate": failure_rate,
+            "throttle_rate": throttle_rate,
+            "site_latency": site_latency,
+            "seed": seed,
+        }
+        self._render = render
+        self._process = None
+        self.base_url = None
+        self.proxies = []
+
+    def start(self) -> "BenchmarkSite":
+        context = multiprocessing.get_context("spawn")
+        receiver, sender = context.Pipe(duplex=False)
+        self._process = context.Process(
+            target=_serve, args=(self._render, self._settings, sender), daemon=True
+        )
+        self._process.start()
+        site_port, proxy_ports = receiver.recv()
+        self.base_url = f"http://127.0.0.1:{site_port}/"
+        self.proxies = [f"127.0.0.1:{port}" for port in proxy_ports]
+        return self
+
+    def write_proxies(self, filename: str):
+        """Записывает прокси в формате proxies.txt"""
+        with open(filename, "w", encoding="utf-8") as file:
+            file.writelines(proxy + "\n" for proxy in self.proxies)
+
+    def stats(self) -> Dict[str, int]:
+        """Счетчики запросов к сайту и к прокси"""
+        with urllib.request.urlopen(self.base_url + STATS_PATH.lstrip("/")) as r:
+            return json.loads(r.read())
+
+    def stop(self):
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join()
+            self._process = None
+
+    def __enter__(self) -> "BenchmarkSite":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def _serve(render: Render, settings: Dict[str, Any], connection):
+    """Точка входа процесса с сайтом и прокси"""
+    counters = Counter()
+    lock = threading.Lock()
+
+    def count(name: str):
+        with lock:
+            counters[name] += 1
+
+    site = ThreadingHTTPServer(("127.0.0.1", 0), SiteHandler)
+    site.daemon_threads = True
+    site.render = render
+    site.base_url = f"http://127.0.0.1:{site.server_address[1]}/"
+    site.latency = settings["site_latency"]
+    site.count = count
+    site.counters = counters
+    site.lock = lock
+    servers = [site]
+    for number in range(settings["proxies"]):
+        proxy = ThreadingHTTPServer(("127.0.0.1", 0), ProxyHandler)
+        proxy.daemon_threads = True
+        proxy.random = random.Random(settings["seed"] + number)
+        proxy.random_lock = threading.Lock()
+        proxy.upstream = site.server_address
+        proxy.latency = settings["latency"]
+        proxy.failure_rate = settings["failure_rate"]
+        proxy.throttle_rate = settings["throttle_rate"]
+        proxy.count = count
+        servers.append(proxy)
+    threads = [
+        threading.Thread(target=server.serve_forever, daemon=True) for server in servers
+    ]
+    for thread in threads:
+        thread.start()
+    connection.send(
+        (site.server_address[1], [proxy.server_address[1] for proxy in servers[1:]])
+    )
+    connection.close()
+    for thread in threads:
+        thread.join()
+
+
+class QuietHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_body(self, status: int, body: bytes, headers: Optional[dict] = None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class SiteHandler(QuietHandler):
+    def do_GET(self):
+        if self.path == STATS_PATH:
+            with self.server.lock:
+                body = json.dumps(dict(self.server.counters)).encode()
+            self.send_body(200, body, {"Content-Type": "application/json"})
+            return
+        self.server.count("site_requests")
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        page = self.server.render(self.server.base_url, self.path)
+        if page is None:
+            self.server.count("site_not_found")
+            self.send_body(404, b"Not Found")
+            return
+        self.send_body(200, page.encode(), {"Content-Type": "text/html; charset=utf-8"})
+
+
+class ProxyHandler(QuietHandler):
+    _local = threading.local()
+
+    def do_GET(self):
+        server = self.server
+        server.count("proxy_requests")
+        with server.random_lock:
+            jitter = server.random.uniform(0.5, 1.5)
+            roll = server.random.random()
+        time.sleep(server.latency * jitter)
+        if roll < server.failure_rate:
+            server.count("proxy_failures")
+            if roll < server.failure_rate / 2:
+                self.send_body(502, b"Bad Gateway")
+            else:
+                self.close_connection = True
+            return
+        if roll < server.failure_rate + server.throttle_rate:
+            server.count("proxy_throttled")
+            self.send_body(429, b"Too Many Requests", {"Retry-After": "1"})
+            return
+        status, headers, body = self._forward()
+        self.send_body(status, body, headers)
+
+    def _forward(self):
+        """Передает запрос сайту по keep-alive соединению потока"""
+        parts = urlsplit(self.path)
+        path = parts.path + ("?" + parts.query if parts.query else "")
+        for attempt in range(2):
+            connection = getattr(self._local, "connection", None)
+            if connection is None:
+                connection = http.client.HTTPConnection(*self.server.upstream)
+                self._local.connection = connection
+            try:
+                connection.request("GET", path)
+                response = connection.getresponse()
+                body = response.read()
+                headers = {"Content-Type": response.getheader("Content-Type", "")}
+                return response.status, headers, body
+            except (http.client.HTTPException, OSError):
+                connection.close()
+                self._local.connection = None
+                if attempt:
+                    raise
+
+
+def peak_rss_mib() -> Dict[str, float]:
+    """Пиковая память (RSS) процесса и самого большого из его завершенных
+    потомков, например процессов разбора конвейера"""
+    scale = 2**20 if sys.platform == "darwin" else 2**10
+    return {
+        "self": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale,
+        "children": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale,
+    }
+
+
+def report(
+    name: str,
+    reviews: int,
+    seconds: float,
+    stats: Dict[str, int],
+    settings: Dict[str, Any],
+    output: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Печатает итог замера и дописывает его строкой JSON в output,
+    чтобы сравнивать прогоны с одним и тем же базовым"""
+    memory = peak_rss_mib()
+    per_review = max(reviews, 1)
+    result = {
+        "name": name,
+        "timestamp": time.time(),
+        "settings": settings,
+        "reviews": reviews,
+        "seconds": round(seconds, 3),
+        "reviews_per_second": round(reviews / seconds, 2),
+        "requests_per_review": round(stats.get("site_requests", 0) / per_review, 3),
+        "attempts_per_review": round(stats.get("proxy_requests", 0) / per_review, 3),
+        "proxy_failures": stats.get("proxy_failures", 0),
+        "proxy_throttled": stats.get("proxy_throttled", 0),
+        "peak_rss_mib": round(memory["self"], 1),
+        "peak_children_rss_mib": round(memory["children"], 1),
+    }
+    print(
+        f"{name}: {reviews} отзывов за {seconds:.2f} с, "
+        f"{result['reviews_per_second']} отзывов/с\n"
+        f"  запросов к сайту на отзыв: {result['requests_per_review']}, "
+        f"попыток через прокси на отзыв: {result['attempts_per_review']} "
+        f"(ошибок прокси {result['proxy_failures']}, "
+        f"429 {result['proxy_throttled']})\n"
+        f"  пиковая память: {result['peak_rss_mib']} МиБ, "
+        f"потомки {result['peak_children_rss_mib']} МиБ"
+    )
+    if output is not None:
+        with open(output, "a", encoding="utf-8") as file:
+            file.write(json.dumps(result, ensure_ascii=False) + "\n")
+    return result
+
+
+def add_site_arguments(argparser: argparse.ArgumentParser):
+    """Добавляет общие параметры локального сайта и прокси"""
+    argparser.add_argument("--proxies", type=int, default=8)
+    argparser.add_argument(
+        "--latency", type=float, default=0.02, help="задержка прокси, с"
+    )
+    argparser.add_argument("--failure-rate", type=float, default=0.05)
+    argparser.add_argument("--throttle-rate", type=float, default=0.0)
+    argparser.add_argument("--site-latency", type=float, default=0.0)
+    argparser.add_argument("--seed", type=int, default=0)
+    argparser.add_argument(
+        "--output", help="файл JSONL, в который дописывается результат"
+    )
+
+
+def site_from_args(render: Render, args: argparse.Namespace) -> BenchmarkSite:
+    return BenchmarkSite(
+        render,
+        proxies=args.proxies,
+        latency=args.latency,
+        failure_rate=args.failure_rate,
+        throttle_rate=args.throttle_rate,
+        site_latency=args.site_latency,
+        seed=args.seed,
+    )
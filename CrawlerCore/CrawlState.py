@@ -0,0 +1,50 @@
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+
+class CrawlState:
+    """Отметки о самом новом отзыве по каждому источнику (high-water marks).
+
+    Хранятся в небольшом JSON-файле, который переписывается атомарно.
+    """
+
+    def __init__(self, filename: str = "crawl_state.json"):
+        self.filename = filename
+        self._lock = threading.Lock()
+        self.marks: Dict[str, Dict[str, Any]] = self.load()
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """Загружает отметки из файла, если он существует"""
+        if not os.path.exists(self.filename):
+            return {}
+        with open(self.filename, "r", encoding="utf-8") as file:
+            return json.load(file)
+
+    def get(self, source: str) -> Optional[Dict[str, Any]]:
+        """Возвращает отметку источника или None"""
+        with self._lock:
+            return self.marks.get(source)
+
+    def update(
+        self, source: str, newest_review_url: str, newest_date: Optional[str] = None
+    ):
+        """Запоминает самый новый отзыв источника и сохраняет файл"""
+        with self._lock:
+            mark = self.marks.setdefault(source, {})
+            if mark.get("newest_review_url") != newest_review_url:
+                mark.pop("newest_date", None)
+            mark["newest_review_url"] = newest_review_url
+            if newest_date is not None:
+                mark["newest_date"] = newest_date
+            mark["updated"] = datetime.now().isoformat()
+            self.save()
+
+    def save(self):
+        """Атомарно сохраняет отметки в файл"""
+        tmp_filename = self.filename + ".tmp"
+        with open(tmp_filename, "w", encoding="utf-8") as file:
+            json.dump(self.marks, file, ensure_ascii=False, indent=2)
+        os.replace(tmp_filename, self.filename)
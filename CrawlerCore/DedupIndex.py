@@ -0,0 +1,187 @@
+import bisect
+import hashlib
+import heapq
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+
+def url_hash(url: str) -> int:
+    """64-битный хэш URL (BLAKE2b)"""
+    digest = hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+class DedupIndex:
+    """Компактный индекс обработанных URL для проверки `url in index`.
+
+    Вместо строк хранятся 64-битные хэши: отсортированный массив, который
+    отображается в память через mmap и загружается за миллисекунды, и
+    небольшой хвост хэшей, добавленных после последнего уплотнения. Файл
+    индекса лежит рядом с файлом отзывов и запоминает его размер и время
+    изменения: если файл отзывов менялся без индекса (например, после
+    падения), load возвращает False и индекс нужно построить заново.
+
+    Вероятность ложного срабатывания для одного нового URL равна
+    n / 2**64, то есть около 5e-14 при миллионе отзывов.
+    """
+
+    MAGIC = b"DEDUPIX1"
+    HEADER = struct.Struct("<8sQQQq")
+
+    def __init__(self, filename: str, source_filename: str, compact_ratio=0.25):
+        self.filename = filename
+        self.source_filename = source_filename
+        self.compact_ratio = compact_ratio
+        self._lock = threading.Lock()
+        self._mmap: Optional[mmap.mmap] = None
+        self._views = []
+        self._sorted: Any = array("Q")
+        self._tail = set()
+        self._unsynced = []
+
+    def load(self) -> bool:
+        """Загружает индекс, если он соответствует текущему файлу отзывов"""
+        if not os.path.exists(self.filename):
+            return False
+        with open(self.filename, "rb") as file:
+            header = file.read(self.HEADER.size)
+            if len(header) < self.HEADER.size:
+                return False
+            magic, sorted_count, tail_count, size, mtime_ns = self.HEADER.unpack(header)
+            if magic != self.MAGIC or (size, mtime_ns) != self._source_stat():
+                return False
+            expected = self.HEADER.size + (sorted_count + tail_count) * 8
+            if os.fstat(file.fileno()).st_size < expected:
+                return False
+            file.seek(self.HEADER.size + sorted_count * 8)
+            tail = array("Q")
+            tail.frombytes(file.read(tail_count * 8))
+        with self._lock:
+            self._release()
+            if sorted_count:
+                self._map_sorted(sorted_count)
+            self._tail = set(tail)
+            self._unsynced = []
+        return True
+
+    def _map_sorted(self, count: int):
+        """Отображает отсортированную часть файла в память без копирования"""
+        with open(self.filename, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        raw = memoryview(self._mmap)
+        view = raw[self.HEADER.size : self.HEADER.size + count * 8].cast("Q")
+        self._views = [view, raw]
+        self._sorted = view
+
+    def rebuild(self, urls: Iterable[str]):
+        """Строит индекс заново по всем сохраненным URL и записывает его"""
+        with self._lock:
+            self._release(keep=False)
+            self._tail = {url_hash(url) for url in urls}
+            self._compact()
+
+    def _has(self, value: int) -> bool:
+        if value in self._tail:
+            return True
+        position = bisect.bisect_left(self._sorted, value)
+        return position < len(self._sorted) and self._sorted[position] == value
+
+    def __contains__(self, url: str) -> bool:
+        value = url_hash(url)
+        with self._lock:
+            return self._has(value)
+
+    def add(self, url: str):
+        value = url_hash(url)
+        with self._lock:
+            if self._has(value):
+                return
+            self._tail.add(value)
+            self._unsynced.append(value)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sorted) + len(self._tail)
+
+    def sync(self):
+        """Дописывает новые хэши в файл и запоминает состояние файла отзывов.
+
+        Вызывается после записи отзывов на диск. Когда хвост становится
+        больше compact_ratio от отсортированной части, файл уплотняется.
+        """
+        with self._lock:
+            if len(self._tail) > max(len(self._sorted) * self.compact_ratio, 1024):
+                self._compact()
+                return
+            if not os.path.exists(self.filename):
+                self._compact()
+                return
+            with open(self.filename, "r+b") as file:
+                header = file.read(self.HEADER.size)
+                _, sorted_count, tail_count, _, _ = self.HEADER.unpack(header)
+                file.seek(self.HEADER.size + (sorted_count + tail_count) * 8)
+                file.write(array("Q", self._unsynced).tobytes())
+                file.truncate()
+                file.seek(0)
+                file.write(
+                    self.HEADER.pack(
+                        self.MAGIC, sorted_count, len(self._tail), *self._source_stat()
+                    )
+                )
+            self._unsynced = []
+
+    def _compact(self):
+        """Сливает хвост с отсортированной частью и атомарно переписывает файл"""
+        merged = array("Q", heapq.merge(self._sorted, sorted(self._tail)))
+        tmp_filename = self.filename + ".tmp"
+        with open(tmp_filename, "wb") as file:
+            file.write(
+                self.HEADER.pack(self.MAGIC, len(merged), 0, *self._source_stat())
+            )
+            file.write(merged.tobytes())
+        self._release(keep=False)
+        os.replace(tmp_filename, self.filename)
+        self._sorted = array("Q")
+        if merged:
+            self._map_sorted(len(merged))
+        self._tail = set()
+        self._unsynced = []
+
+    def _source_stat(self) -> Tuple[int, int]:
+        if not os.path.exists(self.source_filename):
+            return 0, 0
+        stat = os.stat(self.source_filename)
+        return stat.st_size, stat.st_mtime_ns
+
+    def _release(self, keep: bool = True):
+        """Закрывает mmap, при keep=True сохранив копию хэшей в памяти"""
+        if self._mmap is None:
+            return
+        self._sorted = array("Q", self._sorted) if keep else array("Q")
+        for view in self._views:
+            view.release()
+        self._views = []
+        self._mmap.close()
+        self._mmap = None
+
+    def close(self):
+        with self._lock:
+            self._release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Возвращает число хэшей и занимаемую ими память"""
+        with self._lock:
+            return {
+                "entries": len(self._sorted) + len(self._tail),
+                "sorted": len(self._sorted),
+                "tail": len(self._tail),
+                "mapped": self._mmap is not None,
+                "memory_bytes": len(self._sorted) * 8
+                + sys.getsizeof(self._tail)
+                + sum(sys.getsizeof(value) for value in self._tail),
+            }
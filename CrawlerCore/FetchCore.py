@@ -0,0 +1,156 @@
+import logging
+import re
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Mapping, Optional
+
+import requests
+
+from .ProxyPool import ProxyPool
+from .RateController import RateController
+from .Transport import Transport
+
+logger = logging.getLogger(__name__)
+
+
+def read_proxy_file(filename: str = "proxies.txt") -> dict[str, Optional[float]]:
+    """Читает файл прокси: строки ip:port[:login:password], комментарии
+    после # и задержки latency=..., записанные proxy_test.py"""
+    proxies = {}
+    with open(filename, encoding="utf-8") as file:
+        for line in file:
+            entry, _, comment = line.partition("#")
+            proxy = entry.strip().split(":")
+            match = re.search(r"latency=([\d.]+)", comment)
+            latency = float(match.group(1)) if match else None
+            if len(proxy) == 4:
+                ip, port, login, password = proxy
+                proxies[f"http://{login}:{password}@{ip}:{port}"] = latency
+            elif len(proxy) == 2:
+                ip, port = proxy
+                proxies[f"http://{ip}:{port}"] = latency
+            elif proxy != [""]:
+                logger.error("Proxy Error: %s", proxy)
+    return proxies
+
+
+class FairLimiter:
+    """Общий лимит одновременных запросов для нескольких задач.
+
+    Свободный слот получает ждущая задача, у которой сейчас меньше всего
+    запросов в работе, поэтому задачи делят лимит поровну. Если ждет
+    только одна задача, она занимает все свободные слоты и лимит не
+    простаивает, пока другие задачи разбирают страницы.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._condition = threading.Condition()
+        self._active = Counter()
+        self._waiting = Counter()
+        self._total = 0
+
+    def _can_start(self, job: str) -> bool:
+        if self._total >= self.limit:
+            return False
+        return all(
+            self._active[job] <= self._active[other]
+            for other in self._waiting
+            if other != job
+        )
+
+    def acquire(self, job: str):
+        with self._condition:
+            self._waiting[job] += 1
+            try:
+                self._condition.wait_for(lambda: self._can_start(job))
+            finally:
+                self._waiting[job] -= 1
+                if not self._waiting[job]:
+                    del self._waiting[job]
+            self._active[job] += 1
+            self._total += 1
+
+    def release(self, job: str):
+        with self._condition:
+            self._active[job] -= 1
+            self._total -= 1
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self, job: str) -> Iterator[None]:
+        self.acquire(job)
+        try:
+            yield
+        finally:
+            self.release(job)
+
+    def get_stats(self) -> Dict[str, Dict[str, int]]:
+        """Возвращает число запросов в работе и ждущих по задачам"""
+        with self._condition:
+            return {
+                job: {"active": self._active[job], "waiting": self._waiting[job]}
+                for job in set(self._active) | set(self._waiting)
+            }
+
+
+class JobTransport:
+    """Транспорт одной задачи: запросы идут через общий Transport, и
+    каждый занимает слот FairLimiter от имени задачи"""
+
+    def __init__(self, transport: Transport, limiter: FairLimiter, job: str):
+        self.job = job
+        self._transport = transport
+        self._limiter = limiter
+
+    def get(self, url: str, proxy: str, **kwargs) -> requests.Response:
+        with self._limiter.slot(self.job):
+            return self._transport.get(url, proxy, **kwargs)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return self._transport.get_stats()
+
+    def close(self):
+        """Общий транспорт закрывает FetchCore"""
+
+
+class FetchCore:
+    """Общее ядро загрузки для нескольких обходов в одном процессе.
+
+    Задачи разных сайтов используют один пул прокси (статистика и паузы
+    прокси общие), один RateController (лимиты на хост общие для всех
+    задач) и один Transport с keep-alive соединениями, а общий лимит
+    одновременных запросов делится между задачами через FairLimiter.
+    """
+
+    def __init__(
+        self,
+        proxies: Optional[Mapping[str, Optional[float]]] = None,
+        concurrency: int = 32,
+        per_host_limit: int = 8,
+        pool_size: int = 10,
+    ):
+        self.proxy_pool = ProxyPool(
+            proxies if proxies is not None else read_proxy_file()
+        )
+        self.transport = Transport(pool_size)
+        self.rate = RateController(
+            initial_limit=per_host_limit,
+            max_limit=concurrency,
+            initial_rate=per_host_limit,
+        )
+        self.limiter = FairLimiter(concurrency)
+
+    def transport_for(self, job: str) -> JobTransport:
+        return JobTransport(self.transport, self.limiter, job)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "jobs": self.limiter.get_stats(),
+            "hosts": self.rate.get_stats(),
+            "transport": self.transport.get_stats(),
+        }
+
+    def close(self):
+        self.transport.close()
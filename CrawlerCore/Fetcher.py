@@ -0,0 +1,183 @@
+import asyncio
+import logging
+import time
+from contextlib import nullcontext
+from typing import Callable, Mapping, Optional
+from urllib.parse import urlsplit
+
+import requests
+from fake_useragent import FakeUserAgent
+
+from .Metrics import Metrics, proxy_label
+from .ProxyPool import ProxyPool
+from .RateController import THROTTLE_STATUSES, RateController, parse_retry_after
+from .Transport import Transport
+
+logger = logging.getLogger(__name__)
+
+
+class Fetcher:
+    """Загрузка страниц через пул прокси.
+
+    Каждая попытка идет через прокси из ProxyPool и занимает слот хоста в
+    RateController; неудачная попытка повторяется с другим прокси до
+    max_retries раз. Коды PROXY_ERROR_CODES, 429/503 и редирект на капчу
+    снижают оценку прокси, а ответ с кодом из ok_statuses возвращается.
+    """
+
+    PROXY_ERROR_CODES = (403, 407, 429)
+
+    def __init__(
+        self,
+        proxy_pool: ProxyPool,
+        transport,
+        rate: RateController,
+        metrics: Metrics,
+        max_retries: int = 10,
+        request_timeout: float = 7,
+        ok_statuses: tuple = (200,),
+    ):
+        self.proxy_pool = proxy_pool
+        self.transport = transport
+        self.rate = rate
+        self.metrics = metrics
+        self.max_retries = max_retries
+        self.request_timeout = request_timeout
+        self.ok_statuses = ok_statuses
+        self._ua = FakeUserAgent()
+
+    @classmethod
+    def create(
+        cls,
+        job: str,
+        metrics: Metrics,
+        proxies: Callable[[], Mapping[str, Optional[float]]],
+        fetch_core=None,
+        concurrency: int = 16,
+        per_host_limit: int = 8,
+        pool_size: int = 10,
+        **kwargs,
+    ) -> "Fetcher":
+        """Загрузчик со своими прокси, соединениями и лимитами хостов или,
+        если задан fetch_core, с общими для всех задач ядра"""
+        if fetch_core is not None:
+            return cls(
+                fetch_core.proxy_pool,
+                fetch_core.transport_for(job),
+                fetch_core.rate,
+                metrics,
+                **kwargs,
+            )
+        return cls(
+            ProxyPool(proxies()),
+            Transport(pool_size),
+            RateController(
+                initial_limit=per_host_limit,
+                max_limit=concurrency,
+                initial_rate=per_host_limit,
+            ),
+            metrics,
+            **kwargs,
+        )
+
+    def headers(self, headers: Optional[dict] = None) -> dict:
+        """Заголовки запроса со случайным User-Agent"""
+        return {"User-Agent": self._ua.random, **(headers or {})}
+
+    def make_request(
+        self, url: str, headers: Optional[dict] = None, limit=None
+    ) -> Optional[requests.Response]:
+        """Выполняет запрос с повторами; limit — необязательный общий
+        семафор, который попытка занимает вместе со слотом хоста"""
+        headers = self.headers(headers)
+        host = urlsplit(url).netloc
+        for attempt in range(1, self.max_retries + 1):
+            proxy = self.proxy_pool.acquire()
+            with limit if limit is not None else nullcontext():
+                self.rate.acquire(host)
+                response = self.request(url, proxy, headers)
+            if response is not None:
+                self.metrics.observe_attempts(url, attempt, True)
+                return response
+        self.metrics.observe_attempts(url, self.max_retries, False)
+        return None
+
+    async def amake_request(
+        self,
+        url: str,
+        executor,
+        global_limit: asyncio.Semaphore,
+        proxy_limits: Mapping[str, asyncio.Semaphore],
+        headers: Optional[dict] = None,
+    ) -> Optional[requests.Response]:
+        """Асинхронный вариант make_request: попытка выполняется в executor
+        и занимает общий семафор, семафор прокси и слот хоста"""
+        headers = self.headers(headers)
+        host = urlsplit(url).netloc
+        loop = asyncio.get_running_loop()
+        for attempt in range(1, self.max_retries + 1):
+            proxy = self.proxy_pool.acquire()
+            # Слот хоста занимается последним, прямо перед отправкой: иначе
+            # выданные токены копятся в очереди семафоров и уходят пачкой
+            async with proxy_limits[proxy], global_limit:
+                await self.rate.aacquire(host)
+                response = await loop.run_in_executor(
+                    executor, self.request, url, proxy, headers
+                )
+            if response is not None:
+                self.metrics.observe_attempts(url, attempt, True)
+                return response
+        self.metrics.observe_attempts(url, self.max_retries, False)
+        return None
+
+    def request(
+        self, url: str, proxy: str, headers: dict
+    ) -> Optional[requests.Response]:
+        """Выполняет одну попытку запроса через указанный прокси и
+        освобождает слот хоста, занятый вызывающим в RateController"""
+        host = urlsplit(url).netloc
+        status, retry_after, throttled = None, None, False
+        start = time.perf_counter()
+        try:
+            response = self.transport.get(
+                url,
+                proxy,
+                headers=headers,
+                timeout=self.request_timeout,
+            )
+            latency = time.perf_counter() - start
+            status = response.status_code
+            logger.debug(
+                "Requested with %s, URL: %s, status_code: %s",
+                proxy_label(proxy),
+                url,
+                status,
+            )
+            self.metrics.observe_request(url, proxy, latency, status)
+            throttled = status in THROTTLE_STATUSES or self.is_captcha(response)
+            if throttled:
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                self.metrics.count("throttled")
+            if status in self.PROXY_ERROR_CODES or throttled:
+                self.proxy_pool.report_failure(proxy, latency)
+            else:
+                self.proxy_pool.report_success(proxy, latency)
+            if status in self.ok_statuses and not throttled:
+                return response
+        except requests.exceptions.RequestException as e:
+            self.metrics.observe_request(
+                url, proxy, time.perf_counter() - start, "error"
+            )
+            self.proxy_pool.report_failure(proxy)
+            logger.warning("Request Error: %s %s", url, e)
+        finally:
+            self.rate.release(host, status, retry_after, throttled)
+            limit, rate = self.rate.limits(host)
+            self.metrics.set_gauge("host_concurrency_limit", limit, host=host)
+            self.metrics.set_gauge("host_rate_limit", rate, host=host)
+        return None
+
+    @staticmethod
+    def is_captcha(response: requests.Response) -> bool:
+        """Сайт перенаправил запрос на страницу с капчей"""
+        return "captcha" in (response.url or "").lower()
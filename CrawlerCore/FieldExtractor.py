@@ -0,0 +1,101 @@
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from lxml import etree
+
+
+def has_class(*classes: str) -> str:
+    """Возвращает XPath-условие, аналогичное CSS-селектору .a.b"""
+    return "".join(
+        f"[contains(concat(' ', normalize-space(@class), ' '), ' {name} ')]"
+        for name in classes
+    )
+
+
+class Scope:
+    """Именованный узел-контейнер, относительно которого ищутся поля.
+
+    Контейнер находится один раз, поэтому поля внутри него не повторяют
+    поиск общего родителя.
+    """
+
+    def __init__(self, name: str, xpath: str, parent: str = "root"):
+        self.name = name
+        self.xpath = xpath
+        self.parent = parent
+
+
+class Field:
+    """Описание поля: XPath внутри контейнера scope и преобразование.
+
+    Если xpath не задан, значение берется из аргумента values метода
+    FieldExtractor.extract. Для required=False отсутствие узла дает None.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        xpath: Optional[str] = None,
+        scope: str = "root",
+        attribute: Optional[str] = None,
+        convert: Callable[[str], Any] = str,
+        required: bool = True,
+    ):
+        self.name = name
+        self.xpath = xpath
+        self.scope = scope
+        self.attribute = attribute
+        self.convert = convert
+        self.required = required
+
+
+class FieldExtractor:
+    """Извлекает набор полей из дерева lxml.html.
+
+    XPath-выражения компилируются один раз при создании, а извлечение
+    делает один разбор документа и по одному запросу на контейнер и поле.
+    Текст элемента берется как text_content(), что совпадает с get_text()
+    в BeautifulSoup. Отсутствие обязательного поля вызывает ValueError.
+    """
+
+    def __init__(self, fields: Iterable[Field], scopes: Iterable[Scope] = ()):
+        self._scopes = [
+            (scope.name, scope.parent, etree.XPath(scope.xpath)) for scope in scopes
+        ]
+        self._fields = [
+            (field, etree.XPath(field.xpath) if field.xpath else None)
+            for field in fields
+        ]
+
+    def extract(
+        self, node: etree._Element, values: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Возвращает словарь полей в порядке их описания"""
+        nodes = {"root": node}
+        for name, parent, xpath in self._scopes:
+            nodes[name] = self._first(xpath, nodes[parent], name)
+
+        result = {}
+        for field, xpath in self._fields:
+            if xpath is None:
+                result[field.name] = values[field.name]
+                continue
+            found = xpath(nodes[field.scope])
+            if not found:
+                if field.required:
+                    raise ValueError(f"Не найдено поле {field.name}")
+                result[field.name] = None
+                continue
+            value = found[0]
+            if field.attribute is not None:
+                value = value.attrib[field.attribute]
+            elif isinstance(value, etree._Element):
+                value = value.text_content()
+            result[field.name] = field.convert(str(value))
+        return result
+
+    @staticmethod
+    def _first(xpath: etree.XPath, node: etree._Element, name: str):
+        found = xpath(node)
+        if not found:
+            raise ValueError(f"Не найден контейнер {name}")
+        return found[0]
@@ -0,0 +1,136 @@
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterator, Optional
+
+DISCOVERED = "discovered"
+FETCHED = "fetched"
+PARSED = "parsed"
+FAILED = "failed"
+
+
+class Frontier:
+    """Очередь обхода на диске: URL с видом, источником, состоянием
+    (discovered / fetched / parsed / failed), числом ошибок и данными,
+    извлеченными со страницы.
+
+    Хранится в SQLite, каждое изменение фиксируется сразу, поэтому после
+    падения обход продолжается с того же места. После успешного
+    завершения обхода очередь очищается методом clear.
+    """
+
+    def __init__(self, filename: str = "frontier.sqlite"):
+        self.filename = filename
+        self._connection = sqlite3.connect(
+            filename, timeout=30, check_same_thread=False
+        )
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("""
+                CREATE TABLE IF NOT EXISTS frontier (
+                    kind TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    source TEXT,
+                    state TEXT NOT NULL,
+                    failures INTEGER NOT NULL DEFAULT 0,
+                    data TEXT,
+                    updated TEXT NOT NULL,
+                    PRIMARY KEY (kind, url)
+                )
+                """)
+
+    def add(self, kind: str, url: str, source: Optional[str] = None):
+        """Добавляет URL в состоянии discovered, если его еще нет"""
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR IGNORE INTO frontier (kind, url, source, state, updated) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (kind, url, source, DISCOVERED, datetime.now().isoformat()),
+            )
+
+    def mark(
+        self,
+        kind: str,
+        url: str,
+        state: str,
+        data: Any = None,
+        source: Optional[str] = None,
+    ):
+        """Переводит URL в новое состояние; FAILED увеличивает счетчик ошибок"""
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT INTO frontier (kind, url, source, state, failures, data, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (kind, url) DO UPDATE SET "
+                "state = excluded.state, "
+                "failures = failures + excluded.failures, "
+                "data = COALESCE(excluded.data, data), "
+                "source = COALESCE(excluded.source, source), "
+                "updated = excluded.updated",
+                (
+                    kind,
+                    url,
+                    source,
+                    state,
+                    1 if state == FAILED else 0,
+                    json.dumps(data, ensure_ascii=False) if data is not None else None,
+                    datetime.now().isoformat(),
+                ),
+            )
+
+    def get(self, kind: str, url: str) -> Optional[Dict[str, Any]]:
+        """Возвращает запись URL или None"""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT source, state, failures, data FROM frontier "
+                "WHERE kind = ? AND url = ?",
+                (kind, url),
+            ).fetchone()
+        if row is None:
+            return None
+        source, state, failures, data = row
+        return {
+            "source": source,
+            "state": state,
+            "failures": failures,
+            "data": json.loads(data) if data is not None else None,
+        }
+
+    def is_parsed(self, kind: str, url: str) -> bool:
+        record = self.get(kind, url)
+        return record is not None and record["state"] == PARSED
+
+    def data(self, kind: str, url: str) -> Any:
+        """Возвращает сохраненные данные страницы или None"""
+        record = self.get(kind, url)
+        return record["data"] if record is not None else None
+
+    def iter_urls(self, kind: str) -> Iterator[str]:
+        """Возвращает URL указанного вида в порядке добавления"""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT url FROM frontier WHERE kind = ? ORDER BY rowid", (kind,)
+            ).fetchall()
+        for (url,) in rows:
+            yield url
+
+    def get_stats(self) -> Dict[str, int]:
+        """Возвращает число URL в каждом состоянии"""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT state, COUNT(*) FROM frontier GROUP BY state"
+            ).fetchall()
+        return dict(rows)
+
+    def clear(self, source: Optional[str] = None):
+        """Очищает очередь после завершенного обхода; если указан source,
+        удаляются только URL, найденные из этого источника"""
+        with self._lock, self._connection:
+            if source is None:
+                self._connection.execute("DELETE FROM frontier")
+            else:
+                self._connection.execute(
+                    "DELETE FROM frontier WHERE source = ?", (source,)
+                )
@@ -0,0 +1,158 @@
+import atexit
+import json
+import os
+import sys
+from datetime import datetime
+from typing import Any, Dict, Iterator, Union
+
+from .DedupIndex import DedupIndex
+
+
+class JSONLSaver:
+    """Сохраняет отзывы в формате JSON Lines: одна строка на отзыв.
+
+    Каждый отзыв дописывается в конец файла одной операцией записи, а
+    metadata хранится рядом в небольшом файле <filename>.meta.json, который
+    обновляется раз в metadata_interval отзывов и при закрытии. Вместе с
+    metadata синхронизируется индекс ссылок <filename>.idx (DedupIndex).
+    """
+
+    def __init__(
+        self,
+        filename: str = "reviews.jsonl",
+        metadata_interval: int = 100,
+        dedup_index: bool = True,
+    ):
+        self.filename = filename
+        self.meta_filename = filename + ".meta.json"
+        self.metadata_interval = metadata_interval
+        self.dedup_index = dedup_index
+        self._index = None
+        self.metadata = self.load_existing_data()
+        self._file = open(self.filename, "a", encoding="utf-8")
+        self._unsaved_metadata = 0
+        atexit.register(self.close)
+
+    def load_existing_data(self) -> Dict[str, Any]:
+        """Загружает metadata и пересчитывает число отзывов по файлу"""
+        metadata = {
+            "created": datetime.now().isoformat(),
+            "updated": datetime.now().isoformat(),
+            "total_reviews": 0,
+        }
+        if os.path.exists(self.meta_filename):
+            with open(self.meta_filename, "r", encoding="utf-8") as file:
+                metadata.update(json.load(file))
+        if os.path.exists(self.filename):
+            self._drop_partial_line()
+            with open(self.filename, "rb") as file:
+                metadata["total_reviews"] = sum(1 for line in file if line.strip())
+        return metadata
+
+    def _drop_partial_line(self):
+        """Обрезает недописанную последнюю строку после аварийного завершения"""
+        with open(self.filename, "rb+") as file:
+            file.seek(0, os.SEEK_END)
+            size = file.tell()
+            if size == 0:
+                return
+            file.seek(size - 1)
+            if file.read(1) == b"\n":
+                return
+            position = size
+            while position > 0:
+                step = min(65536, position)
+                position -= step
+                file.seek(position)
+                chunk = file.read(step)
+                newline = chunk.rfind(b"\n")
+                if newline != -1:
+                    file.truncate(position + newline + 1)
+                    return
+            file.truncate(0)
+
+    def iter_reviews(self) -> Iterator[Dict]:
+        """Построчно читает сохраненные отзывы"""
+        if not os.path.exists(self.filename):
+            return
+        with open(self.filename, "r", encoding="utf-8") as file:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+
+    def processed_reviews(self) -> Union[DedupIndex, set]:
+        """Возвращает ссылки на сохраненные отзывы: индекс с диска, если он
+        соответствует файлу, иначе индекс строится заново по отзывам"""
+        if not self.dedup_index:
+            return {review["Ссылка на отзыв"] for review in self.iter_reviews()}
+        if self._index is None:
+            self._index = DedupIndex(self.filename + ".idx", self.filename)
+            if not self._index.load():
+                self._index.rebuild(
+                    review["Ссылка на отзыв"] for review in self.iter_reviews()
+                )
+        return self._index
+
+    def save_review(self, service_url: str, review_data: Dict):
+        """Дописывает отзыв в конец файла"""
+        self.metadata["updated"] = datetime.now().isoformat()
+
+        review_data["service_url"] = service_url
+
+        review_data["collected_at"] = datetime.now().isoformat()
+
+        self._file.write(json.dumps(review_data, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self.metadata["total_reviews"] += 1
+        if self._index is not None:
+            self._index.add(review_data["Ссылка на отзыв"])
+
+        self._unsaved_metadata += 1
+        if self._unsaved_metadata >= self.metadata_interval:
+            self.save_metadata()
+
+    def save_metadata(self):
+        """Сохраняет metadata в отдельный файл"""
+        tmp_filename = self.meta_filename + ".tmp"
+        with open(tmp_filename, "w", encoding="utf-8") as file:
+            json.dump(self.metadata, file, ensure_ascii=False, indent=2)
+        os.replace(tmp_filename, self.meta_filename)
+        self._unsaved_metadata = 0
+        if self._index is not None:
+            self._index.sync()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Возвращает статистику по сохраненным данным"""
+        return {
+            "total_reviews": self.metadata["total_reviews"],
+            "last_update": self.metadata["updated"],
+        }
+
+    def close(self):
+        """Закрывает файл и сохраняет metadata"""
+        if self._file.closed:
+            return
+        self._file.close()
+        self.save_metadata()
+
+
+def convert_to_json(jsonl_filename: str, json_filename: str):
+    """Собирает из JSON Lines файла документ в формате JSONSaver"""
+    saver = JSONLSaver(jsonl_filename)
+    saver.close()
+    with open(json_filename, "w", encoding="utf-8") as file:
+        file.write('{\n  "metadata": ')
+        metadata = json.dumps(saver.metadata, ensure_ascii=False, indent=2)
+        file.write(metadata.replace("\n", "\n  "))
+        file.write(',\n  "reviews": [')
+        first = True
+        for review in saver.iter_reviews():
+            file.write("\n    " if first else ",\n    ")
+            review_json = json.dumps(review, ensure_ascii=False, indent=2)
+            file.write(review_json.replace("\n", "\n    "))
+            first = False
+        file.write("]\n}" if first else "\n  ]\n}")
+
+
+if __name__ == "__main__":
+    convert_to_json(sys.argv[1], sys.argv[2])
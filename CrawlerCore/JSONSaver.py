@@ -0,0 +1,220 @@
+import atexit
+import json
+import os
+import signal
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Any, Iterator, Optional, Union
+
+from .DedupIndex import DedupIndex
+
+
+class JSONSaver:
+    """Сохраняет отзывы одним JSON-документом.
+
+    Отзывы копятся в памяти и записываются на диск после flush_every
+    отзывов или через flush_interval секунд, а также при выходе и по
+    SIGINT. Запись идёт во временный файл, который затем атомарно
+    заменяет основной, поэтому падение во время записи не портит файл.
+    После каждой записи синхронизируется индекс ссылок <filename>.idx.
+
+    Если задан archive_file и за время работы добавились отзывы, при
+    закрытии все отзывы дополнительно записываются в сжатый архив
+    ReviewArchive (нужен пакет zstandard), из которого отзыв читается по
+    ссылке без распаковки остальных.
+    """
+
+    def __init__(
+        self,
+        filename: str = "reviews.json",
+        flush_every: int = 50,
+        flush_interval: float = 30.0,
+        dedup_index: bool = True,
+        archive_file: Optional[str] = None,
+    ):
+        self.filename = filename
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.dedup_index = dedup_index
+        self.archive_file = archive_file
+        self._index = None
+        self.data = self.load_existing_data()
+        self._lock = threading.RLock()
+        self._pending = 0
+        self._flushing = False
+        self._last_flush = time.monotonic()
+        self._flush_count = 0
+        self._flush_seconds = 0.0
+        self._last_flush_seconds = 0.0
+        self._archive_stale = archive_file is not None and not os.path.exists(
+            archive_file
+        )
+        self._closed = threading.Event()
+        threading.Thread(target=self._flush_periodically, daemon=True).start()
+        atexit.register(self.close)
+        self._install_sigint_handler()
+
+    def load_existing_data(self) -> Dict[str, Any]:
+        """Загружает существующие данные из файла, если он существует"""
+        if os.path.exists(self.filename):
+            try:
+                with open(self.filename, "r", encoding="utf-8") as file:
+                    return json.load(file)
+            except json.JSONDecodeError as e:
+                raise ValueError(
+                    f"Файл {self.filename} поврежден и не будет перезаписан: {e}"
+                ) from e
+        return {
+            "metadata": {
+                "created": datetime.now().isoformat(),
+                "updated": datetime.now().isoformat(),
+                "total_reviews": 0,
+            },
+            "reviews": [],
+        }
+
+    def _install_sigint_handler(self):
+        """Сбрасывает буфер на диск по SIGINT перед прежним обработчиком.
+
+        Если сигнал пришел во время записи, повторная запись не начинается:
+        RLock пустил бы ее в тот же временный файл. Прерванная запись
+        останется в буфере и будет выполнена при выходе в close. Если SIGINT
+        игнорировался, после записи обход продолжается.
+        """
+        if threading.current_thread() is not threading.main_thread():
+            return
+        previous_handler = signal.getsignal(signal.SIGINT)
+
+        def handler(signum, frame):
+            if not self._flushing:
+                self.flush()
+            if previous_handler is signal.SIG_IGN:
+                return
+            if callable(previous_handler):
+                previous_handler(signum, frame)
+            else:
+                raise KeyboardInterrupt
+
+        signal.signal(signal.SIGINT, handler)
+
+    def _flush_periodically(self):
+        while not self._closed.wait(self.flush_interval):
+            with self._lock:
+                if (
+                    self._pending
+                    and time.monotonic() - self._last_flush >= self.flush_interval
+                ):
+                    self.flush()
+
+    def iter_reviews(self) -> Iterator[Dict]:
+        """Возвращает сохраненные отзывы"""
+        return iter(self.data["reviews"])
+
+    def processed_reviews(self) -> Union[DedupIndex, set]:
+        """Возвращает ссылки на сохраненные отзывы: индекс с диска, если он
+        соответствует файлу, иначе индекс строится заново по отзывам"""
+        if not self.dedup_index:
+            return {review["Ссылка на отзыв"] for review in self.iter_reviews()}
+        with self._lock:
+            if self._index is None:
+                self._index = DedupIndex(self.filename + ".idx", self.filename)
+                if not self._index.load():
+                    self._index.rebuild(
+                        review["Ссылка на отзыв"] for review in self.iter_reviews()
+                    )
+            return self._index
+
+    def save_review(self, service_url: str, review_data: Dict):
+        """Сохраняет отзыв"""
+        with self._lock:
+            self.data["metadata"]["updated"] = datetime.now().isoformat()
+
+            review_data["service_url"] = service_url
+
+            review_data["collected_at"] = datetime.now().isoformat()
+
+            self.data["reviews"].append(review_data)
+            self.data["metadata"]["total_reviews"] = len(self.data["reviews"])
+            if self._index is not None:
+                self._index.add(review_data["Ссылка на отзыв"])
+
+            self._pending += 1
+            self._archive_stale = self.archive_file is not None
+            if (
+                self._pending >= self.flush_every
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            ):
+                self.flush()
+
+    def flush(self):
+        """Записывает накопленные отзывы на диск, если они есть"""
+        with self._lock:
+            if not self._pending:
+                return
+            start = time.perf_counter()
+            self._flushing = True
+            try:
+                self.save_to_file()
+                if self._index is not None:
+                    self._index.sync()
+            finally:
+                self._flushing = False
+            self._last_flush_seconds = time.perf_counter() - start
+            self._flush_seconds += self._last_flush_seconds
+            self._flush_count += 1
+            self._pending = 0
+            self._last_flush = time.monotonic()
+
+    def flush_state(self) -> tuple[int, int]:
+        """Число выполненных сбросов и отзывов, еще не записанных на диск"""
+        with self._lock:
+            return self._flush_count, self._pending
+
+    def save_to_file(self):
+        """Атомарно сохраняет данные в файл"""
+        tmp_filename = self.filename + ".tmp"
+        try:
+            with open(tmp_filename, "w", encoding="utf-8") as file:
+                json.dump(self.data, file, ensure_ascii=False, indent=2)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(tmp_filename, self.filename)
+        except BaseException:
+            if os.path.exists(tmp_filename):
+                os.remove(tmp_filename)
+            raise
+
+    def close(self):
+        """Записывает остаток буфера и останавливает фоновый сброс"""
+        self._closed.set()
+        self.flush()
+        with self._lock:
+            if self._archive_stale:
+                self.save_archive()
+
+    def save_archive(self):
+        """Записывает все отзывы в сжатый архив archive_file"""
+        from .ReviewArchive import write_archive
+
+        with self._lock:
+            write_archive(
+                self.archive_file, self.data["reviews"], self.data["metadata"]
+            )
+            self._archive_stale = False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Возвращает статистику по сохраненным данным"""
+        with self._lock:
+            return {
+                "total_reviews": self.data["metadata"]["total_reviews"],
+                "last_update": self.data["metadata"]["updated"],
+                "pending_reviews": self._pending,
+                "flushes": self._flush_count,
+                "last_flush_seconds": round(self._last_flush_seconds, 4),
+                "avg_flush_seconds": (
+                    round(self._flush_seconds / self._flush_count, 4)
+                    if self._flush_count
+                    else 0.0
+                ),
+            }
@@ -0,0 +1,240 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Any, Dict, Optional, Sequence, Union
+from urllib.parse import urlsplit
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PARSE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+ATTEMPT_BUCKETS = (1, 2, 3, 5, 10, 25)
+
+COLORS = {
+    logging.DEBUG: "",
+    logging.INFO: "\033[92m",
+    logging.WARNING: "\033[93m",
+    logging.ERROR: "\033[91m",
+    logging.CRITICAL: "\033[91m",
+}
+
+
+class ColorFormatter(logging.Formatter):
+    """Раскрашивает сообщения по уровню, как прежние print"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        color = COLORS.get(record.levelno, "")
+        message = super().format(record)
+        return color + message + "\033[0m" if color else message
+
+
+def setup_logging(level: Union[int, str] = logging.INFO):
+    """Настраивает цветной вывод логов в терминал"""
+    handler = logging.StreamHandler()
+    handler.setFormatter(
+        ColorFormatter("%(asctime)s %(levelname)s %(name)s: %(message)s", "%H:%M:%S")
+    )
+    logging.basicConfig(level=level, handlers=[handler], force=True)
+
+
+def proxy_label(proxy: str) -> str:
+    """Адрес прокси без логина и пароля"""
+    parts = urlsplit(proxy)
+    return f"{parts.hostname}:{parts.port}" if parts.hostname else proxy
+
+
+class Histogram:
+    """Гистограмма с фиксированными границами корзин, как в Prometheus"""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> list[tuple[str, int]]:
+        """Накопленные счетчики по границам, последняя граница +Inf"""
+        result, total = [], 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            result.append(("+Inf" if bound == float("inf") else str(bound), total))
+        return result
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "buckets": dict(self.cumulative()),
+            "sum": round(self.sum, 6),
+            "count": self.count,
+        }
+
+
+class Metrics:
+    """Метрики обхода: задержки запросов по хосту и прокси, коды ответов,
+    число попыток на URL, время разбора отзыва и скорость обхода.
+
+    Снимок сохраняется методом export в текстовом формате Prometheus
+    (файл .prom, для node_exporter textfile collector) или в JSON, а
+    start_exporter делает это периодически в фоновом потоке.
+    """
+
+    def __init__(self, prefix: str = "crawler"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self._latency = defaultdict(lambda: Histogram(LATENCY_BUCKETS))
+        self._statuses = Counter()
+        self._attempts = Histogram(ATTEMPT_BUCKETS)
+        self._parse = Histogram(PARSE_BUCKETS)
+        self._counters = Counter()
+        self._gauges = {}
+        self._stop = threading.Event()
+
+    def observe_request(
+        self, url: str, proxy: str, latency: float, status: Union[int, str]
+    ):
+        """Учитывает одну попытку запроса; status равен коду ответа или error"""
+        host = urlsplit(url).netloc
+        with self._lock:
+            self._latency[("host", host)].observe(latency)
+            self._latency[("proxy", proxy_label(proxy))].observe(latency)
+            self._statuses[(host, str(status))] += 1
+
+    def observe_attempts(self, url: str, attempts: int, success: bool):
+        """Учитывает число попыток, которое понадобилось для URL"""
+        with self._lock:
+            self._attempts.observe(attempts)
+            self._counters["retries"] += attempts - 1
+            if not success:
+                self._counters["failed_urls"] += 1
+
+    def observe_parse(self, seconds: float):
+        with self._lock:
+            self._parse.observe(seconds)
+
+    def count(self, name: str, value: int = 1):
+        """Увеличивает счетчик, например pages или reviews"""
+        with self._lock:
+            self._counters[name] += value
+
+    def set_gauge(self, name: str, value: float, **labels: str):
+        """Запоминает текущее значение, например лимит запросов для хоста"""
+        with self._lock:
+            self._gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Возвращает все метрики и скорость обхода словарем"""
+        with self._lock:
+            elapsed = max(time.monotonic() - self._started, 1e-9)
+            latency = {"host": {}, "proxy": {}}
+            for (kind, label), histogram in self._latency.items():
+                latency[kind][label] = histogram.to_dict()
+            return {
+                "timestamp": time.time(),
+                "elapsed_seconds": round(elapsed, 3),
+                "counters": dict(self._counters),
+                "pages_per_second": round(self._counters["pages"] / elapsed, 3),
+                "reviews_per_second": round(self._counters["reviews"] / elapsed, 3),
+                "request_latency_seconds": latency,
+                "responses": [
+                    {"host": host, "status": status, "count": count}
+                    for (host, status), count in self._statuses.items()
+                ],
+                "request_attempts": self._attempts.to_dict(),
+                "parse_seconds": self._parse.to_dict(),
+                "gauges": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in self._gauges.items()
+                ],
+            }
+
+    def to_prometheus(self) -> str:
+        """Возвращает метрики в текстовом формате Prometheus"""
+        snapshot = self.snapshot()
+        p = self.prefix
+        lines = []
+
+        def histogram(name: str, data: Dict[str, Any], labels: str = ""):
+            separator = "," if labels else ""
+            for bound, count in data["buckets"].items():
+                lines.append(
+                    f'{name}_bucket{{{labels}{separator}le="{bound}"}} {count}'
+                )
+            suffix = f"{{{labels}}}" if labels else ""
+            lines.append(f"{name}_sum{suffix} {data['sum']}")
+            lines.append(f"{name}_count{suffix} {data['count']}")
+
+        for kind, histograms in snapshot["request_latency_seconds"].items():
+            name = f"{p}_{kind}_request_latency_seconds"
+            lines.append(f"# TYPE {name} histogram")
+            for label, data in sorted(histograms.items()):
+                histogram(name, data, f'{kind}="{_escape(label)}"')
+        lines.append(f"# TYPE {p}_responses_total counter")
+        for item in snapshot["responses"]:
+            lines.append(
+                f'{p}_responses_total{{host="{_escape(item["host"])}",'
+                f'status="{item["status"]}"}} {item["count"]}'
+            )
+        lines.append(f"# TYPE {p}_request_attempts histogram")
+        histogram(f"{p}_request_attempts", snapshot["request_attempts"])
+        lines.append(f"# TYPE {p}_parse_seconds histogram")
+        histogram(f"{p}_parse_seconds", snapshot["parse_seconds"])
+        for name, value in sorted(snapshot["counters"].items()):
+            lines.append(f"# TYPE {p}_{name}_total counter")
+            lines.append(f"{p}_{name}_total {value}")
+        for name in ("pages_per_second", "reviews_per_second"):
+            lines.append(f"# TYPE {p}_{name} gauge")
+            lines.append(f"{p}_{name} {snapshot[name]}")
+        for name in sorted({gauge["name"] for gauge in snapshot["gauges"]}):
+            lines.append(f"# TYPE {p}_{name} gauge")
+            for gauge in snapshot["gauges"]:
+                if gauge["name"] != name:
+                    continue
+                labels = ",".join(
+                    f'{key}="{_escape(value)}"'
+                    for key, value in gauge["labels"].items()
+                )
+                suffix = f"{{{labels}}}" if labels else ""
+                lines.append(f"{p}_{name}{suffix} {gauge['value']}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, filename: str):
+        """Атомарно записывает снимок: .prom в формате Prometheus, иначе JSON"""
+        if filename.endswith(".prom"):
+            content = self.to_prometheus()
+        else:
+            content = json.dumps(self.snapshot(), ensure_ascii=False, indent=2)
+        tmp_filename = filename + ".tmp"
+        with open(tmp_filename, "w", encoding="utf-8") as file:
+            file.write(content)
+        os.replace(tmp_filename, filename)
+
+    def start_exporter(self, filename: Optional[str], interval: float = 30.0):
+        """Периодически сохраняет снимок в filename и еще раз при выходе"""
+        if filename is None:
+            return
+
+        def export_periodically():
+            while not self._stop.wait(interval):
+                self.export(filename)
+
+        threading.Thread(target=export_periodically, daemon=True).start()
+        atexit.register(self.export, filename)
+
+    def stop(self):
+        self._stop.set()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
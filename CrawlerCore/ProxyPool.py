@@ -0,0 +1,120 @@
+import random
+import threading
+import time
+from typing import Any, Dict, Iterable, Mapping, Optional, Union
+
+
+class ProxyStats:
+    def __init__(self):
+        self.latency: Optional[float] = None
+        self.success_rate = 1.0
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+
+
+class ProxyPool:
+    """Пул прокси с учётом их состояния.
+
+    Для каждого прокси хранится скользящее среднее задержки и доли успешных
+    запросов. Быстрые и надёжные прокси выбираются чаще, а после ошибки
+    прокси уходит на паузу, которая растёт экспоненциально с каждой
+    следующей ошибкой подряд и сбрасывается первым успешным запросом.
+
+    Если вместо списка передан словарь прокси и измеренных задержек
+    (как из файла, записанного proxy_test.py), средние начинаются с них,
+    и обход сразу отдает предпочтение быстрым прокси.
+    """
+
+    def __init__(
+        self,
+        proxies: Union[Iterable[str], Mapping[str, Optional[float]]],
+        alpha: float = 0.3,
+        base_cooldown: float = 5.0,
+        max_cooldown: float = 300.0,
+        default_latency: float = 1.0,
+    ):
+        self._stats = {proxy: ProxyStats() for proxy in proxies}
+        if isinstance(proxies, Mapping):
+            for proxy, latency in proxies.items():
+                self._stats[proxy].latency = latency
+        if not self._stats:
+            raise ValueError("Список прокси пуст")
+        self._alpha = alpha
+        self._base_cooldown = base_cooldown
+        self._max_cooldown = max_cooldown
+        self._default_latency = default_latency
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._stats)
+
+    def __iter__(self):
+        return iter(list(self._stats))
+
+    def acquire(self) -> str:
+        """Выбирает прокси: случайно с весом success_rate / latency среди
+        доступных, либо тот, чья пауза закончится раньше всех"""
+        now = time.monotonic()
+        with self._lock:
+            available = [
+                (proxy, stats)
+                for proxy, stats in self._stats.items()
+                if stats.cooldown_until <= now
+            ]
+            if not available:
+                return min(
+                    self._stats, key=lambda proxy: self._stats[proxy].cooldown_until
+                )
+            weights = [self._weight(stats) for _, stats in available]
+            return random.choices(available, weights=weights)[0][0]
+
+    def _weight(self, stats: ProxyStats) -> float:
+        latency = stats.latency if stats.latency is not None else self._default_latency
+        return max(stats.success_rate, 0.01) / max(latency, 0.001)
+
+    def report_success(self, proxy: str, latency: float):
+        """Учитывает успешный запрос через прокси"""
+        with self._lock:
+            stats = self._stats[proxy]
+            stats.latency = self._ema(stats.latency, latency)
+            stats.success_rate = self._ema(stats.success_rate, 1.0)
+            stats.successes += 1
+            stats.consecutive_failures = 0
+            stats.cooldown_until = 0.0
+
+    def report_failure(self, proxy: str, latency: Optional[float] = None):
+        """Учитывает ошибку прокси и отправляет его на паузу"""
+        with self._lock:
+            stats = self._stats[proxy]
+            if latency is not None:
+                stats.latency = self._ema(stats.latency, latency)
+            stats.success_rate = self._ema(stats.success_rate, 0.0)
+            stats.failures += 1
+            stats.consecutive_failures += 1
+            cooldown = min(
+                self._base_cooldown * 2 ** (stats.consecutive_failures - 1),
+                self._max_cooldown,
+            )
+            stats.cooldown_until = time.monotonic() + cooldown
+
+    def _ema(self, current: Optional[float], value: float) -> float:
+        if current is None:
+            return value
+        return self._alpha * value + (1 - self._alpha) * current
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Возвращает статистику по каждому прокси"""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                proxy: {
+                    "latency": stats.latency,
+                    "success_rate": round(stats.success_rate, 3),
+                    "successes": stats.successes,
+                    "failures": stats.failures,
+                    "cooldown": round(max(stats.cooldown_until - now, 0.0), 1),
+                }
+                for proxy, stats in self._stats.items()
+            }
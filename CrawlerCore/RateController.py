@@ -0,0 +1,179 @@
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+THROTTLE_STATUSES = (429, 503)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Разбирает заголовок Retry-After: секунды или HTTP-дата"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return max((moment - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+class HostLimit:
+    def __init__(self, limit: float, rate: float):
+        self.limit = limit
+        self.rate = rate
+        self.in_flight = 0
+        self.next_slot = 0.0
+        self.blocked_until = 0.0
+        self.last_decrease = 0.0
+        self.successes = 0
+        self.throttled = 0
+
+
+class RateController:
+    """Ограничение числа одновременных запросов и их частоты по хостам (AIMD).
+
+    Каждый успешный ответ понемногу увеличивает лимиты (на increase /
+    текущее значение, то есть примерно на increase за «окно» запросов), а ответ
+    429/503 или капча уменьшает их в backoff раз, не чаще раза в
+    decrease_interval секунд, чтобы один всплеск не обрушил лимит до
+    минимума. Retry-After блокирует хост до указанного времени.
+
+    Вызывающий занимает слот методом acquire (или aacquire в asyncio) и
+    обязательно освобождает его методом release с результатом запроса.
+    """
+
+    def __init__(
+        self,
+        initial_limit: float = 4,
+        max_limit: float = 32,
+        min_limit: float = 1,
+        initial_rate: float = 4.0,
+        max_rate: float = 50.0,
+        min_rate: float = 0.2,
+        increase: float = 1.0,
+        backoff: float = 0.5,
+        decrease_interval: float = 1.0,
+        max_retry_after: float = 300.0,
+        poll_interval: float = 0.05,
+    ):
+        self.initial_limit = initial_limit
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.initial_rate = initial_rate
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.increase = increase
+        self.backoff = backoff
+        self.decrease_interval = decrease_interval
+        self.max_retry_after = max_retry_after
+        self.poll_interval = poll_interval
+        self._hosts: Dict[str, HostLimit] = {}
+        self._condition = threading.Condition()
+
+    def _host(self, host: str) -> HostLimit:
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = HostLimit(self.initial_limit, self.initial_rate)
+        return state
+
+    def _reserve(self, host: str) -> float:
+        """Занимает слот и возвращает 0 либо возвращает время ожидания"""
+        now = time.monotonic()
+        state = self._host(host)
+        delay = max(state.blocked_until - now, state.next_slot - now)
+        if delay > 0:
+            return delay
+        if state.in_flight >= int(state.limit):
+            return self.poll_interval
+        state.in_flight += 1
+        state.next_slot = max(now, state.next_slot) + 1.0 / state.rate
+        return 0.0
+
+    def acquire(self, host: str):
+        """Ждет, пока хост разрешит еще один запрос"""
+        with self._condition:
+            while (delay := self._reserve(host)) > 0:
+                self._condition.wait(delay)
+
+    async def aacquire(self, host: str):
+        """Асинхронный вариант acquire"""
+        while True:
+            with self._condition:
+                delay = self._reserve(host)
+            if delay <= 0:
+                return
+            await asyncio.sleep(delay)
+
+    def release(
+        self,
+        host: str,
+        status: Optional[int] = None,
+        retry_after: Optional[float] = None,
+        throttled: bool = False,
+    ):
+        """Освобождает слот и подстраивает лимиты по результату запроса.
+
+        status=None означает сетевую ошибку: лимиты не меняются.
+        """
+        throttled = throttled or status in THROTTLE_STATUSES
+        with self._condition:
+            now = time.monotonic()
+            state = self._host(host)
+            state.in_flight -= 1
+            if throttled:
+                state.throttled += 1
+                if retry_after:
+                    state.blocked_until = max(
+                        state.blocked_until,
+                        now + min(retry_after, self.max_retry_after),
+                    )
+                if now - state.last_decrease >= self.decrease_interval:
+                    state.limit = max(self.min_limit, state.limit * self.backoff)
+                    state.rate = max(self.min_rate, state.rate * self.backoff)
+                    state.last_decrease = now
+                    logger.info(
+                        "Throttled by %s (status %s): limit %.1f, rate %.2f/s",
+                        host,
+                        status,
+                        state.limit,
+                        state.rate,
+                    )
+            elif status is not None and status < 400:
+                state.successes += 1
+                state.limit = min(
+                    self.max_limit, state.limit + self.increase / state.limit
+                )
+                state.rate = min(self.max_rate, state.rate + self.increase / state.rate)
+            self._condition.notify_all()
+
+    def limits(self, host: str) -> Tuple[float, float]:
+        """Текущий лимит одновременных запросов и частота для хоста"""
+        with self._condition:
+            state = self._host(host)
+            return state.limit, state.rate
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Возвращает лимиты и счетчики по каждому хосту"""
+        now = time.monotonic()
+        with self._condition:
+            return {
+                host: {
+                    "limit": round(state.limit, 2),
+                    "rate": round(state.rate, 2),
+                    "in_flight": state.in_flight,
+                    "successes": state.successes,
+                    "throttled": state.throttled,
+                    "blocked_for": round(max(state.blocked_until - now, 0.0), 1),
+                }
+                for host, state in self._hosts.items()
+            }
@@ -0,0 +1,186 @@
+import json
+import os
+import struct
+import sys
+from collections import OrderedDict
+from itertools import chain, islice
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+import zstandard
+
+MAGIC = b"RVWARCH1"
+FOOTER = struct.Struct("<Q8s")
+URL_KEY = "Ссылка на отзыв"
+
+
+def write_archive(
+    filename: str,
+    reviews: Iterable[Dict],
+    metadata: Optional[Dict[str, Any]] = None,
+    block_reviews: int = 16,
+    train_reviews: int = 10_000,
+    dict_size: int = 112_640,
+    level: int = 19,
+) -> Dict[str, Any]:
+    """Записывает отзывы в сжатый архив с доступом к отдельному отзыву.
+
+    Отзывы сжимаются блоками по block_reviews строк JSON, каждый блок
+    отдельным кадром zstd со словарем (не больше dict_size байт, 0 без
+    словаря), обученным на первых train_reviews отзывах, поэтому даже
+    маленькие блоки сжимаются почти как весь файл.
+    В конце файла лежит сжатый индекс: смещения блоков и номер блока и
+    строки для каждой ссылки на отзыв. Запись идет во временный файл,
+    который затем атомарно заменяет архив. Возвращает размеры для отчета.
+    """
+    lines = (
+        (review.get(URL_KEY), json.dumps(review, ensure_ascii=False).encode())
+        for review in reviews
+    )
+    head = list(islice(lines, train_reviews))
+    dictionary = b""
+    samples = [line for _, line in head]
+    # Словарь около 1/32 обучающих данных: больший словарь на малом
+    # архиве сам занимает больше места, чем экономит
+    dict_size = min(dict_size, sum(map(len, samples)) // 32)
+    if len(samples) >= 8 and dict_size >= 1024:
+        try:
+            dictionary = zstandard.train_dictionary(dict_size, samples).as_bytes()
+        except zstandard.ZstdError:
+            pass  # слишком мало или однообразные данные: блоки без словаря
+    compressor = zstandard.ZstdCompressor(
+        level=level,
+        dict_data=zstandard.ZstdCompressionDict(dictionary) if dictionary else None,
+    )
+
+    index = {"metadata": metadata or {}, "blocks": [], "reviews": {}}
+    raw_size = 0
+    tmp_filename = filename + ".tmp"
+    with open(tmp_filename, "wb") as file:
+        file.write(MAGIC)
+        index["dictionary"] = [file.tell(), len(dictionary)]
+        file.write(dictionary)
+        block = []
+
+        def write_block():
+            frame = compressor.compress(b"\n".join(block))
+            index["blocks"].append([file.tell(), len(frame)])
+            file.write(frame)
+            block.clear()
+
+        for url, line in chain(head, lines):
+            if url is not None:
+                index["reviews"][url] = [len(index["blocks"]), len(block)]
+            block.append(line)
+            raw_size += len(line) + 1
+            if len(block) >= block_reviews:
+                write_block()
+        if block:
+            write_block()
+        index_offset = file.tell()
+        file.write(
+            zstandard.ZstdCompressor(level=level).compress(
+                json.dumps(index, ensure_ascii=False).encode()
+            )
+        )
+        file.write(FOOTER.pack(index_offset, MAGIC))
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_filename, filename)
+    return {
+        "reviews": len(index["reviews"]),
+        "blocks": len(index["blocks"]),
+        "raw_bytes": raw_size,
+        "dictionary_bytes": len(dictionary),
+        "archive_bytes": os.path.getsize(filename),
+    }
+
+
+class ReviewArchive:
+    """Читает архив write_archive: индекс загружается при открытии, а
+    отзыв по ссылке читается одним seek и распаковкой одного блока.
+    Последние cache_blocks распакованных блоков держатся в памяти."""
+
+    def __init__(self, filename: str, cache_blocks: int = 8):
+        self.filename = filename
+        self.cache_blocks = cache_blocks
+        self._file = open(filename, "rb")
+        self._file.seek(-FOOTER.size, os.SEEK_END)
+        footer_offset = self._file.tell()
+        index_offset, magic = FOOTER.unpack(self._file.read(FOOTER.size))
+        if magic != MAGIC:
+            self._file.close()
+            raise ValueError(f"Файл {filename} не является архивом отзывов")
+        index = json.loads(
+            zstandard.ZstdDecompressor().decompress(
+                self._read(index_offset, footer_offset - index_offset)
+            )
+        )
+        self.metadata: Dict[str, Any] = index["metadata"]
+        self._blocks = index["blocks"]
+        self._reviews: Dict[str, list] = index["reviews"]
+        dictionary = self._read(*index["dictionary"])
+        self._decompressor = zstandard.ZstdDecompressor(
+            dict_data=zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+        )
+        self._cache: OrderedDict[int, list[bytes]] = OrderedDict()
+
+    def _read(self, offset: int, length: int) -> bytes:
+        self._file.seek(offset)
+        return self._file.read(length)
+
+    def _block(self, number: int) -> list[bytes]:
+        lines = self._cache.get(number)
+        if lines is not None:
+            self._cache.move_to_end(number)
+            return lines
+        lines = self._decompressor.decompress(self._read(*self._blocks[number]))
+        lines = lines.split(b"\n")
+        if self.cache_blocks:
+            self._cache[number] = lines
+            if len(self._cache) > self.cache_blocks:
+                self._cache.popitem(last=False)
+        return lines
+
+    def __len__(self) -> int:
+        return len(self._reviews)
+
+    def __contains__(self, review_url: str) -> bool:
+        return review_url in self._reviews
+
+    def urls(self) -> Iterator[str]:
+        return iter(self._reviews)
+
+    def get(self, review_url: str) -> Optional[Dict]:
+        """Возвращает отзыв по ссылке или None"""
+        position = self._reviews.get(review_url)
+        if position is None:
+            return None
+        block, line = position
+        return json.loads(self._block(block)[line])
+
+    def iter_reviews(self) -> Iterator[Dict]:
+        """Возвращает все отзывы в порядке записи"""
+        for number in range(len(self._blocks)):
+            for line in self._block(number):
+                yield json.loads(line)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self) -> "ReviewArchive":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+if __name__ == "__main__":
+    source = sys.argv[1] if len(sys.argv) > 1 else "reviews.json"
+    archive = sys.argv[2] if len(sys.argv) > 2 else source + ".zst"
+    with open(source, encoding="utf-8") as file:
+        data = json.load(file)
+    stats = write_archive(archive, data["reviews"], data["metadata"])
+    print(
+        f"{stats['reviews']} отзывов: {stats['raw_bytes'] / 2**10:.1f} КиБ -> "
+        f"{stats['archive_bytes'] / 2**10:.1f} КиБ в {archive}"
+    )
@@ -0,0 +1,149 @@
+import atexit
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterator, List
+
+
+class SQLiteSaver:
+    """Сохраняет отзывы в базу SQLite.
+
+    Ссылка на отзыв уникальна, поэтому проверка дубликатов идёт по индексу,
+    а повторная вставка того же отзыва из другого процесса игнорируется.
+    База работает в режиме WAL, отзывы вставляются пачками по batch_size
+    в одной транзакции.
+    """
+
+    def __init__(self, filename: str = "reviews.sqlite", batch_size: int = 50):
+        self.filename = filename
+        self.batch_size = batch_size
+        self._connection = sqlite3.connect(
+            filename, timeout=30, check_same_thread=False
+        )
+        self._lock = threading.RLock()
+        self._pending: List[Dict] = []
+        self._pending_urls = set()
+        self._flush_count = 0
+        self._closed = False
+        self.load_existing_data()
+        atexit.register(self.close)
+
+    def load_existing_data(self):
+        """Создает таблицу и индексы, если их еще нет"""
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.execute("""
+                CREATE TABLE IF NOT EXISTS reviews (
+                    id INTEGER PRIMARY KEY,
+                    "Ссылка на отзыв" TEXT NOT NULL,
+                    service_url TEXT,
+                    "Дата" TEXT,
+                    collected_at TEXT NOT NULL,
+                    data TEXT NOT NULL
+                )
+                """)
+            self._connection.execute(
+                'CREATE UNIQUE INDEX IF NOT EXISTS reviews_url ON reviews ("Ссылка на отзыв")'
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS reviews_service_url ON reviews (service_url)"
+            )
+            self._connection.execute(
+                'CREATE INDEX IF NOT EXISTS reviews_date ON reviews ("Дата")'
+            )
+
+    def save_review(self, service_url: str, review_data: Dict):
+        """Сохраняет отзыв"""
+        review_data["service_url"] = service_url
+
+        review_data["collected_at"] = datetime.now().isoformat()
+
+        with self._lock:
+            self._pending.append(review_data)
+            self._pending_urls.add(review_data["Ссылка на отзыв"])
+            if len(self._pending) >= self.batch_size:
+                self.flush()
+
+    def flush(self):
+        """Вставляет накопленные отзывы одной транзакцией"""
+        with self._lock:
+            if not self._pending:
+                return
+            with self._connection:
+                self._connection.executemany(
+                    'INSERT OR IGNORE INTO reviews ("Ссылка на отзыв", service_url, '
+                    '"Дата", collected_at, data) VALUES (?, ?, ?, ?, ?)',
+                    [
+                        (
+                            review["Ссылка на отзыв"],
+                            review["service_url"],
+                            review.get("Дата"),
+                            review["collected_at"],
+                            json.dumps(review, ensure_ascii=False),
+                        )
+                        for review in self._pending
+                    ],
+                )
+            self._pending.clear()
+            self._pending_urls.clear()
+            self._flush_count += 1
+
+    def flush_state(self) -> tuple[int, int]:
+        """Число выполненных сбросов и отзывов, еще не записанных в базу"""
+        with self._lock:
+            return self._flush_count, len(self._pending)
+
+    def has_review(self, review_url: str) -> bool:
+        """Проверяет, сохранен ли отзыв, по уникальному индексу"""
+        with self._lock:
+            if review_url in self._pending_urls:
+                return True
+            row = self._connection.execute(
+                'SELECT 1 FROM reviews WHERE "Ссылка на отзыв" = ?', (review_url,)
+            ).fetchone()
+        return row is not None
+
+    def processed_reviews(self) -> "ProcessedReviews":
+        """Возвращает множество обработанных ссылок поверх индекса"""
+        return ProcessedReviews(self)
+
+    def iter_reviews(self) -> Iterator[Dict]:
+        """Возвращает сохраненные отзывы в порядке вставки"""
+        self.flush()
+        cursor = self._connection.cursor()
+        for (data,) in cursor.execute("SELECT data FROM reviews ORDER BY id"):
+            yield json.loads(data)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Возвращает статистику по сохраненным данным"""
+        self.flush()
+        with self._lock:
+            total_reviews, last_update = self._connection.execute(
+                "SELECT COUNT(*), MAX(collected_at) FROM reviews"
+            ).fetchone()
+        return {"total_reviews": total_reviews, "last_update": last_update}
+
+    def close(self):
+        """Записывает остаток пачки и закрывает базу"""
+        with self._lock:
+            if self._closed:
+                return
+            self.flush()
+            self._connection.close()
+            self._closed = True
+
+
+class ProcessedReviews:
+    """Множество обработанных ссылок, которое проверяется запросом к базе
+    вместо загрузки всех отзывов в память"""
+
+    def __init__(self, saver: SQLiteSaver):
+        self._saver = saver
+
+    def __contains__(self, review_url: str) -> bool:
+        return self._saver.has_review(review_url)
+
+    def add(self, review_url: str):
+        """Отзыв уже добавлен в базу через save_review"""
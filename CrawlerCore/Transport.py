@@ -0,0 +1,78 @@
+import threading
+from typing import Any, Dict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class Transport:
+    """Транспорт с отдельной сессией на каждый прокси.
+
+    Сессия держит пул keep-alive соединений через свой прокси, поэтому
+    повторные запросы не платят за новое TCP/TLS-рукопожатие. Число новых и
+    переиспользованных соединений берётся из счётчиков пулов urllib3.
+    """
+
+    def __init__(self, pool_size: int = 10, pool_connections: int = 10):
+        self._pool_size = pool_size
+        self._pool_connections = pool_connections
+        self._sessions: Dict[str, requests.Session] = {}
+        self._lock = threading.Lock()
+
+    def session_for(self, proxy: str) -> requests.Session:
+        """Возвращает сессию для прокси, создавая её при первом обращении"""
+        with self._lock:
+            session = self._sessions.get(proxy)
+            if session is None:
+                session = requests.Session()
+                # Иначе HTTP_PROXY/HTTPS_PROXY из окружения перекрывают прокси
+                # пула, и здоровье и лимиты считаются не тому прокси
+                session.trust_env = False
+                adapter = HTTPAdapter(
+                    pool_connections=self._pool_connections,
+                    pool_maxsize=self._pool_size,
+                )
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.proxies = {"http": proxy, "https": proxy}
+                self._sessions[proxy] = session
+            return session
+
+    def get(self, url: str, proxy: str, **kwargs) -> requests.Response:
+        """Выполняет GET-запрос через сессию указанного прокси"""
+        return self.session_for(proxy).get(url, **kwargs)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Возвращает число запросов, новых и переиспользованных соединений"""
+        with self._lock:
+            sessions = list(self._sessions.values())
+        total_requests = 0
+        new_connections = 0
+        for session in sessions:
+            for pool in self._connection_pools(session):
+                total_requests += pool.num_requests
+                new_connections += pool.num_connections
+        return {
+            "sessions": len(sessions),
+            "requests": total_requests,
+            "new_connections": new_connections,
+            "reused_connections": max(total_requests - new_connections, 0),
+        }
+
+    @staticmethod
+    def _connection_pools(session: requests.Session):
+        adapters = {id(adapter): adapter for adapter in session.adapters.values()}
+        for adapter in adapters.values():
+            managers = [adapter.poolmanager, *adapter.proxy_manager.values()]
+            for manager in managers:
+                for key in list(manager.pools.keys()):
+                    pool = manager.pools.get(key)
+                    if pool is not None:
+                        yield pool
+
+    def close(self):
+        """Закрывает все сессии и их соединения"""
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
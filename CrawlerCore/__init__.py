@@ -0,0 +1,2 @@
+"""Общий код парсеров отзывов: загрузка через прокси, лимиты хостов,
+хранилища, frontier и метрики"""
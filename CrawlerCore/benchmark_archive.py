@@ -0,0 +1,128 @@
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import zstandard
+
+from .ReviewArchive import ReviewArchive, write_archive
+
+URL_KEY = "Ссылка на отзыв"
+
+
+def percentile(values: list[float], share: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def measure_reads(archive_file: str, urls: list[str]) -> dict:
+    """Открытие архива и чтение отзывов по ссылкам без кэша блоков, то
+    есть каждое чтение распаковывает блок заново"""
+    start = time.perf_counter()
+    archive = ReviewArchive(archive_file, cache_blocks=0)
+    opened = time.perf_counter() - start
+    latencies = []
+    with archive:
+        for url in urls:
+            start = time.perf_counter()
+            review = archive.get(url)
+            latencies.append(time.perf_counter() - start)
+            assert review[URL_KEY] == url
+    return {
+        "open": opened,
+        "p50": statistics.median(latencies),
+        "p99": percentile(latencies, 0.99),
+    }
+
+
+def measure_whole(filename: str, load, url: str) -> float:
+    """Время, за которое без индекса находится один отзыв: весь файл
+    читается и разбирается"""
+    start = time.perf_counter()
+    reviews = load(filename)
+    next(review for review in reviews if review[URL_KEY] == url)
+    return time.perf_counter() - start
+
+
+def load_json(filename: str) -> list:
+    with open(filename, encoding="utf-8") as file:
+        return json.load(file)["reviews"]
+
+
+def load_zstd(filename: str) -> list:
+    with open(filename, "rb") as file:
+        return json.loads(zstandard.ZstdDecompressor().decompress(file.read()))[
+            "reviews"
+        ]
+
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(
+        description="Степень сжатия и задержка чтения одного отзыва из архива"
+    )
+    argparser.add_argument("--source", default="reviews.json")
+    argparser.add_argument("--reads", type=int, default=2000)
+    argparser.add_argument("--level", type=int, default=19)
+    argparser.add_argument("--seed", type=int, default=0)
+    args = argparser.parse_args()
+
+    with open(args.source, encoding="utf-8") as file:
+        data = json.load(file)
+    reviews = data["reviews"]
+    urls = [review[URL_KEY] for review in reviews]
+    generator = random.Random(args.seed)
+    sample = [generator.choice(urls) for _ in range(args.reads)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        json_file = os.path.join(directory, "reviews.json")
+        with open(json_file, "w", encoding="utf-8") as file:
+            json.dump(data, file, ensure_ascii=False, indent=2)
+        json_size = os.path.getsize(json_file)
+        zstd_file = os.path.join(directory, "reviews.json.zst")
+        with open(json_file, "rb") as source, open(zstd_file, "wb") as target:
+            target.write(
+                zstandard.ZstdCompressor(level=args.level).compress(source.read())
+            )
+
+        print(f"Отзывов: {len(reviews)}, JSON {json_size / 2**10:.1f} КиБ")
+        for name, filename, load in (
+            ("JSON", json_file, load_json),
+            ("JSON.zst целиком", zstd_file, load_zstd),
+        ):
+            size = os.path.getsize(filename)
+            seconds = measure_whole(filename, load, sample[0])
+            print(
+                f"{name}: {size / 2**10:.1f} КиБ, сжатие {json_size / size:.2f}x, "
+                f"поиск одного отзыва {seconds * 1000:.2f} мс"
+            )
+
+        for dict_size, block_reviews in (
+            (0, 1),
+            (0, 16),
+            (112_640, 1),
+            (112_640, 4),
+            (112_640, 16),
+            (112_640, 64),
+        ):
+            archive_file = os.path.join(directory, "reviews.zst")
+            stats = write_archive(
+                archive_file,
+                reviews,
+                data["metadata"],
+                block_reviews=block_reviews,
+                dict_size=dict_size,
+                level=args.level,
+            )
+            reads = measure_reads(archive_file, sample)
+            size = stats["archive_bytes"]
+            print(
+                f"архив, словарь {stats['dictionary_bytes'] / 2**10:.1f} КиБ, "
+                f"блок {block_reviews}: {size / 2**10:.1f} КиБ, "
+                f"сжатие {json_size / size:.2f}x, "
+                f"открытие {reads['open'] * 1000:.2f} мс, "
+                f"чтение отзыва p50 {reads['p50'] * 1e6:.0f} мкс, "
+                f"p99 {reads['p99'] * 1e6:.0f} мкс"
+            )
@@ -0,0 +1,83 @@
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from .DedupIndex import DedupIndex
+
+
+def make_urls(count: int, offset: int = 0) -> list[str]:
+    return [
+        f"https://otzovik.com/review_{i}.html" for i in range(offset, offset + count)
+    ]
+
+
+def measure(build):
+    """Возвращает результат build, время и память, оставшуюся занятой"""
+    start = time.perf_counter()
+    build()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    result = build()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, elapsed, memory
+
+
+def lookups_per_second(index, urls: list[str]) -> float:
+    start = time.perf_counter()
+    for url in urls:
+        _ = url in index
+    return len(urls) / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    probes = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000
+
+    urls = make_urls(count)
+    unseen = make_urls(probes, offset=count)
+    sample = urls[:: max(1, count // probes)]
+
+    url_set, set_seconds, set_memory = measure(lambda: set(make_urls(count)))
+
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "reviews.jsonl")
+        open(source, "w").close()
+        filename = source + ".idx"
+
+        def rebuild():
+            index = DedupIndex(filename, source)
+            index.rebuild(urls)
+            index.close()
+
+        def load():
+            index = DedupIndex(filename, source)
+            return index if index.load() else None
+
+        _, rebuild_seconds, _ = measure(rebuild)
+        index, load_seconds, index_memory = measure(load)
+        if index is None:
+            sys.exit("Индекс не загрузился")
+        false_positives = sum(url in index for url in unseen)
+        missed = sum(url not in index for url in sample)
+
+        print(f"URL: {count}, проверок: {probes}")
+        print(
+            f"set[str]:   построение {set_seconds:.3f} с, "
+            f"память {set_memory / 2**20:.1f} МиБ, "
+            f"{lookups_per_second(url_set, unseen):,.0f} проверок/с"
+        )
+        print(
+            f"DedupIndex: построение {rebuild_seconds:.3f} с, "
+            f"загрузка {load_seconds * 1000:.2f} мс, "
+            f"файл в mmap {os.path.getsize(filename) / 2**20:.1f} МиБ, "
+            f"память кучи {index_memory / 2**20:.2f} МиБ, "
+            f"{lookups_per_second(index, unseen):,.0f} проверок/с"
+        )
+        print(
+            f"Ложных срабатываний: {false_positives} из {probes} "
+            f"(ожидается {count * probes / 2**64:.2e}), пропусков: {missed}"
+        )
+        index.close()
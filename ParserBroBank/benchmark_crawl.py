@@ -0,0 +1,157 @@
+import argparse
+import atexit
+import functools
+import logging
+import os
+import re
+import shutil
+import tempfile
+import time
+from typing import Optional
+from urllib.parse import urlsplit
+
+from CrawlerCore.BenchmarkSite import add_site_arguments, report, site_from_args
+from CrawlerCore.Metrics import setup_logging
+from .parser import Parser
+
+BANK_PATH = re.compile(r"banki/(?P<bank>[\w-]+)/comments/(?P<rest>.*)")
+
+COMMENT = """<li class="comment depth-1"><article class="comment" id="c{number}">
+<header><cite><b>Автор {number}</b></cite>
+<a href="{page_url}#comment-{number}">
+<time datetime="2025-09-{day:02d}T08:06:38+03:00">{day} сентября</time></a></header>
+<div class="after-header"><div class="title_review"> Заголовок {number} </div></div>
+<div class="new-card__rating">
+<span class="new-card__rating_num" data-count="{rating}"></span></div>
+<section class="comment-content comment"><p>{text}</p></section>
+<div class="score-comment"><span class="score-num">{likes}</span></div>
+<ul class="children"><li class="depth-2"><article class="comment">
+<header><cite><b>Ответ</b></cite></header></article></li></ul>
+</article></li>"""
+
+
+def filler(kib: int) -> str:
+    """Разметка без отзывов, которая доводит страницу до размера настоящей"""
+    block = '<div class="sidebar-item"><a href="/banki/x/">Ссылка</a></div>\n'
+    return block * (kib * 1024 // len(block.encode()))
+
+
+def render(layout: dict, base_url: str, path: str) -> Optional[str]:
+    """Строит страницу отзывов по пути запроса или возвращает None (404)"""
+    match = BANK_PATH.fullmatch(urlsplit(path).path.lstrip("/"))
+    if match is None:
+        return None
+    rest = match["rest"].strip("/")
+    if not rest:
+        page = 1
+    elif rest.startswith("page/") and rest.removeprefix("page/").isdigit():
+        page = int(rest.removeprefix("page/"))
+    else:
+        return None
+    return comments_page(layout, bank_url(base_url, match["bank"]), page)
+
+
+def bank_url(base_url: str, bank: str) -> str:
+    return f"{base_url}banki/{bank}/comments/"
+
+
+def page_url(bank_url: str, page: int) -> str:
+    if page == 1:
+        return bank_url
+    return f"{bank_url}page/{page}/"
+
+
+def comments_page(layout: dict, bank_url: str, page: int) -> Optional[str]:
+    if page > layout["pages"]:
+        return None
+    comments = "".join(
+        COMMENT.format(
+            number=number,
+            page_url=page_url(bank_url, page),
+            day=number % 28 + 1,
+            rating=number % 5 + 1,
+            text=f"Текст &laquo;отзыва&raquo; {number}<br>строка. " * 20,
+            likes=number % 7,
+        )
+        for number in range((page - 1) * layout["per_page"], page * layout["per_page"])
+    )
+    navigation = (
+        f'<a class="next page-numbers" href="{page_url(bank_url, page + 1)}">»</a>'
+        if page < layout["pages"]
+        else ""
+    )
+    return (
+        f"<html><body><ol>{comments}</ol>"
+        f'<div class="navigation"><div class="navigation__list">'
+        f"<span>{page}</span>{navigation}</div></div>"
+        f'{filler(layout["filler_kib"])}</body></html>'
+    )
+
+
+def count_reviews(filename: str) -> int:
+    if not os.path.exists(filename):
+        return 0
+    with open(filename, "rb") as file:
+        return sum(1 for line in file if line.strip())
+
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(
+        description="Замер скорости обхода brobank на локальной копии сайта"
+    )
+    argparser.add_argument(
+        "--mode",
+        choices=("prefetch", "sequential"),
+        default="prefetch",
+        help="загружать следующую страницу во время разбора текущей или после",
+    )
+    argparser.add_argument("--banks", type=int, default=1)
+    argparser.add_argument("--pages", type=int, default=30)
+    argparser.add_argument("--per-page", type=int, default=20)
+    argparser.add_argument("--filler-kib", type=int, default=60)
+    argparser.add_argument("--concurrency", type=int, default=16)
+    argparser.add_argument("--per-host-limit", type=int, default=8)
+    argparser.add_argument("--verbose", action="store_true")
+    add_site_arguments(argparser)
+    args = argparser.parse_args()
+    setup_logging(logging.INFO if args.verbose else logging.ERROR)
+
+    layout = {
+        "pages": args.pages,
+        "per_page": args.per_page,
+        "filler_kib": args.filler_kib,
+    }
+    # Папка удаляется при выходе после того, как хранилище допишет метаданные
+    directory = tempfile.mkdtemp(prefix="brobank-bench-")
+    atexit.register(shutil.rmtree, directory, True)
+    with site_from_args(functools.partial(render, layout), args) as site:
+        site.write_proxies(os.path.join(directory, "proxies.txt"))
+        output_file = os.path.join(directory, "reviews.jsonl")
+        cwd = os.getcwd()
+        os.chdir(directory)  # set_proxy читает proxies.txt из текущей папки
+        try:
+            parser = Parser(
+                [
+                    bank_url(site.base_url, f"bank{number}")
+                    for number in range(args.banks)
+                ],
+                output_file,
+                concurrency=args.concurrency,
+                per_host_limit=args.per_host_limit,
+                state_file=os.path.join(directory, "crawl_state.json"),
+                frontier_file=None,
+                prefetch=args.mode == "prefetch",
+            )
+        finally:
+            os.chdir(cwd)
+        start = time.perf_counter()
+        parser.get_reviews()
+        seconds = time.perf_counter() - start
+        report(
+            f"brobank/{args.mode}",
+            count_reviews(output_file),
+            seconds,
+            site.stats(),
+            vars(args),
+            args.output,
+        )
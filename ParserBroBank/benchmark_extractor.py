@@ -0,0 +1,89 @@
+import glob
+import os
+import sys
+import time
+
+from bs4 import BeautifulSoup
+import lxml
+from .benchmark_crawl import bank_url, comments_page
+from .extractors import extract_comment, extract_comments_page
+
+
+def extract_page_bs4(html: str) -> tuple[list[dict], object]:
+    """Прежняя реализация разбора страницы get_reviews на BeautifulSoup"""
+    soup = BeautifulSoup(html, "lxml")
+    next_page = soup.select_one("div.navigation__list").select_one(
+        "a.next.page-numbers"
+    )
+    results = []
+    for review in soup.select("li.depth-1 > article.comment:not(.bro-author)"):
+        result_dict = {}
+        review_url = review.find("a", {"href": True})["href"]
+        result_dict["Логин"] = review.select_one("header > cite > b").get_text()
+        result_dict["Дата"] = review.select_one("header > a > time")["datetime"]
+        general_impression = review.select_one("div.after-header > div.title_review")
+        if general_impression is not None:
+            result_dict["Общее впечатление"] = general_impression.get_text().strip()
+        else:
+            result_dict["Общее впечатление"] = None
+        score = review.select_one("div.new-card__rating > span.new-card__rating_num")
+        if score is not None:
+            result_dict["Оценка"] = int(score["data-count"])
+        else:
+            result_dict["Оценка"] = None
+        result_dict["Отзыв"] = review.select_one(
+            "section.comment-content.comment > p"
+        ).get_text()
+        result_dict["Лайки"] = int(
+            review.select_one("div.score-comment > span.score-num").get_text()
+        )
+        result_dict["Ссылка на отзыв"] = review_url
+        results.append(result_dict)
+    return results, next_page["href"] if next_page is not None else None
+
+
+def extract_page_lxml(html: str) -> tuple[list[dict], object]:
+    comments, next_page = extract_comments_page(html)
+    return [
+        extract_comment(comment, review_url) for review_url, comment in comments
+    ], next_page
+
+
+def sample_pages(count: int = 10, filler_kib: int = 60) -> list[str]:
+    """Страницы отзывов по шаблону локального сайта из benchmark_crawl"""
+    layout = {"pages": count, "per_page": 10, "filler_kib": filler_kib}
+    url = bank_url("https://brobank.ru/", "bench-bank")
+    return [comments_page(layout, url, page) for page in range(1, count + 1)]
+
+
+def benchmark(extract, pages: list[str], repeat: int) -> float:
+    """Возвращает число отзывов в секунду"""
+    reviews = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for html in pages:
+            reviews += len(extract(html)[0])
+    return reviews / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    html_dir = sys.argv[1] if len(sys.argv) > 1 else "html"
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    pages = []
+    for filename in sorted(glob.glob(os.path.join(html_dir, "comments_*.html"))):
+        with open(filename, encoding="utf-8") as file:
+            pages.append(file.read())
+    if not pages:
+        print(f"В каталоге {html_dir} нет страниц comments_*.html, берутся шаблонные")
+        pages = sample_pages()
+
+    for number, html in enumerate(pages):
+        if extract_page_lxml(html) != extract_page_bs4(html):
+            sys.exit(f"Результаты различаются на странице {number}")
+
+    bs4_speed = benchmark(extract_page_bs4, pages, repeat)
+    lxml_speed = benchmark(extract_page_lxml, pages, repeat)
+    print(f"Страниц: {len(pages)}, повторов: {repeat}")
+    print(f"BeautifulSoup: {bs4_speed:.1f} отзывов/с")
+    print(f"lxml XPath:    {lxml_speed:.1f} отзывов/с ({lxml_speed / bs4_speed:.1f}x)")
@@ -0,0 +1,59 @@
+from typing import Optional
+
+import lxml.html
+from lxml import etree
+from CrawlerCore.FieldExtractor import Field, FieldExtractor, has_class
+
+COMMENTS = etree.XPath(
+    f"//li{has_class('depth-1')}/article{has_class('comment')}"
+    f"[not(self::*{has_class('bro-author')})]"
+)
+REVIEW_URL = etree.XPath("(.//a[@href])[1]/@href")
+NEXT_PAGE = etree.XPath(
+    f"(//div{has_class('navigation__list')})[1]"
+    f"//a{has_class('next', 'page-numbers')}[@href]/@href"
+)
+
+COMMENT = FieldExtractor(
+    [
+        Field("Логин", ".//header/cite/b"),
+        Field("Дата", ".//header/a/time", attribute="datetime"),
+        Field(
+            "Общее впечатление",
+            f".//div{has_class('after-header')}/div{has_class('title_review')}",
+            convert=str.strip,
+            required=False,
+        ),
+        Field(
+            "Оценка",
+            f".//div{has_class('new-card__rating')}"
+            f"/span{has_class('new-card__rating_num')}",
+            attribute="data-count",
+            convert=int,
+            required=False,
+        ),
+        Field("Отзыв", f".//section{has_class('comment-content', 'comment')}/p"),
+        Field(
+            "Лайки",
+            f".//div{has_class('score-comment')}/span{has_class('score-num')}",
+            convert=int,
+        ),
+        Field("Ссылка на отзыв"),
+    ]
+)
+
+
+def extract_comments_page(
+    html: str,
+) -> tuple[list[tuple[str, etree._Element]], Optional[str]]:
+    """Возвращает комментарии страницы вместе с их ссылками
+    и ссылку на следующую страницу"""
+    tree = lxml.html.document_fromstring(html)
+    comments = [(str(REVIEW_URL(comment)[0]), comment) for comment in COMMENTS(tree)]
+    next_page = NEXT_PAGE(tree)
+    return comments, str(next_page[0]) if next_page else None
+
+
+def extract_comment(comment: etree._Element, review_url: str) -> dict:
+    """Извлекает поля отзыва из элемента комментария"""
+    return COMMENT.extract(comment, {"Ссылка на отзыв": review_url})
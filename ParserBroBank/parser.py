@@ -1,184 +1,329 @@
-from JSONSaver import JSONSaver
-from typing import Optional
+from CrawlerCore.JSONSaver import JSONSaver
+from CrawlerCore.JSONLSaver import JSONLSaver
+from CrawlerCore.SQLiteSaver import SQLiteSaver
+from CrawlerCore.FetchCore import FetchCore, read_proxy_file
+from CrawlerCore.Fetcher import Fetcher
+from CrawlerCore.Frontier import Frontier, FAILED, FETCHED, PARSED
+from CrawlerCore.CrawlState import CrawlState
+from CrawlerCore.Metrics import Metrics, setup_logging
+from urllib.parse import urlsplit
+from typing import Iterator, Mapping, Optional, Sequence, Union
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import os
+import threading
 import requests
-from itertools import cycle
-from fake_useragent import FakeUserAgent
-import lxml
-from bs4 import BeautifulSoup
+import time
+from lxml import etree
+from .extractors import extract_comment, extract_comments_page
+
+logger = logging.getLogger("ParserBroBank")
+
+
+def bank_slug(bank_url: str) -> str:
+    """Название банка в ссылке: .../banki/<slug>/comments/"""
+    parts = [part for part in urlsplit(bank_url).path.split("/") if part]
+    if "comments" in parts and parts.index("comments") > 0:
+        return parts[parts.index("comments") - 1]
+    return parts[-1] if parts else urlsplit(bank_url).netloc
 
 
 class Parser:
-    def __init__(self, base_url, output_file, max_retries=10, request_timeout=7):
-        self.base_url = base_url
+    def __init__(
+        self,
+        banks: Union[str, Sequence[str], Mapping[str, str]],
+        output_file,
+        max_retries=10,
+        request_timeout=7,
+        pool_size=10,
+        concurrency: int = 16,
+        per_host_limit: int = 8,
+        incremental: bool = False,
+        known_pages: int = 2,
+        state_file: str = "crawl_state.json",
+        frontier_file: Optional[str] = "frontier.sqlite",
+        metrics_file: Optional[str] = None,
+        metrics_interval: float = 30.0,
+        prefetch: bool = True,
+        fetch_core: Optional[FetchCore] = None,
+    ):
+        self.banks = self.bank_urls(banks)
         self.output_file = output_file
-        self._saver = JSONSaver(output_file)
-        self._max_retries = max_retries
-        self._request_timeout = request_timeout
+        self._savers = self.make_savers(output_file, self.banks)
         self._processed_reviews = self.load_reviews_from_saver()
-        self._proxy_list = cycle(self.set_proxy())
-        self._ua = FakeUserAgent()
+        self._concurrency = concurrency
+        self._global_limit = threading.BoundedSemaphore(concurrency)
+        self._save_lock = threading.Lock()
+        self._incremental = incremental
+        self._known_pages = known_pages
+        self._state = CrawlState(state_file)
+        self._frontier = Frontier(frontier_file) if frontier_file is not None else None
+        self.metrics = Metrics("brobank")
+        self.metrics.start_exporter(metrics_file, metrics_interval)
+        # Все банки на одном хосте: запросов одновременно не больше
+        # per_host_limit, пока AIMD не поднимет лимит до concurrency
+        self._fetcher = Fetcher.create(
+            "brobank",
+            self.metrics,
+            self.set_proxy,
+            fetch_core,
+            concurrency,
+            per_host_limit,
+            pool_size,
+            max_retries=max_retries,
+            request_timeout=request_timeout,
+        )
+        self.prefetch = prefetch
+
+    @staticmethod
+    def make_saver(output_file: str):
+        """Выбирает хранилище по расширению файла"""
+        if output_file.endswith(".jsonl"):
+            return JSONLSaver(output_file)
+        if output_file.endswith((".sqlite", ".sqlite3", ".db")):
+            return SQLiteSaver(output_file)
+        return JSONSaver(output_file)
+
+    @staticmethod
+    def bank_urls(
+        banks: Union[str, Sequence[str], Mapping[str, str]],
+    ) -> dict[str, str]:
+        """Приводит банки к словарю название -> ссылка на комментарии;
+        для ссылок без названия берется имя банка из ссылки"""
+        if isinstance(banks, str):
+            banks = [banks]
+        if isinstance(banks, Mapping):
+            return dict(banks)
+        return {bank_slug(bank_url): bank_url for bank_url in banks}
 
-    def load_reviews_from_saver(self) -> set:
-        processed = set()
-        for review in self._saver.data.get("reviews", []):
-            processed.add(review["Ссылка на отзыв"])
-        return processed
+    @classmethod
+    def make_savers(cls, output_file: str, banks: Mapping[str, str]) -> dict:
+        """Одно общее хранилище или, если в имени файла есть {bank},
+        отдельное хранилище для каждого банка"""
+        if "{bank}" not in output_file:
+            saver = cls.make_saver(output_file)
+            return {bank: saver for bank in banks}
+        return {
+            bank: cls.make_saver(output_file.format(bank=bank_slug(bank_url)))
+            for bank, bank_url in banks.items()
+        }
+
+    def load_reviews_from_saver(self) -> dict:
+        """Ссылки на сохраненные отзывы для каждого банка; у банков с
+        общим хранилищем общий набор ссылок"""
+        processed = {}
+        for saver in self._savers.values():
+            if id(saver) not in processed:
+                processed[id(saver)] = saver.processed_reviews()
+        return {bank: processed[id(saver)] for bank, saver in self._savers.items()}
 
     def make_request(self, url: str) -> Optional[requests.Response]:
         """Выполняет HTTP-запрос с использованием прокси"""
-        headers = {"User-Agent": self._ua.random}
-        for _ in range(self._max_retries):
-            proxy = next(self._proxy_list)
-            proxies = {"http": proxy, "https": proxy}
-            try:
-                response = requests.get(
-                    url,
-                    headers=headers,
-                    proxies=proxies,
-                    timeout=self._request_timeout,
-                )
-                print(
-                    f"Requested with {proxy}, URL: {url}, status_code: {response.status_code}"
-                )
-                if response.status_code == 200:
-                    return response
-            except requests.exceptions.RequestException as e:
-                print("\033[91m" + f"Request Error: {url} {e}" + "\033[0m")
-        return None
+        return self._fetcher.make_request(url, limit=self._global_limit)
 
     @classmethod
-    def set_proxy(cls):
-        proxy_list = []
-        with open("proxies.txt", encoding="utf-8") as file:
-            for line in file:
-                proxy = line.rstrip().split(":")
-                if len(proxy) == 4:
-                    ip, port, login, password = proxy
-                    proxy_list.append(f"http://{login}:{password}@{ip}:{port}")
-                elif len(proxy) == 2:
-                    ip, port = proxy
-                    proxy_list.append(f"http://{ip}:{port}")
-                else:
-                    print("\033[91m" + f"Proxy Error: {proxy}" + "\033[0m")
-        return proxy_list
+    def set_proxy(cls) -> dict[str, Optional[float]]:
+        """Читает proxies.txt: строки ip:port[:login:password], комментарии
+        после # и задержки latency=..., записанные proxy_test.py"""
+        return read_proxy_file("proxies.txt")
 
     def get_reviews(self):
-        response = self.make_request(self.base_url)
-        soup = BeautifulSoup(response.text, "lxml")
-        next_page = soup.select_one("div.navigation__list").select_one(
-            "a.next.page-numbers"
-        )
-
-        result_dict = {}
-        reviews = soup.select("li.depth-1 > article.comment:not(.bro-author)")
-
-        for review in reviews:
-            review_url = review.find("a", {"href": True})["href"]
-
-            if review_url in self._processed_reviews:
-                print("\033[92m" + f"Already processed: {review_url}" + "\033[0m")
-                continue
-
-            login = review.select_one("header > cite > b").get_text()
-            result_dict["Логин"] = login
-
-            date = review.select_one("header > a > time")["datetime"]
-            result_dict["Дата"] = date
-
-            general_impression = review.select_one(
-                "div.after-header > div.title_review"
-            )
-            if general_impression is not None:
-                result_dict["Общее впечатление"] = general_impression.get_text().strip()
-            else:
-                result_dict["Общее впечатление"] = None
-
-            score = review.select_one(
-                "div.new-card__rating > span.new-card__rating_num"
-            )
-            if score is not None:
-                result_dict["Оценка"] = int(score["data-count"])
-            else:
-                result_dict["Оценка"] = None
-
-            review_text = review.select_one(
-                "section.comment-content.comment > p"
-            ).get_text()
-            result_dict["Отзыв"] = review_text
-
-            review_liked = int(
-                review.select_one("div.score-comment > span.score-num").get_text()
-            )
-            result_dict["Лайки"] = review_liked
-
-            result_dict["Ссылка на отзыв"] = review_url
-
-            self._saver.save_review("Газпромбанк", result_dict)
-            self._processed_reviews.add(review_url)
-            print("\033[92m" + f"Saved review: {review_url}" + "\033[0m")
-            result_dict = {}
-
-        result_dict = {}
-        while next_page != None:
-            next_page_url = next_page["href"]
-            response = self.make_request(next_page_url)
-            soup = BeautifulSoup(response.text, "lxml")
-
-            reviews = soup.select("li.depth-1 > article.comment:not(.bro-author)")
-
-            for review in reviews:
-                review_url = review.find("a", {"href": True})["href"]
-
-                if review_url in self._processed_reviews:
-                    print("\033[92m" + f"Already processed: {review_url}" + "\033[0m")
-                    continue
-
-                login = review.select_one("header > cite > b").get_text()
-                result_dict["Логин"] = login
-
-                date = review.select_one("header > a > time")["datetime"]
-                result_dict["Дата"] = date
-
-                general_impression = review.select_one(
-                    "div.after-header > div.title_review"
-                )
-                if general_impression is not None:
-                    result_dict["Общее впечатление"] = (
-                        general_impression.get_text().strip()
-                    )
-                else:
-                    result_dict["Общее впечатление"] = None
-
-                score = review.select_one(
-                    "div.new-card__rating > span.new-card__rating_num"
-                )
-                if score is not None:
-                    result_dict["Оценка"] = int(score["data-count"])
-                else:
-                    result_dict["Оценка"] = None
-
-                review_text = review.select_one(
-                    "section.comment-content.comment > p"
-                ).get_text()
-                result_dict["Отзыв"] = review_text
-
-                review_liked = int(
-                    review.select_one("div.score-comment > span.score-num").get_text()
-                )
-                result_dict["Лайки"] = review_liked
-
-                result_dict["Ссылка на отзыв"] = review_url
-
-                self._saver.save_review("Газпромбанк", result_dict)
-                self._processed_reviews.add(review_url)
-                print("\033[92m" + f"Saved review: {review_url}" + "\033[0m")
-                result_dict = {}
-
-            next_page = soup.select_one("div.navigation__list").select_one(
-                "a.next.page-numbers"
-            )
-        return next_page
-
-
-parser = Parser("https://brobank.ru/banki/gazprombank/comments/", "reviews.json")
-parser.get_reviews()
+        """Обходит все банки параллельно: прокси, лимиты хоста и общий
+        лимит одновременных запросов у банков общие"""
+        workers = max(1, min(len(self.banks), self._concurrency))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for future in [
+                executor.submit(self.get_bank_reviews, bank) for bank in self.banks
+            ]:
+                future.result()
+
+    def get_bank_reviews(self, bank: str):
+        """Сохраняет новые отзывы одного банка с его названием"""
+        saver = self._savers[bank]
+        for review in self.iter_reviews(bank):
+            review_url = review["Ссылка на отзыв"]
+            with self._save_lock:
+                saver.save_review(bank, review)
+                self._processed_reviews[bank].add(review_url)
+            self.metrics.count("reviews")
+            logger.info("Saved review of %s: %s", bank, review_url)
+        logger.info("Finished bank: %s", bank)
+
+    def iter_reviews(self, bank: str) -> Iterator[dict]:
+        """Отдает новые отзывы по одному, проходя страницы по ссылкам
+        «следующая». Пока извлекаются и сохраняются отзывы страницы,
+        следующая страница уже загружается и разбирается в фоне (при
+        prefetch=True), поэтому страница занимает max(загрузка и разбор,
+        извлечение и сохранение), а не их сумму.
+
+        Страница отмечается во frontier как PARSED, когда все ее отзывы
+        сохранены и хранилище сбросило их на диск по своим правилам
+        (flush_every, flush_interval); отдельного сброса на каждую
+        страницу нет.
+
+        Комментарии на сайте идут от новых к старым, поэтому при
+        incremental=True обход останавливается после known_pages подряд
+        страниц без новых отзывов. Самый новый отзыв банка и его дата
+        запоминаются в CrawlState.
+        """
+        bank_url = self.banks[bank]
+        saver = self._savers[bank]
+        processed_reviews = self._processed_reviews[bank]
+        page_url = self._resume_page(bank_url, processed_reviews)
+        page = self._load_page(page_url) if page_url is not None else None
+        newest_review_url, newest_date = None, None
+        known_pages = 0
+        unsaved_pages = []
+        failed = False
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            while page_url is not None:
+                if page is None:
+                    logger.warning("Failed to get page: %s", page_url)
+                    self._frontier_mark(page_url, FAILED, source=bank_url)
+                    failed = True
+                    break
+                comments, next_page_url = page
+                if page_url == bank_url and comments:
+                    newest_review_url, newest_comment = comments[0]
+                    newest_date = extract_comment(newest_comment, newest_review_url)[
+                        "Дата"
+                    ]
+                if self._incremental:
+                    review_urls = [review_url for review_url, _ in comments]
+                    if self._reached_known_reviews(
+                        bank_url, review_urls, processed_reviews
+                    ):
+                        known_pages += 1
+                    else:
+                        known_pages = 0
+                    if known_pages >= self._known_pages:
+                        logger.info("No new reviews of %s after: %s", bank, page_url)
+                        next_page_url = None
+                next_page = None
+                if self.prefetch and next_page_url is not None:
+                    next_page = executor.submit(self._load_page, next_page_url)
+                page_data = {
+                    "next_page": next_page_url,
+                    "review_urls": [review_url for review_url, _ in comments],
+                }
+                self._frontier_mark(page_url, FETCHED, page_data, bank_url)
+                self.metrics.count("pages")
+
+                for review_url, comment in comments:
+                    if review_url in processed_reviews:
+                        logger.debug("Already processed: %s", review_url)
+                        continue
+                    start = time.perf_counter()
+                    review = extract_comment(comment, review_url)
+                    self.metrics.observe_parse(time.perf_counter() - start)
+                    yield review
+
+                self._mark_saved_pages(saver, unsaved_pages, bank_url, page_url)
+
+                page_url = next_page_url
+                if next_page is not None:
+                    page = next_page.result()
+                elif page_url is not None:
+                    page = self._load_page(page_url)
+
+        self._mark_saved_pages(saver, unsaved_pages, bank_url, flush=True)
+        if failed:
+            return
+        if newest_review_url is not None:
+            self._state.update(bank_url, newest_review_url, newest_date)
+        if self._frontier is not None:
+            self._frontier.clear(source=bank_url)
+
+    def _mark_saved_pages(
+        self,
+        saver,
+        unsaved_pages: list,
+        bank_url: str,
+        page_url: Optional[str] = None,
+        flush: bool = False,
+    ):
+        """Отмечает PARSED страницы, отзывы которых уже на диске.
+
+        unsaved_pages хранит пары (страница, число сбросов хранилища к
+        моменту сохранения ее последнего отзыва): страница записана, когда
+        после этого был еще сброс или в буфере не осталось отзывов. При
+        flush=True буфер сбрасывается сразу, в конце обхода банка.
+        """
+        if self._frontier is None:
+            return
+        if not hasattr(saver, "flush_state"):
+            # Хранилище пишет каждый отзыв сразу
+            if page_url is not None:
+                self._frontier_mark(page_url, PARSED, source=bank_url)
+            return
+        if flush:
+            saver.flush()
+        flushes, pending = saver.flush_state()
+        if page_url is not None:
+            unsaved_pages.append((page_url, flushes))
+        while unsaved_pages and (not pending or unsaved_pages[0][1] < flushes):
+            self._frontier_mark(unsaved_pages.pop(0)[0], PARSED, source=bank_url)
+
+    def _reached_known_reviews(
+        self, bank_url: str, review_urls: list[str], processed_reviews
+    ) -> bool:
+        """Проверяет, что на странице нет новых отзывов: все они уже
+        сохранены или среди них есть самый новый отзыв прошлого запуска.
+        Пустая страница (например, подмененная при блокировке) известной
+        не считается"""
+        if not review_urls:
+            return False
+        if all(review_url in processed_reviews for review_url in review_urls):
+            return True
+        mark = self._state.get(bank_url)
+        return mark is not None and mark["newest_review_url"] in review_urls
+
+    def _load_page(
+        self, page_url: str
+    ) -> Optional[tuple[list[tuple[str, etree._Element]], Optional[str]]]:
+        """Загружает и разбирает страницу отзывов: комментарии со ссылками
+        и ссылка на следующую страницу, None если страница не загрузилась"""
+        response = self.make_request(page_url)
+        if response is None:
+            return None
+        return extract_comments_page(response.text)
+
+    def _frontier_mark(self, page_url: str, state: str, data=None, source=None):
+        if self._frontier is not None:
+            self._frontier.mark("page", page_url, state, data, source)
+
+    def _resume_page(self, bank_url: str, processed_reviews) -> Optional[str]:
+        """Проходит по цепочке страниц банка из frontier без запросов и
+        возвращает первую страницу, отзывы которой сохранены не полностью"""
+        page_url = bank_url
+        while self._frontier is not None and page_url is not None:
+            record = self._frontier.get("page", page_url)
+            if record is None or record["state"] != PARSED:
+                break
+            page_data = record["data"]
+            if not all(
+                review_url in processed_reviews
+                for review_url in page_data["review_urls"]
+            ):
+                break
+            page_url = page_data["next_page"]
+        if page_url != bank_url:
+            logger.info("Resuming from page: %s", page_url)
+        return page_url
+
+
+if __name__ == "__main__":
+    # python -m ParserBroBank.parser из корня репозитория; proxies.txt и
+    # reviews.json лежат в папке парсера
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    setup_logging()
+    parser = Parser(
+        {
+            "Газпромбанк": "https://brobank.ru/banki/gazprombank/comments/",
+            "Сбербанк": "https://brobank.ru/banki/sberbank/comments/",
+            "ВТБ": "https://brobank.ru/banki/vtb/comments/",
+        },
+        "reviews.json",
+        metrics_file="metrics.prom",
+    )
+    parser.get_reviews()
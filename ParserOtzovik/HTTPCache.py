@@ -0,0 +1,290 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Optional
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+DEFAULT_TTL_RULES = [
+    # Отзывы меняются редко, но правки и удаления за месяц подхватываются
+    (r"/review_\d+\.html$", 30 * 24 * 3600),
+    (r"\?official_products=", 24 * 3600),
+    (r"/reviews/", 3600),
+]
+
+
+class CacheEntry:
+    def __init__(self, meta: Dict[str, Any], body_path: str, ttl: Optional[float]):
+        self.meta = meta
+        self.body_path = body_path
+        self.ttl = ttl
+
+    @property
+    def fresh(self) -> bool:
+        return self.ttl is None or time.time() - self.meta["fetched_at"] < self.ttl
+
+    def validators(self) -> Dict[str, str]:
+        """Заголовки для условного запроса"""
+        headers = {}
+        if self.meta.get("etag"):
+            headers["If-None-Match"] = self.meta["etag"]
+        if self.meta.get("last_modified"):
+            headers["If-Modified-Since"] = self.meta["last_modified"]
+        return headers
+
+
+class HTTPCache:
+    """Дисковый кэш HTTP-ответов.
+
+    Тела ответов хранятся в objects/ под SHA-256 содержимого, а записи
+    urls/ связывают URL с телом, временем загрузки и валидаторами ETag и
+    Last-Modified. Срок жизни задается правилами (регулярное выражение,
+    секунды), первое совпавшее правило выигрывает, None означает бессрочно.
+    Устаревшая запись перепроверяется условным запросом.
+
+    Размер кэша ограничен max_bytes (None без ограничения): при открытии и
+    когда сохраненные тела превышают лимит, prune удаляет тела без ссылок
+    из urls/ и давно не использованные записи, пока размер не опустится до
+    PRUNE_RATIO от лимита, чтобы следующие store не чистили кэш заново.
+    """
+
+    PRUNE_RATIO = 0.8
+
+    def __init__(
+        self,
+        directory: str = ".http_cache",
+        ttl_rules=DEFAULT_TTL_RULES,
+        default_ttl: Optional[float] = 3600,
+        max_bytes: Optional[int] = 2 * 2**30,
+    ):
+        self.directory = directory
+        self._ttl_rules = [(re.compile(pattern), ttl) for pattern, ttl in ttl_rules]
+        self._default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.join(directory, "objects"), exist_ok=True)
+        os.makedirs(os.path.join(directory, "urls"), exist_ok=True)
+        self._lock = threading.Lock()
+        self._prune_lock = threading.Lock()
+        self._size = 0
+        self._stats = {
+            "hits": 0,
+            "revalidated": 0,
+            "misses": 0,
+            "stored": 0,
+            "bytes_saved": 0,
+            "bytes_downloaded": 0,
+            "pruned_entries": 0,
+            "pruned_objects": 0,
+        }
+        self.prune()
+
+    def ttl_for(self, url: str) -> Optional[float]:
+        for pattern, ttl in self._ttl_rules:
+            if pattern.search(url):
+                return ttl
+        return self._default_ttl
+
+    def _url_path(self, url: str) -> str:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, "urls", key + ".json")
+
+    def _body_path(self, digest: str) -> str:
+        return os.path.join(self.directory, "objects", digest[:2], digest)
+
+    def lookup(self, url: str) -> Optional[CacheEntry]:
+        """Возвращает запись кэша для URL, если она есть"""
+        try:
+            with open(self._url_path(url), encoding="utf-8") as file:
+                meta = json.load(file)
+        except (OSError, json.JSONDecodeError):
+            return None
+        body_path = self._body_path(meta["digest"])
+        if not os.path.exists(body_path):
+            return None
+        return CacheEntry(meta, body_path, self.ttl_for(url))
+
+    def hit(self, url: str, entry: CacheEntry) -> requests.Response:
+        """Отдает свежий ответ из кэша без обращения к сети"""
+        response = self._to_response(url, entry)
+        self._count("hits", len(response.content))
+        self._touch(url)
+        return response
+
+    def update(
+        self, url: str, response: requests.Response, entry: Optional[CacheEntry]
+    ) -> requests.Response:
+        """Обрабатывает ответ сети: 304 продлевает запись, 200 сохраняется"""
+        if response.status_code == 304 and entry is not None:
+            entry.meta["fetched_at"] = time.time()
+            self._write_json(self._url_path(url), entry.meta)
+            cached = self._to_response(url, entry)
+            self._count("revalidated", len(cached.content))
+            return cached
+        self._count("misses")
+        if response.status_code == 200:
+            self.store(url, response)
+        return response
+
+    def store(self, url: str, response: requests.Response):
+        """Сохраняет тело ответа и запись для URL"""
+        content = response.content
+        digest = hashlib.sha256(content).hexdigest()
+        body_path = self._body_path(digest)
+        stored = not os.path.exists(body_path)
+        if stored:
+            os.makedirs(os.path.dirname(body_path), exist_ok=True)
+            self._write_bytes(body_path, content)
+        meta = {
+            "url": url,
+            "digest": digest,
+            "fetched_at": time.time(),
+            "encoding": response.encoding,
+            "content_type": response.headers.get("Content-Type"),
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        }
+        self._write_json(self._url_path(url), meta)
+        with self._lock:
+            self._stats["stored"] += 1
+            self._stats["bytes_downloaded"] += len(content)
+            if stored:
+                self._size += len(content)
+            over_limit = self.max_bytes is not None and self._size > self.max_bytes
+        if over_limit:
+            self.prune()
+
+    def prune(self):
+        """Удаляет тела, на которые не ссылается ни одна запись urls/
+        (остаются после изменения страницы), а если кэш больше max_bytes,
+        то и записи в порядке давности последнего использования, пока
+        размер не станет не больше PRUNE_RATIO от max_bytes"""
+        if not self._prune_lock.acquire(blocking=False):
+            return  # уже чистит другой поток
+        try:
+            entries, referenced = self._scan_entries()
+            sizes = {}
+            removed_objects = 0
+            objects_directory = os.path.join(self.directory, "objects")
+            for root, _, files in os.walk(objects_directory):
+                for name in files:
+                    path = os.path.join(root, name)
+                    if self._writing(path):
+                        continue
+                    if name in referenced:
+                        sizes[name] = self._file_size(path)
+                    elif self._remove(path):
+                        removed_objects += 1
+            size = sum(sizes.values())
+            removed_entries = 0
+            if self.max_bytes is not None and size > self.max_bytes:
+                target = self.max_bytes * self.PRUNE_RATIO
+                entries.sort()
+                for _, url_path, digest in entries:
+                    if size <= target:
+                        break
+                    self._remove(url_path)
+                    removed_entries += 1
+                    referenced[digest] -= 1
+                    if not referenced[digest] and digest in sizes:
+                        if self._remove(self._body_path(digest)):
+                            removed_objects += 1
+                        size -= sizes.pop(digest)
+            with self._lock:
+                self._size = size
+                self._stats["pruned_entries"] += removed_entries
+                self._stats["pruned_objects"] += removed_objects
+        finally:
+            self._prune_lock.release()
+
+    def _scan_entries(self) -> tuple[list, Counter]:
+        """Записи urls/ как (время использования, путь, тело) и число
+        ссылок на каждое тело; битые записи удаляются"""
+        entries = []
+        referenced = Counter()
+        urls_directory = os.path.join(self.directory, "urls")
+        for name in os.listdir(urls_directory):
+            path = os.path.join(urls_directory, name)
+            if self._writing(path):
+                continue
+            try:
+                used_at = os.path.getmtime(path)
+                with open(path, encoding="utf-8") as file:
+                    digest = json.load(file)["digest"]
+            except (OSError, ValueError, KeyError):
+                self._remove(path)
+                continue
+            entries.append((used_at, path, digest))
+            referenced[digest] += 1
+        return entries, referenced
+
+    def _touch(self, url: str):
+        """Отмечает запись использованной: время изменения файла записи
+        служит порядком вытеснения в prune"""
+        try:
+            os.utime(self._url_path(url))
+        except OSError:
+            pass
+
+    @staticmethod
+    def _writing(path: str) -> bool:
+        """Временный файл _write_bytes, который, возможно, еще пишется;
+        брошенные временные файлы старше часа удаляются как прочие"""
+        if not os.path.basename(path).startswith(tempfile.template):
+            return False
+        try:
+            return time.time() - os.path.getmtime(path) < 3600
+        except OSError:
+            return True
+
+    @staticmethod
+    def _file_size(path: str) -> int:
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    @staticmethod
+    def _remove(path: str) -> bool:
+        try:
+            os.remove(path)
+        except OSError:
+            return False
+        return True
+
+    def _to_response(self, url: str, entry: CacheEntry) -> requests.Response:
+        response = requests.Response()
+        with open(entry.body_path, "rb") as file:
+            response._content = file.read()
+        response.status_code = 200
+        response.url = url
+        response.encoding = entry.meta.get("encoding")
+        response.headers = CaseInsensitiveDict()
+        if entry.meta.get("content_type"):
+            response.headers["Content-Type"] = entry.meta["content_type"]
+        response.headers["X-Cache"] = "HIT"
+        return response
+
+    def _count(self, name: str, saved_bytes: int = 0):
+        with self._lock:
+            self._stats[name] += 1
+            self._stats["bytes_saved"] += saved_bytes
+
+    def _write_bytes(self, path: str, content: bytes):
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "wb") as file:
+            file.write(content)
+        os.replace(tmp_path, path)
+
+    def _write_json(self, path: str, data: Dict[str, Any]):
+        self._write_bytes(path, json.dumps(data, ensure_ascii=False).encode("utf-8"))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Возвращает счетчики попаданий и сэкономленных байт"""
+        with self._lock:
+            return dict(self._stats)
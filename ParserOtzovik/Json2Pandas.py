@@ -1,35 +1,302 @@
-import pandas as pd
 import json
+import os
+from itertools import islice
+from typing import Any, Dict, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from pandas.api.types import union_categoricals
+from pyarrow import feather
+
+RECOMMEND_COLUMN = "Рекомендую друзьям"
+TEXT_COLUMNS = (
+    "Логин",
+    "Локация пользователя",
+    "Достоинства",
+    "Недостатки",
+    "Отзыв",
+    "Общее впечатление",
+)
+CLEAN_VERSION = 2
+CACHE_KEY = b"json2pandas_source"
+
+
+class JSONStream:
+    """Читает JSON-документ по частям: raw_decode разбирает очередное
+    значение из буфера, а если значение не поместилось, буфер дочитывается"""
+
+    def __init__(self, file, chunk_size: int = 1 << 20):
+        self._file = file
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    def _read_more(self) -> bool:
+        if self._eof:
+            return False
+        chunk = self._file.read(self._chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buffer = self._buffer[self._pos :] + chunk
+        self._pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Возвращает следующий непробельный символ, не забирая его"""
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos].isspace():
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._read_more():
+                return ""
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise ValueError(f"Ожидался {char!r}, найден {self.peek()!r}")
+        self._pos += 1
+
+    def skip(self, char: str) -> bool:
+        """Забирает char, если он следующий"""
+        if self.peek() == char:
+            self._pos += 1
+            return True
+        return False
+
+    def decode(self) -> Any:
+        """Разбирает следующее значение целиком"""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if self._read_more():
+                    continue
+                raise
+            self._pos = end
+            return value
+
+
+def iter_reviews(filename: str, chunk_size: int = 1 << 20) -> Iterator[Dict]:
+    """Отдает отзывы из reviews.json (JSONSaver), .jsonl (JSONLSaver) или
+    архива .zst (ReviewArchive) по одному, не загружая файл целиком"""
+    if filename.endswith(".zst"):
+        from CrawlerCore.ReviewArchive import ReviewArchive
+
+        with ReviewArchive(filename, cache_blocks=0) as archive:
+            yield from archive.iter_reviews()
+        return
+    with open(filename, encoding="utf-8") as file:
+        if filename.endswith(".jsonl"):
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+            return
+        stream = JSONStream(file, chunk_size)
+        stream.expect("{")
+        while not stream.skip("}"):
+            key = stream.decode()
+            stream.expect(":")
+            if key != "reviews":
+                stream.decode()
+            else:
+                stream.expect("[")
+                while not stream.skip("]"):
+                    yield stream.decode()
+                    stream.skip(",")
+            stream.skip(",")
+
+
+def compact_integers(series: pd.Series) -> pd.Series:
+    """Переводит столбец в самый узкий целый тип, с пропусками в Int8..Int64"""
+    numbers = pd.to_numeric(series, errors="coerce")
+    values = numbers.dropna()
+    if not (values % 1 == 0).all():
+        return numbers
+    if len(values) == len(numbers):
+        return pd.to_numeric(numbers, downcast="integer")
+    low, high = (values.min(), values.max()) if len(values) else (0, 0)
+    for dtype in ("int8", "int16", "int32"):
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return numbers.astype(dtype.capitalize())
+    return numbers.astype("Int64")
+
+
+def normalize_text(series: pd.Series) -> pd.Series:
+    """Приводит текст к NFC, заменяет любые пробелы (в том числе
+    неразрывные и переводы строк) одним пробелом и обрезает края"""
+    category = isinstance(series.dtype, pd.CategoricalDtype)
+    text = series.astype("str").where(series.notna(), None)
+    text = text.str.normalize("NFC").str.replace(r"\s+", " ", regex=True).str.strip()
+    return text.astype("category") if category else text
+
+
+def parse_dates(series: pd.Series) -> pd.Series:
+    """Разбирает даты ISO 8601: дни otzovik (ГГГГ-ММ-ДД) и время brobank
+    со смещением, которое сохраняется. Если смещения в столбце разные или
+    смешаны с датами без смещения, все приводится к UTC. Непустое значение,
+    которое не разобралось, вызывает ValueError, а не превращается в NaT"""
+    try:
+        dates = pd.to_datetime(series, format="ISO8601", errors="coerce")
+    except ValueError:
+        dates = pd.to_datetime(series, format="ISO8601", errors="coerce", utc=True)
+    present = series.notna() & (series.astype("str").str.strip() != "")
+    failed = present & dates.isna()
+    if failed.any():
+        examples = ", ".join(map(repr, series[failed].unique()[:3]))
+        raise ValueError(
+            f"Столбец {series.name}: не разобрано дат {failed.sum()}, "
+            f"например {examples}"
+        )
+    return dates
+
+
+def union_categories(parts: list[pd.Series]) -> pd.Categorical:
+    """Объединяет части столбца category. Часть, где столбец пуст или его
+    не было, приводится к типу категорий остальных частей, иначе
+    union_categoricals отказывается объединять разные типы"""
+    parts = [part.astype("category") for part in parts]
+    filled = [part for part in parts if len(part.cat.categories)]
+    if not filled:
+        return pd.Categorical([None] * sum(map(len, parts)))
+    empty = pd.Index([], dtype=filled[0].cat.categories.dtype)
+    parts = [
+        part if len(part.cat.categories) else part.cat.set_categories(empty)
+        for part in parts
+    ]
+    return union_categoricals(parts, ignore_order=True)
+
+
+def clean_reviews(dataframe: pd.DataFrame) -> pd.DataFrame:
+    """Очищает таблицу отзывов: даты ISO 8601 с часовым поясом,
+    рекомендация как boolean, нормализованный текст"""
+    dataframe = dataframe.copy()
+    for column in ("Дата", "collected_at"):
+        if column in dataframe:
+            dataframe[column] = parse_dates(dataframe[column])
+    if RECOMMEND_COLUMN in dataframe:
+        answers = dataframe[RECOMMEND_COLUMN].astype("object")
+        recommend = pd.Series(pd.NA, index=dataframe.index, dtype="boolean")
+        recommend[answers == "ДА"] = True
+        recommend[answers == "НЕТ"] = False
+        dataframe[RECOMMEND_COLUMN] = recommend
+    for column in TEXT_COLUMNS:
+        if column in dataframe:
+            dataframe[column] = normalize_text(dataframe[column])
+    return dataframe
 
 
 class Json2Pandas:
-    def __init__(self, filename):
+    """Загружает отзывы в DataFrame частями по chunk_rows строк.
+
+    Столбцы с небольшим числом значений хранятся как category (категории
+    частей объединяются через union_categoricals), числовые сжимаются до
+    самого узкого целого типа. Пиковая память почти не превышает размер
+    итоговой таблицы, а не в несколько раз больше файла, как при json.load.
+    """
+
+    CATEGORY_COLUMNS = (
+        "Сервис",
+        "service_url",
+        "Рекомендую друзьям",
+        "Локация пользователя",
+    )
+    INTEGER_COLUMNS = (
+        "Репутация пользователя",
+        "Все отзывы пользователя",
+        "Лайки",
+        "Комментарии к отзыву",
+        "Оценка",
+    )
+
+    def __init__(self, filename, chunk_rows: int = 10_000):
         self.filename = filename
+        self.chunk_rows = chunk_rows
 
-    def load_dataframe(self):
-        with open(self.filename, encoding="utf-8") as file:
-            raw_data = json.load(file)
-            reviews = raw_data["reviews"]
-            dataframe = pd.DataFrame(reviews)
-            return dataframe
+    def iter_chunks(self) -> Iterator[pd.DataFrame]:
+        """Отдает отзывы готовыми частями DataFrame"""
+        reviews = iter_reviews(self.filename)
+        while rows := list(islice(reviews, self.chunk_rows)):
+            yield self._compact(pd.DataFrame(rows))
 
+    def _compact(self, dataframe: pd.DataFrame) -> pd.DataFrame:
+        for column in self.CATEGORY_COLUMNS:
+            if column in dataframe:
+                dataframe[column] = dataframe[column].astype("category")
+        for column in self.INTEGER_COLUMNS:
+            if column in dataframe:
+                dataframe[column] = compact_integers(dataframe[column])
+        return dataframe
 
-converter = Json2Pandas("reviews.json")
-dataframe = converter.load_dataframe()
+    def load_clean(self, cache_file: Optional[str] = None) -> pd.DataFrame:
+        """Возвращает очищенную таблицу из кэша в формате Feather, если он
+        построен по текущей версии файла отзывов (размер и время
+        изменения), иначе загружает, очищает и сохраняет кэш"""
+        cache_file = cache_file or self.filename + ".clean.feather"
+        stat = os.stat(self.filename)
+        key = json.dumps([CLEAN_VERSION, stat.st_size, stat.st_mtime_ns]).encode()
+        if os.path.exists(cache_file):
+            with pa.OSFile(cache_file) as source:
+                metadata = pa.ipc.open_file(source).schema.metadata or {}
+            if metadata.get(CACHE_KEY) == key:
+                return feather.read_table(cache_file).to_pandas()
+        dataframe = clean_reviews(self.load_dataframe())
+        table = pa.Table.from_pandas(dataframe, preserve_index=False)
+        table = table.replace_schema_metadata(
+            {**(table.schema.metadata or {}), CACHE_KEY: key}
+        )
+        tmp_filename = cache_file + ".tmp"
+        feather.write_feather(table, tmp_filename)
+        os.replace(tmp_filename, cache_file)
+        return dataframe
 
-dataframe["Дата"] = dataframe["Дата"].astype("datetime64[ns]")
+    def load_dataframe(self) -> pd.DataFrame:
+        chunks = list(self.iter_chunks())
+        if not chunks:
+            return pd.DataFrame()
+        columns = list(dict.fromkeys(column for chunk in chunks for column in chunk))
+        chunks = [self._compact(chunk.reindex(columns=columns)) for chunk in chunks]
+        data: Dict[str, pd.Series] = {}
+        for column in columns:
+            # Столбец забирается из частей, чтобы память освобождалась сразу
+            parts = [chunk.pop(column) for chunk in chunks]
+            if column in self.CATEGORY_COLUMNS:
+                data[column] = pd.Series(union_categories(parts), name=column)
+            elif column in self.INTEGER_COLUMNS:
+                data[column] = compact_integers(pd.concat(parts, ignore_index=True))
+            else:
+                data[column] = pd.concat(parts, ignore_index=True)
+        return pd.DataFrame(data)
 
-dataframe.info()
-print(
-    f"Общее число отзывов: {len(dataframe)}\nОтзывы о Альфа-Банке: {len(dataframe.query("Сервис == 'Альфа-Банк'"))}"
-)
 
-df = dataframe.query("Сервис != 'Альфа-Банк'")
-df.drop(columns=["service_url", "collected_at"], inplace=True)
-df["Рекомендую друзьям"] = (
-    df["Рекомендую друзьям"]
-    .where(df["Рекомендую друзьям"] != "ДА", True)
-    .where(df["Рекомендую друзьям"] != "НЕТ", False)
-)
-отзывы_после_01_01_2024 = df.query("Дата >= '2024-01-01'")
-print(отзывы_после_01_01_2024)
+if __name__ == "__main__":
+    from .ParquetExporter import ParquetExporter
+
+    # python -m ParserOtzovik.Json2Pandas; reviews.json лежит в папке парсера
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    # Очищенная таблица берется из кэша, пока reviews.json не изменился
+    dataframe = Json2Pandas("reviews.json").load_clean()
+
+    dataframe.info()
+    alfa_reviews = dataframe.query("Сервис == 'Альфа-Банк'")
+    print(
+        f"Общее число отзывов: {len(dataframe)}\n"
+        f"Отзывы о Альфа-Банке: {len(alfa_reviews)}"
+    )
+
+    # Выборка за период читает из Parquet только нужные партиции и столбцы
+    exporter = ParquetExporter("reviews_parquet")
+    exporter.export("reviews.json")
+    columns = [
+        column
+        for column in exporter.dataset().schema.names
+        if column not in ("service_url", "collected_at", "month")
+    ]
+    df = clean_reviews(exporter.read(columns=columns, since="2024-01-01"))
+    отзывы_после_01_01_2024 = df.query("Сервис != 'Альфа-Банк'")
+    print(отзывы_после_01_01_2024)
@@ -0,0 +1,196 @@
+import os
+import sys
+import uuid
+from itertools import chain
+from typing import Iterator, Optional, Sequence
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from .Json2Pandas import Json2Pandas
+
+URL_COLUMN = "Ссылка на отзыв"
+DATE_COLUMN = "Дата"
+PARTITION_COLUMNS = ("service_url", "month")
+# Столбцы отзыва в порядке записи; их типы не зависят от того, какие
+# столбцы оказались в первой части файла
+REVIEW_COLUMNS = (
+    "Сервис",
+    URL_COLUMN,
+    "Логин",
+    "Репутация пользователя",
+    "Локация пользователя",
+    "Все отзывы пользователя",
+    DATE_COLUMN,
+    "Лайки",
+    "Комментарии к отзыву",
+    "Достоинства",
+    "Недостатки",
+    "Отзыв",
+    "Общее впечатление",
+    "Оценка",
+    "Рекомендую друзьям",
+    "service_url",
+    "collected_at",
+)
+
+
+class ParquetExporter:
+    """Выгружает отзывы в набор Parquet-файлов с разбиением в стиле Hive:
+    <directory>/service_url=<URL>/month=<ГГГГ-ММ>/part-....parquet.
+
+    Каждая выгрузка дописывает новые файлы с уникальными именами и не
+    трогает старые; отзывы, ссылки на которые уже есть в наборе,
+    пропускаются, поэтому выгружать можно после каждого обхода. При
+    чтении фильтры по service_url и month отбрасывают целые папки, а
+    из файлов читаются только нужные столбцы.
+    """
+
+    def __init__(
+        self,
+        directory: str = "reviews_parquet",
+        chunk_rows: int = 50_000,
+        min_rows_per_group: int = 10_000,
+        max_rows_per_group: int = 100_000,
+    ):
+        self.directory = directory
+        self.chunk_rows = chunk_rows
+        self.min_rows_per_group = min_rows_per_group
+        self.max_rows_per_group = max_rows_per_group
+        self.partitioning = ds.partitioning(
+            pa.schema([(column, pa.string()) for column in PARTITION_COLUMNS]),
+            flavor="hive",
+        )
+
+    def dataset(self) -> Optional[ds.Dataset]:
+        if not os.path.isdir(self.directory):
+            return None
+        return ds.dataset(
+            self.directory,
+            format="parquet",
+            partitioning=self.partitioning,
+            exclude_invalid_files=True,
+        )
+
+    def _exported_urls(self) -> Optional[pa.Array]:
+        dataset = self.dataset()
+        if dataset is None or URL_COLUMN not in dataset.schema.names:
+            return None
+        return dataset.to_table(columns=[URL_COLUMN]).column(0).combine_chunks()
+
+    def export(self, source_filename: str) -> int:
+        """Дописывает в набор новые отзывы из reviews.json или .jsonl,
+        возвращает их число"""
+        chunks = Json2Pandas(source_filename, self.chunk_rows).iter_chunks()
+        first = next(chunks, None)
+        if first is None:
+            return 0
+        schema = self._schema(first)
+        dataset = self.dataset()
+        if dataset is not None:
+            # Столбцы прежних выгрузок сохраняются, даже если их нет в файле
+            schema = pa.unify_schemas([dataset.schema, schema])
+        exported = self._exported_urls()
+        written = 0
+
+        def batches() -> Iterator[pa.RecordBatch]:
+            nonlocal written
+            for chunk in chain([first], chunks):
+                table = self._to_table(chunk, schema)
+                if exported is not None and len(exported):
+                    table = table.filter(
+                        pc.invert(pc.is_in(table[URL_COLUMN], value_set=exported))
+                    )
+                written += table.num_rows
+                yield from table.to_batches()
+
+        ds.write_dataset(
+            batches(),
+            self.directory,
+            schema=schema,
+            format="parquet",
+            partitioning=self.partitioning,
+            basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+            min_rows_per_group=self.min_rows_per_group,
+            max_rows_per_group=self.max_rows_per_group,
+        )
+        return written
+
+    @staticmethod
+    def _schema(chunk: pd.DataFrame) -> pa.Schema:
+        """Постоянные типы столбцов, чтобы файлы разных выгрузок совпадали:
+        все известные столбцы отзыва и незнакомые столбцы части строками"""
+        fields = []
+        columns = chain(
+            REVIEW_COLUMNS,
+            (column for column in chunk.columns if column not in REVIEW_COLUMNS),
+        )
+        for column in columns:
+            if column in Json2Pandas.INTEGER_COLUMNS:
+                fields.append((column, pa.int32()))
+            elif column in PARTITION_COLUMNS:
+                fields.append((column, pa.string()))
+            elif column in Json2Pandas.CATEGORY_COLUMNS:
+                fields.append((column, pa.dictionary(pa.int32(), pa.string())))
+            else:
+                fields.append((column, pa.string()))
+        if "month" not in chunk.columns:
+            fields.append(("month", pa.string()))
+        return pa.schema(fields)
+
+    @staticmethod
+    def _to_table(chunk: pd.DataFrame, schema: pa.Schema) -> pa.Table:
+        chunk = chunk.reindex(
+            columns=[name for name in schema.names if name != "month"]
+        )
+        arrays = []
+        for field in schema:
+            if field.name == "month":
+                values = chunk[DATE_COLUMN].astype("str").str.slice(0, 7)
+                values = values.where(chunk[DATE_COLUMN].notna(), None)
+            else:
+                values = chunk[field.name]
+            if pa.types.is_dictionary(field.type) or pa.types.is_string(field.type):
+                values = values.astype("object").where(values.notna(), None)
+            array = pa.array(values, from_pandas=True)
+            if pa.types.is_dictionary(field.type):
+                array = array.cast(pa.string()).dictionary_encode()
+                array = array.cast(field.type)
+            else:
+                array = array.cast(field.type)
+            arrays.append(array)
+        return pa.Table.from_arrays(arrays, schema=schema)
+
+    def read(
+        self,
+        columns: Optional[Sequence[str]] = None,
+        since: Optional[str] = None,
+        service_urls: Optional[Sequence[str]] = None,
+    ) -> pd.DataFrame:
+        """Читает выбранные столбцы отзывов не раньше since (ГГГГ-ММ-ДД)
+        и только указанных сервисов, не открывая остальные партиции"""
+        dataset = self.dataset()
+        if dataset is None:
+            return pd.DataFrame(columns=list(columns or []))
+        condition = None
+        if since is not None:
+            condition = (ds.field("month") >= since[:7]) & (
+                ds.field(DATE_COLUMN) >= since
+            )
+        if service_urls is not None:
+            by_service = ds.field("service_url").isin(list(service_urls))
+            condition = by_service if condition is None else condition & by_service
+        table = dataset.to_table(
+            columns=list(columns) if columns is not None else None, filter=condition
+        )
+        return table.to_pandas()
+
+
+if __name__ == "__main__":
+    source = sys.argv[1] if len(sys.argv) > 1 else "reviews.json"
+    directory = sys.argv[2] if len(sys.argv) > 2 else "reviews_parquet"
+    exported = ParquetExporter(directory).export(source)
+    print(f"Выгружено новых отзывов: {exported} в {directory}")
@@ -0,0 +1,311 @@
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional
+
+from CrawlerCore.Frontier import FAILED, FETCHED, PARSED
+from .extractors import extract_review, extract_review_urls, extract_service_page
+
+logger = logging.getLogger("ParserOtzovik.pipeline")
+
+SERVICE = "service"
+LISTING = "listing"
+REVIEW = "review"
+
+_STOP = None
+
+
+class Pipeline:
+    """Конвейер сбора отзывов с разделением загрузки и разбора HTML.
+
+    Потоки-загрузчики кладут сырой HTML в ограниченную очередь, пул
+    процессов извлекает из него ссылки и поля отзывов, а единственный
+    поток-писатель передаёт отзывы в хранилище и ставит найденные ссылки
+    обратно в очередь загрузки.
+
+    Если у парсера есть frontier, уже разобранные страницы сервисов не
+    загружаются повторно: их результат берется из frontier и сразу
+    передается писателю.
+
+    Первое исключение в любой стадии останавливает обход: оставшиеся задачи
+    пропускаются, а run после остановки потоков выбрасывает это исключение.
+    """
+
+    def __init__(
+        self,
+        parser,
+        fetchers: int = 16,
+        parsers: Optional[int] = None,
+        queue_size: int = 100,
+        stats_interval: float = 30.0,
+    ):
+        self._parser = parser
+        self._fetchers = fetchers
+        self._parsers = parsers or os.cpu_count() or 1
+        self._stats_interval = stats_interval
+        self._fetch_queue = queue.Queue()
+        self._raw_queue = queue.Queue(maxsize=queue_size)
+        self._write_queue = queue.Queue(maxsize=queue_size)
+        self._seen = set()
+        self._service_pages = {}
+        self._newest = {}
+        self._incomplete = set()
+        self._frontier = parser._frontier
+        self._writer = None
+        self._resumed = deque()
+        self._outstanding = 0
+        self._done = threading.Condition()
+        self._error = None
+        self._counters_lock = threading.Lock()
+        self._counters = {"fetched": 0, "failed": 0, "parsed": 0, "saved": 0}
+        self._started = None
+        self._finished = threading.Event()
+
+    def run(self):
+        """Собирает отзывы со всех сервисов парсера"""
+        self._started = time.monotonic()
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(self._parsers, mp_context=context) as pool:
+            threads = [
+                threading.Thread(target=self._fetch_worker, daemon=True)
+                for _ in range(self._fetchers)
+            ]
+            threads += [
+                threading.Thread(target=self._parse_worker, args=(pool,), daemon=True)
+                for _ in range(self._parsers)
+            ]
+            self._writer = threading.Thread(target=self._write_worker, daemon=True)
+            threads.append(self._writer)
+            for thread in threads:
+                thread.start()
+            reporter = threading.Thread(target=self._report_stats, daemon=True)
+            reporter.start()
+
+            for service_url in self._parser.iter_all_services():
+                if self._parser._frontier_is_parsed(SERVICE, service_url):
+                    logger.info("Already completed: %s", service_url)
+                    continue
+                self._enqueue(SERVICE, service_url, service_url)
+
+            with self._done:
+                self._done.wait_for(lambda: self._outstanding == 0)
+
+            for _ in range(self._fetchers):
+                self._fetch_queue.put(_STOP)
+            for _ in range(self._parsers):
+                self._raw_queue.put(_STOP)
+            self._write_queue.put(_STOP)
+            for thread in threads:
+                thread.join()
+            self._finished.set()
+        if self._error is not None:
+            raise self._error
+        for service_url, (newest_review_url, newest_date) in self._newest.items():
+            complete = service_url not in self._incomplete
+            self._parser._update_state(
+                service_url, newest_review_url, newest_date, complete
+            )
+        self._parser._complete_crawl()
+        logger.info("Pipeline finished: %s", self.get_stats())
+
+    def _enqueue(self, kind: str, service_url: str, url: str):
+        with self._done:
+            if url in self._seen:
+                return
+            self._seen.add(url)
+            self._outstanding += 1
+        result = self._known_result(kind, url)
+        if result is None:
+            self._fetch_queue.put((kind, service_url, url))
+        elif threading.current_thread() is self._writer:
+            self._resumed.append((kind, service_url, url, result))
+        else:
+            self._write_queue.put((kind, service_url, url, result))
+
+    def _known_result(self, kind: str, url: str):
+        """Результат разбора страницы сервиса из frontier или None"""
+        if self._frontier is None or kind == REVIEW:
+            return None
+        if not self._frontier.is_parsed(LISTING, url):
+            return None
+        review_urls = self._frontier.data(LISTING, url)
+        if kind == LISTING:
+            return review_urls
+        service_info = self._frontier.data(SERVICE, url)
+        if service_info is None:
+            return None
+        return service_info["pages"], review_urls
+
+    def _task_done(self):
+        with self._done:
+            self._outstanding -= 1
+            if self._outstanding == 0:
+                self._done.notify_all()
+
+    def _fail(self, error: Exception):
+        """Запоминает первое исключение стадии; остальные задачи после него
+        только снимаются со счета"""
+        logger.exception("Pipeline task failed: %s", error)
+        with self._done:
+            if self._error is None:
+                self._error = error
+
+    def _count(self, name: str):
+        with self._counters_lock:
+            self._counters[name] += 1
+
+    def _fetch_worker(self):
+        while (task := self._fetch_queue.get()) is not _STOP:
+            kind, service_url, url = task
+            passed = False
+            try:
+                if self._error is not None:
+                    continue
+                response = self._parser.make_request(url)
+                if response is None:
+                    self._count("failed")
+                    logger.warning("Failed to get page: %s", url)
+                    self._failed(kind, service_url, url)
+                    continue
+                self._count("fetched")
+                self._raw_queue.put((kind, service_url, url, response.text))
+                passed = True
+            except Exception as e:
+                self._fail(e)
+            finally:
+                if not passed:
+                    self._task_done()
+
+    def _parse_worker(self, pool: ProcessPoolExecutor):
+        while (task := self._raw_queue.get()) is not _STOP:
+            kind, service_url, url, html = task
+            passed = False
+            try:
+                if self._error is not None:
+                    continue
+                try:
+                    if kind == SERVICE:
+                        result = pool.submit(extract_service_page, html, url).result()
+                    elif kind == LISTING:
+                        result = pool.submit(extract_review_urls, html).result()
+                    else:
+                        start = time.perf_counter()
+                        result = pool.submit(extract_review, html, url).result()
+                        self._parser.metrics.observe_parse(time.perf_counter() - start)
+                except Exception as e:
+                    logger.error("Error parsing page %s: %s", url, e)
+                    result = None
+                self._count("parsed")
+                self._write_queue.put((kind, service_url, url, result))
+                passed = True
+            except Exception as e:
+                self._fail(e)
+            finally:
+                if not passed:
+                    self._task_done()
+
+    def _write_worker(self):
+        while (task := self._write_queue.get()) is not _STOP:
+            self._handle(*task)
+            while self._resumed:
+                self._handle(*self._resumed.popleft())
+
+    def _handle(self, kind: str, service_url: str, url: str, result: Any):
+        try:
+            if self._error is None:
+                self._write(kind, service_url, url, result)
+        except Exception as e:
+            self._fail(e)
+        finally:
+            self._task_done()
+
+    def _write(self, kind: str, service_url: str, url: str, result: Any):
+        processed_reviews = self._parser._processed_reviews
+        if result is None:
+            self._failed(kind, service_url, url)
+        elif kind == SERVICE:
+            pages, review_urls = result
+            self._parser._frontier_mark(SERVICE, url, FETCHED, {"pages": pages})
+            self._parser._frontier_mark(LISTING, url, PARSED, review_urls, service_url)
+            self._service_pages[service_url] = pages
+            self._parser.metrics.count("pages")
+            if review_urls:
+                self._newest[service_url] = [review_urls[0], None]
+            self._enqueue_next_page(service_url, url, review_urls)
+            self._enqueue_reviews(service_url, review_urls)
+        elif kind == LISTING:
+            self._parser._frontier_mark(LISTING, url, PARSED, result, service_url)
+            self._parser.metrics.count("pages")
+            self._enqueue_next_page(service_url, url, result)
+            self._enqueue_reviews(service_url, result)
+        elif url not in processed_reviews:
+            self._parser._saver.save_review(service_url, result)
+            self._parser._frontier_mark(REVIEW, url, PARSED, source=service_url)
+            processed_reviews.add(url)
+            newest = self._newest.get(service_url)
+            if newest is not None and newest[0] == url:
+                newest[1] = result["Дата"]
+            self._count("saved")
+            self._parser.metrics.count("reviews")
+            logger.info("Saved review: %s", url)
+
+    def _failed(self, kind: str, service_url: str, url: str):
+        """Страница не загрузилась или не разобралась: отметка сервиса не
+        сдвигается, а в инкрементальном режиме обход идет к следующей
+        странице выдачи, так как пустая страница известной не считается"""
+        self._parser._frontier_mark(kind, url, FAILED, source=service_url)
+        self._incomplete.add(service_url)
+        if kind == LISTING:
+            self._enqueue_next_page(service_url, url, [])
+
+    def _enqueue_next_page(
+        self, service_url: str, page_url: str, review_urls: list[str]
+    ):
+        """В обычном режиме ставит в очередь все страницы сервиса сразу, а в
+        инкрементальном идёт по одной, пока встречаются новые отзывы"""
+        pages = self._service_pages[service_url]
+        if not self._parser._incremental:
+            if page_url == service_url:
+                for page in pages[1:]:
+                    self._enqueue(LISTING, service_url, page)
+            return
+        if self._parser._reached_known_reviews(service_url, review_urls):
+            logger.info("No new reviews after: %s", page_url)
+            return
+        index = pages.index(page_url)
+        if index + 1 < len(pages):
+            self._enqueue(LISTING, service_url, pages[index + 1])
+
+    def _enqueue_reviews(self, service_url: str, review_urls: list[str]):
+        for review_url in review_urls:
+            if self._parser._is_review_done(review_url):
+                logger.debug("Already processed: %s", review_url)
+                continue
+            self._enqueue(REVIEW, service_url, review_url)
+
+    def _report_stats(self):
+        while not self._finished.wait(self._stats_interval):
+            logger.info("Pipeline stats: %s", self.get_stats())
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Возвращает глубину очередей и пропускную способность стадий"""
+        elapsed = max(time.monotonic() - (self._started or time.monotonic()), 1e-9)
+        with self._counters_lock:
+            counters = dict(self._counters)
+        return {
+            "queues": {
+                "fetch": self._fetch_queue.qsize(),
+                "parse": self._raw_queue.qsize(),
+                "write": self._write_queue.qsize(),
+            },
+            **counters,
+            "fetched_per_second": round(counters["fetched"] / elapsed, 2),
+            "parsed_per_second": round(counters["parsed"] / elapsed, 2),
+            "saved_per_second": round(counters["saved"] / elapsed, 2),
+            "hosts": self._parser._fetcher.rate.get_stats(),
+        }
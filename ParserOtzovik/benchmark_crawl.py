@@ -0,0 +1,197 @@
+import argparse
+import atexit
+import functools
+import logging
+import os
+import shutil
+import tempfile
+import time
+from typing import Optional
+from urllib.parse import parse_qs, urlsplit
+
+from CrawlerCore.BenchmarkSite import add_site_arguments, report, site_from_args
+from CrawlerCore.Metrics import setup_logging
+from .parser import Parser
+
+COMPANY = "Bench"
+
+REVIEW_PAGE = """<html><body>
+<h1><span class="fn" itemprop="name">Сервис {service}</span></h1>
+<div class="item review-wrap">
+ <div class="item-left"><div class="user-info">
+  <a class="user-login fit-with-ava url fn" href="/profile/{review}">
+  <span itemprop="name">Пользователь {review}</span></a>
+  <div class="karma">{karma}</div><div class="user-location">Москва</div>
+  <a class="reviews-counter">{counter}</a>
+ </div></div>
+ <div class="item-right">
+  <span class="review-postdate dtreviewed">
+  <abbr class="value" title="2024-03-{day:02d}">{day} марта</abbr></span>
+  <span class="summary" itemprop="name">Отзыв {review}</span>
+  <div class="rating-score tooltip-right">{rating}</div>
+  <div class="review-plus">Достоинства: быстро</div>
+  <div class="review-minus">Недостатки: <b>дорого</b></div>
+  <div class="review-body description">{text}</div>
+  <table><tr><td class="recommend-ratio">ДА</td></tr></table>
+  <span class="review-btn review-yes tooltip-top">{likes}</span>
+  <a class="review-btn review-comments tooltip-top">{comments}</a>
+ </div>
+</div>
+{filler}
+</body></html>"""
+
+
+def filler(kib: int) -> str:
+    """Разметка без отзывов, которая доводит страницу до размера настоящей"""
+    block = '<div class="sidebar-item"><a href="/reviews/x/">Ссылка</a></div>\n'
+    return block * (kib * 1024 // len(block.encode()))
+
+
+def render(layout: dict, base_url: str, path: str) -> Optional[str]:
+    """Строит страницу сайта по пути запроса или возвращает None (404)"""
+    parts = urlsplit(path)
+    segments = [segment for segment in parts.path.split("/") if segment]
+    if not segments:
+        return companies_page(layout, parse_qs(parts.query))
+    if segments[0] == "reviews" and len(segments) in (2, 3):
+        page = int(segments[2]) if len(segments) == 3 else 1
+        return listing_page(layout, base_url, segments[1], page)
+    if segments[0].startswith("review_") and segments[0].endswith(".html"):
+        return review_page(layout, segments[0].removesuffix(".html"))
+    return None
+
+
+def companies_page(layout: dict, query: dict) -> Optional[str]:
+    if query.get("official_products") != [COMPANY]:
+        return None
+    page = int(query.get("page", ["1"])[0])
+    pages = layout["company_pages"]
+    if page > pages:
+        return None
+    pager = "".join(
+        f'<a href="?official_products={COMPANY}&page={number}">{number}</a>'
+        for number in range(2, pages + 1)
+    )
+    pager = f'<div class="pager">{pager}</div>' if pager else ""
+    services = "".join(
+        f'<div><div class="product-photo"><a href="reviews/svc_{number}/">'
+        f"</a></div></div>"
+        for number in range(page - 1, layout["services"], pages)
+    )
+    return (
+        f"<html><body>{pager}"
+        f'<div class="product-list decor-n">{services}</div>'
+        f'{filler(layout["filler_kib"])}</body></html>'
+    )
+
+
+def listing_page(layout: dict, base_url: str, service: str, page: int):
+    pages = layout["pages"]
+    if page > pages:
+        return None
+    pager = (
+        f'<div class="pager"><a href="reviews/{service}/2/">2</a>'
+        f'<a href="reviews/{service}/{pages}/">{pages}</a></div>'
+        if pages > 1
+        else ""
+    )
+    reviews = "".join(
+        f'<div itemprop="review"><meta itemprop="url" '
+        f'content="{base_url}review_{service}_{page}_{number}.html"></div>'
+        for number in range(layout["per_page"])
+    )
+    return (
+        f'<html><body>{pager}<span class="votes">{pages * layout["per_page"]}</span>'
+        f'{reviews}{filler(layout["filler_kib"])}</body></html>'
+    )
+
+
+def review_page(layout: dict, review: str) -> str:
+    number = sum(map(ord, review))
+    return REVIEW_PAGE.format(
+        service=review.split("_")[2],
+        review=review,
+        karma=number % 100,
+        counter=number % 20 + 1,
+        day=number % 28 + 1,
+        rating=number % 5 + 1,
+        text=f"Текст отзыва {review}. " * 20,
+        likes=number % 7,
+        comments=number % 3,
+        filler=filler(layout["filler_kib"]),
+    )
+
+
+def crawl(parser: Parser, mode: str):
+    if mode == "async":
+        parser.run_async()
+    elif mode == "sync":
+        parser.get_reviews_by_service()
+    else:
+        parser.run_pipeline()
+
+
+def count_reviews(filename: str) -> int:
+    if not os.path.exists(filename):
+        return 0
+    with open(filename, "rb") as file:
+        return sum(1 for line in file if line.strip())
+
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(
+        description="Замер скорости обхода otzovik на локальной копии сайта"
+    )
+    argparser.add_argument(
+        "--mode", choices=("async", "sync", "pipeline"), default="async"
+    )
+    argparser.add_argument("--services", type=int, default=6)
+    argparser.add_argument("--company-pages", type=int, default=2)
+    argparser.add_argument("--pages", type=int, default=5)
+    argparser.add_argument("--per-page", type=int, default=20)
+    argparser.add_argument("--filler-kib", type=int, default=60)
+    argparser.add_argument("--concurrency", type=int, default=16)
+    argparser.add_argument("--verbose", action="store_true")
+    add_site_arguments(argparser)
+    args = argparser.parse_args()
+    setup_logging(logging.INFO if args.verbose else logging.ERROR)
+
+    layout = {
+        "services": args.services,
+        "company_pages": args.company_pages,
+        "pages": args.pages,
+        "per_page": args.per_page,
+        "filler_kib": args.filler_kib,
+    }
+    # Папка удаляется при выходе после того, как хранилище допишет метаданные
+    directory = tempfile.mkdtemp(prefix="otzovik-bench-")
+    atexit.register(shutil.rmtree, directory, True)
+    with site_from_args(functools.partial(render, layout), args) as site:
+        site.write_proxies(os.path.join(directory, "proxies.txt"))
+        output_file = os.path.join(directory, "reviews.jsonl")
+        Parser.SITE_URL = site.base_url
+        cwd = os.getcwd()
+        os.chdir(directory)  # set_proxy читает proxies.txt из текущей папки
+        try:
+            parser = Parser(
+                [f"{site.base_url}?official_products={COMPANY}"],
+                [],
+                output_file=output_file,
+                concurrency=args.concurrency,
+                cache_dir=None,
+                state_file=os.path.join(directory, "crawl_state.json"),
+                frontier_file=None,
+            )
+        finally:
+            os.chdir(cwd)
+        start = time.perf_counter()
+        crawl(parser, args.mode)
+        seconds = time.perf_counter() - start
+        report(
+            f"otzovik/{args.mode}",
+            count_reviews(output_file),
+            seconds,
+            site.stats(),
+            vars(args),
+            args.output,
+        )
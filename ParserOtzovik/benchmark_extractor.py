@@ -0,0 +1,121 @@
+import glob
+import os
+import sys
+import time
+
+from bs4 import BeautifulSoup
+import lxml
+from .benchmark_crawl import review_page
+from .extractors import extract_review
+
+
+def extract_review_bs4(html: str, review_url: str) -> dict:
+    """Прежняя реализация parse_review на BeautifulSoup"""
+    result_dict = {}
+    soup = BeautifulSoup(html, "lxml")
+
+    result_dict["Сервис"] = soup.find(
+        "span", {"class": "fn", "itemprop": "name"}
+    ).get_text()
+    result_dict["Ссылка на отзыв"] = review_url
+
+    review_container = soup.select_one("div.item.review-wrap")
+    user_info = review_container.select_one("div.user-info")
+
+    result_dict["Логин"] = (
+        user_info.select_one("a.user-login.fit-with-ava.url.fn")
+        .find("span", {"itemprop": "name"})
+        .get_text()
+    )
+    result_dict["Репутация пользователя"] = int(
+        user_info.select_one("div.karma").get_text()
+    )
+    result_dict["Локация пользователя"] = user_info.select_one(
+        "div.user-location"
+    ).get_text()
+    result_dict["Все отзывы пользователя"] = int(
+        user_info.select_one(".reviews-counter").get_text()
+    )
+    result_dict["Дата"] = review_container.select_one(
+        "span.review-postdate.dtreviewed"
+    ).find("abbr", {"class": "value", "title": True})["title"]
+    result_dict["Лайки"] = int(
+        review_container.select_one("span.review-btn.review-yes.tooltip-top").get_text()
+    )
+    result_dict["Комментарии к отзыву"] = int(
+        review_container.select_one(
+            "a.review-btn.review-comments.tooltip-top"
+        ).get_text()
+    )
+    advantages = (
+        review_container.select_one("div.item-right")
+        .select_one("div.review-plus")
+        .get_text()
+    )
+    result_dict["Достоинства"] = advantages.removeprefix("Достоинства:").strip()
+    disadvantages = (
+        review_container.select_one("div.item-right")
+        .select_one("div.review-minus")
+        .get_text()
+    )
+    result_dict["Недостатки"] = disadvantages.removeprefix("Недостатки:").strip()
+    result_dict["Отзыв"] = (
+        review_container.select_one("div.item-right")
+        .select_one("div.review-body.description")
+        .get_text()
+    )
+    result_dict["Общее впечатление"] = review_container.find(
+        "span", {"class": "summary", "itemprop": "name"}
+    ).get_text()
+    result_dict["Оценка"] = int(
+        review_container.select_one("div.rating-score.tooltip-right").get_text()
+    )
+    result_dict["Рекомендую друзьям"] = review_container.select_one(
+        "td.recommend-ratio"
+    ).get_text()
+    return result_dict
+
+
+def sample_pages(count: int = 50, filler_kib: int = 60) -> list[tuple[str, str]]:
+    """Страницы отзывов по шаблону локального сайта из benchmark_crawl"""
+    layout = {"filler_kib": filler_kib}
+    pages = []
+    for number in range(count):
+        review = f"review_svc_{number % 5}_1_{number}"
+        pages.append(
+            (f"https://otzovik.com/{review}.html", review_page(layout, review))
+        )
+    return pages
+
+
+def benchmark(extract, pages: list[tuple[str, str]], repeat: int) -> float:
+    """Возвращает число отзывов в секунду"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for review_url, html in pages:
+            extract(html, review_url)
+    return len(pages) * repeat / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    html_dir = sys.argv[1] if len(sys.argv) > 1 else "html"
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    pages = []
+    for filename in sorted(glob.glob(os.path.join(html_dir, "review_*.html"))):
+        with open(filename, encoding="utf-8") as file:
+            review_url = "https://otzovik.com/" + os.path.basename(filename)
+            pages.append((review_url, file.read()))
+    if not pages:
+        print(f"В каталоге {html_dir} нет страниц review_*.html, берутся шаблонные")
+        pages = sample_pages()
+
+    for review_url, html in pages:
+        if extract_review(html, review_url) != extract_review_bs4(html, review_url):
+            sys.exit(f"Результаты различаются: {review_url}")
+
+    bs4_speed = benchmark(extract_review_bs4, pages, repeat)
+    lxml_speed = benchmark(extract_review, pages, repeat)
+    print(f"Страниц: {len(pages)}, повторов: {repeat}")
+    print(f"BeautifulSoup: {bs4_speed:.1f} отзывов/с")
+    print(f"lxml XPath:    {lxml_speed:.1f} отзывов/с ({lxml_speed / bs4_speed:.1f}x)")
@@ -0,0 +1,160 @@
+import json
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Optional
+
+import pandas as pd
+
+from .Json2Pandas import Json2Pandas
+
+SERVICES = ["Сбербанк", "ВТБ", "Альфа-Банк", "Т-Банк", "Совкомбанк", "МКБ"]
+LOCATIONS = ["Москва", "Санкт-Петербург", "Казань", "Новосибирск", "Екатеринбург"]
+
+
+def make_reviews_file(
+    filename: str, count: int, seed: int = 0, empty_from: Optional[int] = None
+):
+    """Записывает reviews.json в формате JSONSaver со случайными отзывами;
+    начиная с отзыва empty_from локация пуста, а рекомендации нет вовсе"""
+    generator = random.Random(seed)
+    reviews = []
+    for number in range(count):
+        service = generator.choice(SERVICES)
+        reviews.append(
+            {
+                "Сервис": service,
+                "Ссылка на отзыв": f"https://otzovik.com/review_{number}.html",
+                "Логин": f"user{generator.randrange(count)}",
+                "Репутация пользователя": generator.randrange(500),
+                "Локация пользователя": generator.choice(LOCATIONS),
+                "Все отзывы пользователя": generator.randrange(1, 200),
+                "Дата": f"202{generator.randrange(5)}-0{generator.randrange(1, 10)}-1{generator.randrange(10)}",
+                "Лайки": generator.randrange(50),
+                "Комментарии к отзыву": generator.randrange(10),
+                "Достоинства": "быстро, удобно",
+                "Недостатки": "комиссии",
+                "Отзыв": f"Текст отзыва {number}. " * generator.randrange(5, 60),
+                "Общее впечатление": f"Впечатление {number}",
+                "Оценка": generator.randrange(1, 6),
+                "Рекомендую друзьям": generator.choice(["ДА", "НЕТ"]),
+                "service_url": f"https://otzovik.com/reviews/{SERVICES.index(service)}/",
+                "collected_at": f"2025-01-01T00:00:{number % 60:02d}",
+            }
+        )
+        if empty_from is not None and number >= empty_from:
+            reviews[-1]["Локация пользователя"] = None
+            del reviews[-1]["Рекомендую друзьям"]
+    with open(filename, "w", encoding="utf-8") as file:
+        json.dump(
+            {"metadata": {"total_reviews": count}, "reviews": reviews},
+            file,
+            ensure_ascii=False,
+            indent=2,
+        )
+
+
+def check_empty_chunk(directory: str):
+    """Последняя часть файла без значений в столбцах category: части
+    должны объединиться, а пропуски остаться пропусками"""
+    filename = os.path.join(directory, "empty_chunk.json")
+    make_reviews_file(filename, 30, empty_from=20)
+    dataframe = Json2Pandas(filename, chunk_rows=10).load_dataframe()
+    os.remove(filename)
+    assert len(dataframe) == 30
+    for column in ("Локация пользователя", "Рекомендую друзьям"):
+        assert isinstance(dataframe[column].dtype, pd.CategoricalDtype), column
+        assert dataframe[column][20:].isna().all(), column
+        assert dataframe[column][:20].notna().all(), column
+
+
+def load_whole(filename: str) -> pd.DataFrame:
+    """Прежний способ: json.load всего файла и DataFrame из object-столбцов"""
+    with open(filename, encoding="utf-8") as file:
+        return pd.DataFrame(json.load(file)["reviews"])
+
+
+def load_streaming(filename: str) -> pd.DataFrame:
+    return Json2Pandas(filename).load_dataframe()
+
+
+def load_clean_uncached(filename: str) -> pd.DataFrame:
+    """Загрузка с очисткой и построением кэша"""
+    cache_file = filename + ".clean.feather"
+    if os.path.exists(cache_file):
+        os.remove(cache_file)
+    return Json2Pandas(filename).load_clean(cache_file)
+
+
+def load_clean_cached(filename: str) -> pd.DataFrame:
+    return Json2Pandas(filename).load_clean(filename + ".clean.feather")
+
+
+def measure(loader, filename: str, traced: bool, connection):
+    """Запускается в отдельном процессе, чтобы пики памяти не смешивались.
+
+    Рост RSS учитывает и память pyarrow, которую tracemalloc не видит,
+    а tracemalloc сильно замедляет разбор, поэтому время берется из
+    прогона без него.
+    """
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if traced:
+        tracemalloc.start()
+    start = time.perf_counter()
+    dataframe = loader(filename)
+    result = {
+        "seconds": time.perf_counter() - start,
+        "rss_growth": (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline)
+        * 1024,
+        "frame": int(dataframe.memory_usage(deep=True).sum()),
+    }
+    if traced:
+        result["traced_peak"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    connection.send(result)
+
+
+def run(target, *args):
+    context = multiprocessing.get_context("spawn")
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=target, args=(*args, sender))
+    process.start()
+    result = receiver.recv()
+    process.join()
+    return result
+
+
+def make_in_process(filename: str, count: int, connection):
+    make_reviews_file(filename, count)
+    connection.send(os.path.getsize(filename))
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+
+    with tempfile.TemporaryDirectory() as directory:
+        check_empty_chunk(directory)
+        filename = os.path.join(directory, "reviews.json")
+        # Файл создается в отдельном процессе, чтобы не раздувать пик RSS,
+        # который процессы замеров наследуют от родителя
+        size = run(make_in_process, filename, count)
+        print(f"Отзывов: {count}, файл {size / 2**20:.1f} МиБ")
+        for name, loader in (
+            ("json.load + DataFrame", load_whole),
+            ("Json2Pandas потоково", load_streaming),
+            ("очистка и запись кэша", load_clean_uncached),
+            ("очищенная таблица из кэша", load_clean_cached),
+        ):
+            result = run(measure, loader, filename, False)
+            traced_peak = run(measure, loader, filename, True)["traced_peak"]
+            print(
+                f"{name}: {result['seconds']:.2f} с, "
+                f"рост пикового RSS {result['rss_growth'] / 2**20:.1f} МиБ, "
+                f"пик tracemalloc {traced_peak / 2**20:.1f} МиБ, "
+                f"таблица {result['frame'] / 2**20:.1f} МиБ"
+            )
@@ -0,0 +1,130 @@
+from urllib.parse import urlsplit
+from bs4 import BeautifulSoup
+import lxml.html
+from CrawlerCore.FieldExtractor import Field, FieldExtractor, Scope, has_class
+
+
+def get_service_pages(service_url: str, soup: BeautifulSoup) -> list[str]:
+    """Возвращает список страниц с отзывами о сервисе по пейджеру"""
+    pager = soup.find("div", class_="pager")
+
+    if pager is not None:
+        parts = urlsplit(service_url)
+        last_page = (
+            f"{parts.scheme}://{parts.netloc}/"
+            + pager.find_all("a", {"href": True}, recursive=False)[-1]["href"]
+        )
+        last_page_num = int(last_page.removeprefix(service_url).rstrip("/"))
+        return [service_url] + [
+            f"{service_url}{i}/" for i in range(2, last_page_num + 1)
+        ]
+    return [service_url]
+
+
+def get_review_urls(soup: BeautifulSoup) -> list[str]:
+    """Возвращает ссылки на отзывы со страницы сервиса"""
+    review_urls = []
+    reviews = soup.find_all("div", {"itemprop": "review"})
+    for review in reviews:
+        review_urls.append(
+            review.find("meta", {"itemprop": "url", "content": True})["content"]
+        )
+    return review_urls
+
+
+def extract_review_urls(html: str) -> list[str]:
+    """Извлекает ссылки на отзывы из HTML-страницы сервиса"""
+    return get_review_urls(BeautifulSoup(html, "lxml"))
+
+
+def extract_service_page(html: str, service_url: str) -> tuple[list[str], list[str]]:
+    """Извлекает из первой страницы сервиса список всех его страниц
+    и ссылки на отзывы с неё самой"""
+    soup = BeautifulSoup(html, "lxml")
+    return get_service_pages(service_url, soup), get_review_urls(soup)
+
+
+REVIEW = FieldExtractor(
+    scopes=[
+        Scope("review", f"(//div{has_class('item', 'review-wrap')})[1]"),
+        Scope("user_info", f"(.//div{has_class('user-info')})[1]", "review"),
+        Scope("item_right", f"(.//div{has_class('item-right')})[1]", "review"),
+    ],
+    fields=[
+        Field("Сервис", f"//span{has_class('fn')}[@itemprop='name']"),
+        Field("Ссылка на отзыв"),
+        Field(
+            "Логин",
+            f"(.//a{has_class('user-login', 'fit-with-ava', 'url', 'fn')})[1]"
+            "//span[@itemprop='name']",
+            "user_info",
+        ),
+        Field(
+            "Репутация пользователя",
+            f".//div{has_class('karma')}",
+            "user_info",
+            convert=int,
+        ),
+        Field(
+            "Локация пользователя", f".//div{has_class('user-location')}", "user_info"
+        ),
+        Field(
+            "Все отзывы пользователя",
+            f".//*{has_class('reviews-counter')}",
+            "user_info",
+            convert=int,
+        ),
+        Field(
+            "Дата",
+            f"(.//span{has_class('review-postdate', 'dtreviewed')})[1]"
+            f"//abbr{has_class('value')}[@title]",
+            "review",
+            attribute="title",
+        ),
+        Field(
+            "Лайки",
+            f".//span{has_class('review-btn', 'review-yes', 'tooltip-top')}",
+            "review",
+            convert=int,
+        ),
+        Field(
+            "Комментарии к отзыву",
+            f".//a{has_class('review-btn', 'review-comments', 'tooltip-top')}",
+            "review",
+            convert=int,
+        ),
+        Field(
+            "Достоинства",
+            f".//div{has_class('review-plus')}",
+            "item_right",
+            convert=lambda text: text.removeprefix("Достоинства:").strip(),
+        ),
+        Field(
+            "Недостатки",
+            f".//div{has_class('review-minus')}",
+            "item_right",
+            convert=lambda text: text.removeprefix("Недостатки:").strip(),
+        ),
+        Field(
+            "Отзыв", f".//div{has_class('review-body', 'description')}", "item_right"
+        ),
+        Field(
+            "Общее впечатление",
+            f".//span{has_class('summary')}[@itemprop='name']",
+            "review",
+        ),
+        Field(
+            "Оценка",
+            f".//div{has_class('rating-score', 'tooltip-right')}",
+            "review",
+            convert=int,
+        ),
+        Field("Рекомендую друзьям", f".//td{has_class('recommend-ratio')}", "review"),
+    ],
+)
+
+
+def extract_review(html: str, review_url: str) -> dict:
+    """Извлекает поля отзыва из HTML-страницы отзыва"""
+    tree = lxml.html.document_fromstring(html)
+    return REVIEW.extract(tree, {"Ссылка на отзыв": review_url})
@@ -1,15 +1,33 @@
 import requests
 from bs4 import BeautifulSoup
-from fake_useragent import FakeUserAgent
 import lxml
-from itertools import cycle
+import logging
+import os
 import time
 import json
+import asyncio
+import re
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Optional
-from JSONSaver import JSONSaver
+from CrawlerCore.JSONSaver import JSONSaver
+from CrawlerCore.JSONLSaver import JSONLSaver
+from CrawlerCore.SQLiteSaver import SQLiteSaver
+from CrawlerCore.FetchCore import FetchCore, read_proxy_file
+from CrawlerCore.Fetcher import Fetcher
+from CrawlerCore.CrawlState import CrawlState
+from CrawlerCore.Frontier import Frontier, FAILED, FETCHED, PARSED
+from CrawlerCore.Metrics import Metrics, setup_logging
+from .HTTPCache import HTTPCache
+from .Pipeline import Pipeline
+from .extractors import extract_review, get_review_urls, get_service_pages
+
+logger = logging.getLogger("ParserOtzovik")
 
 
 class Parser:
+    SITE_URL = "https://otzovik.com/"
+
     def __init__(
         self,
         companies_pages: list[str],
@@ -17,248 +35,551 @@ class Parser:
         max_retries: int = 25,
         request_timeout: int = 6,
         output_file: str = "reviews.json",
+        concurrency: int = 16,
+        per_host_limit: int = 8,
+        per_proxy_limit: int = 2,
+        pool_size: int = 10,
+        cache_dir: Optional[str] = ".http_cache",
+        incremental: bool = False,
+        state_file: str = "crawl_state.json",
+        frontier_file: Optional[str] = "frontier.sqlite",
+        max_failures: int = 3,
+        metrics_file: Optional[str] = None,
+        metrics_interval: float = 30.0,
+        fetch_core: Optional[FetchCore] = None,
     ):
         self._companies_pages = companies_pages
         self._categories_pages = categories_pages
-        self._ua = FakeUserAgent()
-        self._session = requests.Session()
-        self._proxy_list = cycle(self.set_proxy())
-        self._max_retries = max_retries
-        self._request_timeout = request_timeout
+        self._cache = HTTPCache(cache_dir) if cache_dir is not None else None
         self._output_file = output_file
-        self._saver = JSONSaver(output_file)
+        self._saver = self.make_saver(output_file)
         self._processed_reviews = self.load_reviews_from_saver()
-
-    def load_reviews_from_saver(self) -> set:
-        processed = set()
-        for review in self._saver.data.get("reviews", []):
-            processed.add(review["Ссылка на отзыв"])
-        return processed
+        self._concurrency = concurrency
+        self._per_proxy_limit = per_proxy_limit
+        self._executor = None
+        self._global_limit = None
+        self._proxy_limits = None
+        self._pending_reviews = set()
+        self._incremental = incremental
+        self._state = CrawlState(state_file)
+        self._frontier = Frontier(frontier_file) if frontier_file is not None else None
+        self._max_failures = max_failures
+        self.metrics = Metrics("otzovik")
+        self.metrics.start_exporter(metrics_file, metrics_interval)
+        # 304 приходит на условный запрос устаревшей записи кэша
+        self._fetcher = Fetcher.create(
+            "otzovik",
+            self.metrics,
+            self.set_proxy,
+            fetch_core,
+            concurrency,
+            per_host_limit,
+            pool_size,
+            max_retries=max_retries,
+            request_timeout=request_timeout,
+            ok_statuses=(200, 304),
+        )
+
+    @staticmethod
+    def make_saver(output_file: str):
+        """Выбирает хранилище по расширению файла"""
+        if output_file.endswith(".jsonl"):
+            return JSONLSaver(output_file)
+        if output_file.endswith((".sqlite", ".sqlite3", ".db")):
+            return SQLiteSaver(output_file)
+        return JSONSaver(output_file)
+
+    def load_reviews_from_saver(self):
+        return self._saver.processed_reviews()
 
     def make_request(self, url: str) -> Optional[requests.Response]:
         """Выполняет HTTP-запрос с использованием прокси"""
-        headers = {"User-Agent": self._ua.random}
-        for _ in range(self._max_retries):
-            proxy = next(self._proxy_list)
-            proxies = {"http": proxy, "https": proxy}
-            try:
-                response = requests.get(
-                    url,
-                    headers=headers,
-                    proxies=proxies,
-                    timeout=self._request_timeout,
-                )
-                print(
-                    f"Requested with {proxy}, URL: {url}, status_code: {response.status_code}"
-                )
-                if response.status_code == 200:
-                    return response
-            except requests.exceptions.RequestException as e:
-                print("\033[91m" + f"Request Error: {url} {e}" + "\033[0m")
-        return None
+        headers = {}
+        entry, cached = self._lookup_cache(url, headers)
+        if cached is not None:
+            return cached
+        response = self._fetcher.make_request(url, headers)
+        if response is None:
+            return None
+        return self._cache_response(url, response, entry)
+
+    def _lookup_cache(self, url: str, headers: dict):
+        """Ищет URL в кэше: возвращает запись и свежий ответ, если он есть,
+        а для устаревшей записи добавляет заголовки условного запроса"""
+        if self._cache is None:
+            return None, None
+        entry = self._cache.lookup(url)
+        if entry is None:
+            return None, None
+        if entry.fresh:
+            return entry, self._cache.hit(url, entry)
+        headers.update(entry.validators())
+        return entry, None
+
+    def _cache_response(self, url, response, entry):
+        if self._cache is None:
+            return response
+        return self._cache.update(url, response, entry)
+
+    async def amake_request(self, url: str) -> Optional[requests.Response]:
+        """Асинхронный вариант make_request с ограничением числа запросов
+        в полёте: общим, на прокси и адаптивным на хост (RateController)"""
+        headers = {}
+        entry, cached = self._lookup_cache(url, headers)
+        if cached is not None:
+            return cached
+        response = await self._fetcher.amake_request(
+            url, self._executor, self._global_limit, self._proxy_limits, headers
+        )
+        if response is None:
+            return None
+        return self._cache_response(url, response, entry)
 
     @classmethod
-    def set_proxy(cls):
-        proxy_list = []
-        with open("proxies.txt", encoding="utf-8") as file:
-            for line in file:
-                proxy = line.rstrip().split(":")
-                if len(proxy) == 4:
-                    ip, port, login, password = proxy
-                    proxy_list.append(f"http://{login}:{password}@{ip}:{port}")
-                elif len(proxy) == 2:
-                    ip, port = proxy
-                    proxy_list.append(f"http://{ip}:{port}")
-                else:
-                    print("\033[91m" + f"Proxy Error: {proxy}" + "\033[0m")
-        return proxy_list
+    def set_proxy(cls) -> dict[str, Optional[float]]:
+        """Читает proxies.txt: строки ip:port[:login:password], комментарии
+        после # и задержки latency=..., записанные proxy_test.py"""
+        return read_proxy_file("proxies.txt")
 
     def get_all_services(self):
-        services_urls = list()
-        for base_url in self._companies_pages:
-            response = self.make_request(base_url)
-            soup = BeautifulSoup(response.text, "lxml")
-
-            pager = soup.find("div", class_="pager")
-            pages = [base_url]
-            if pager is not None:
-                last_page = (
-                    "https://otzovik.com"
-                    + pager.find_all("a", {"href": True}, recursive=False)[-1]["href"]
-                )
-                num_page = 2
-                tmp_page = base_url + f"&page={num_page}"
-                while (
-                    tmp_page[tmp_page.find("&page=") :]
-                    != last_page[last_page.find("&page=") :]
-                ):
-                    pages.append(tmp_page)
-                    num_page += 1
-                    tmp_page = tmp_page.rstrip(str(num_page - 1)) + str(num_page)
-                pages.append(tmp_page)
+        return list(self.iter_all_services())
+
+    def iter_all_services(self):
+        """Отдает ссылки на сервисы; после прерванного обхода, в котором
+        поиск сервисов завершился, они берутся из frontier без запросов"""
+        if self._frontier is not None and self._frontier.is_parsed(
+            "discovery", "services"
+        ):
+            yield from self._frontier.iter_urls("service")
+            return
+        for service_url in self._discover_services():
+            if self._frontier is not None:
+                self._frontier.add("service", service_url)
+            yield service_url
+        self._frontier_mark("discovery", "services", PARSED)
+
+    def _discover_services(self):
+        """Отдает ссылки на сервисы по мере их обнаружения: сначала заданные
+        категории, затем сервисы компаний. Первая страница выдачи компании
+        загружается один раз, остальные страницы загружаются параллельно"""
+        seen = set()
+
+        def new_services(services_urls):
+            for service_url in services_urls:
+                if service_url not in seen:
+                    seen.add(service_url)
+                    yield service_url
+
+        yield from new_services(self._categories_pages)
+        with ThreadPoolExecutor(max_workers=self._concurrency) as executor:
+            first_pages = {
+                executor.submit(self.make_request, base_url): base_url
+                for base_url in self._companies_pages
+            }
+            other_pages = set()
+            for future in as_completed(first_pages):
+                base_url = first_pages[future]
+                soup = self._services_soup(base_url, future.result())
+                if soup is None:
+                    continue
+                for page in self._get_companies_pages(base_url, soup):
+                    other_pages.add(executor.submit(self.make_request, page))
+                yield from new_services(self._get_services_from_page(soup))
+            for future in as_completed(other_pages):
+                soup = self._services_soup(None, future.result())
+                if soup is not None:
+                    yield from new_services(self._get_services_from_page(soup))
+
+    async def aget_all_services(self):
+        """Асинхронный вариант get_all_services"""
+        return [service_url async for service_url in self.aiter_all_services()]
+
+    async def aiter_all_services(self):
+        """Асинхронный вариант iter_all_services"""
+        if self._frontier is not None and self._frontier.is_parsed(
+            "discovery", "services"
+        ):
+            for service_url in self._frontier.iter_urls("service"):
+                yield service_url
+            return
+        async for service_url in self._adiscover_services():
+            if self._frontier is not None:
+                self._frontier.add("service", service_url)
+            yield service_url
+        self._frontier_mark("discovery", "services", PARSED)
+
+    async def _adiscover_services(self):
+        """Асинхронный вариант _discover_services"""
+        seen = set()
+
+        def new_services(services_urls):
+            for service_url in services_urls:
+                if service_url not in seen:
+                    seen.add(service_url)
+                    yield service_url
+
+        for service_url in new_services(self._categories_pages):
+            yield service_url
+
+        async def fetch(url, base_url=None):
+            return url, base_url, await self.amake_request(url)
+
+        tasks = [
+            asyncio.ensure_future(fetch(base_url, base_url))
+            for base_url in self._companies_pages
+        ]
+        while tasks:
+            done, pending = await asyncio.wait(
+                tasks, return_when=asyncio.FIRST_COMPLETED
+            )
+            tasks = list(pending)
+            for task in done:
+                url, base_url, response = task.result()
+                soup = self._services_soup(base_url or url, response)
+                if soup is None:
+                    continue
+                if base_url is not None:
+                    tasks.extend(
+                        asyncio.ensure_future(fetch(page))
+                        for page in self._get_companies_pages(base_url, soup)
+                    )
+                for service_url in new_services(self._get_services_from_page(soup)):
+                    yield service_url
 
-            for page in pages:
-                response = self.make_request(page)
-                soup = BeautifulSoup(response.text, "lxml")
-                services = soup.find("div", {"class": "product-list decor-n"})
-                services_urls.extend(
-                    [
-                        "https://otzovik.com/" + service["href"]
-                        for service in services.select("div div.product-photo a")
-                    ]
-                )
-        services_urls.extend(self._categories_pages)
-        return services_urls
+    @staticmethod
+    def _services_soup(url, response) -> Optional[BeautifulSoup]:
+        if response is None:
+            logger.warning("Failed to get companies page: %s", url)
+            return None
+        return BeautifulSoup(response.text, "lxml")
+
+    @staticmethod
+    def _get_companies_pages(base_url: str, soup: BeautifulSoup) -> list[str]:
+        """Возвращает страницы выдачи компании со второй по последнюю,
+        номер последней берется из ссылки в пейджере"""
+        pager = soup.find("div", class_="pager")
+        if pager is None:
+            return []
+        last_page = pager.find_all("a", {"href": True}, recursive=False)[-1]["href"]
+        match = re.search(r"[?&]page=(\d+)", last_page)
+        if match is None:
+            return []
+        return [
+            f"{base_url}&page={num_page}"
+            for num_page in range(2, int(match.group(1)) + 1)
+        ]
+
+    @classmethod
+    def _get_services_from_page(cls, soup: BeautifulSoup) -> list[str]:
+        """Возвращает ссылки на сервисы со страницы выдачи компании"""
+        services = soup.find("div", {"class": "product-list decor-n"})
+        return [
+            cls.SITE_URL + service["href"]
+            for service in services.select("div div.product-photo a")
+        ]
 
     def get_reviews_by_service(self):
-        services_url = self.get_all_services()
-        for service_url in services_url:
-            print("\033[92m" + f"Category: {service_url}" + "\033[0m")
-            response = self.make_request(service_url)
-            if response is None:
-                print(
-                    "\033[91m"
-                    + f"Failed to get service page: {service_url}"
-                    + "\033[0m"
+        for service_url in self.iter_all_services():
+            if self._frontier_is_parsed("service", service_url):
+                logger.info("Already completed: %s", service_url)
+                continue
+            logger.info("Category: %s", service_url)
+            service_info = self._stored_service_info(service_url)
+            if service_info is None:
+                service_info = self._parse_service_page(
+                    service_url, self.make_request(service_url)
                 )
+            if service_info is None:
                 continue
 
-            soup = BeautifulSoup(response.text, "lxml")
-            pager = soup.find("div", class_="pager")
-
-            if pager is not None:
-                last_page = (
-                    "https://otzovik.com/"
-                    + pager.find_all("a", {"href": True}, recursive=False)[-1]["href"]
-                )
-                last_page_num = int(last_page.removeprefix(service_url).rstrip("/"))
-                pages = [service_url] + [
-                    f"{service_url}{i}/" for i in range(2, last_page_num + 1)
-                ]
-            else:
-                pages = [service_url]
-
-            total_votes = int(soup.select_one("span.votes").get_text())
+            pages = service_info["pages"]
+            total_votes = service_info["total_votes"]
             vote_num = 1
+            newest_review_url = None
+            newest_date = None
+            complete = True
 
             for page in pages:
-                print("\033[92m" + f"Processing page: {page}" + "\033[0m")
-                review_urls = self.get_all_reviews_by_page(page)
+                logger.info("Processing page: %s", page)
+                review_urls = self.get_all_reviews_by_page(page, service_url)
+                if review_urls is None:
+                    complete = False
+                    continue
+                reached_known = self._reached_known_reviews(service_url, review_urls)
+                if newest_review_url is None and review_urls:
+                    newest_review_url = review_urls[0]
                 for review_url in review_urls:
-                    if review_url in self._processed_reviews:
-                        print(
-                            "\033[92m" + f"Already processed: {review_url}" + "\033[0m"
-                        )
+                    if self._is_review_done(review_url):
+                        logger.debug("Already processed: %s", review_url)
                         continue
                     review_result = self.parse_review(review_url)
+                    if review_result is None:
+                        complete = False
+                        continue
                     self._saver.save_review(service_url, review_result)
                     self._processed_reviews.add(review_url)
-                    print(
-                        "\033[92m"
-                        + f"Saved review: {review_url}, {vote_num}/{total_votes}"
-                        + "\033[0m"
+                    self.metrics.count("reviews")
+                    if review_url == newest_review_url:
+                        newest_date = review_result["Дата"]
+                    logger.info(
+                        "Saved review: %s, %s/%s", review_url, vote_num, total_votes
                     )
                     vote_num += 1
-
-    def get_all_reviews_by_page(self, page_url):
-        review_urls = []
-        response = self.make_request(page_url)
+                if self._incremental and reached_known:
+                    logger.info("No new reviews after: %s", page)
+                    break
+
+            self._update_state(service_url, newest_review_url, newest_date, complete)
+            self._complete_service(service_url, complete)
+        self._complete_crawl()
+
+    def _parse_service_page(
+        self, service_url: str, response: Optional[requests.Response]
+    ) -> Optional[dict]:
+        """Разбирает первую страницу сервиса и запоминает ее во frontier"""
+        if response is None:
+            logger.warning("Failed to get service page: %s", service_url)
+            self._frontier_mark("service", service_url, FAILED)
+            return None
         soup = BeautifulSoup(response.text, "lxml")
-        reviews = soup.find_all("div", {"itemprop": "review"})
-        for review in reviews:
-            review_urls.append(
-                review.find("meta", {"itemprop": "url", "content": True})["content"]
-            )
-        return review_urls
-
-    def parse_review(self, review_url):
-        result_dict = {}
-        try:
-            response = self.make_request(review_url)
-            soup = BeautifulSoup(response.text, "lxml")
-
-            service_name = soup.find(
-                "span", {"class": "fn", "itemprop": "name"}
-            ).get_text()
-            result_dict["Сервис"] = service_name
-
-            result_dict["Ссылка на отзыв"] = review_url
+        service_info = {
+            "pages": get_service_pages(service_url, soup),
+            "total_votes": int(soup.select_one("span.votes").get_text()),
+        }
+        self._frontier_mark("service", service_url, FETCHED, service_info)
+        return service_info
+
+    def _stored_service_info(self, service_url: str) -> Optional[dict]:
+        """Данные первой страницы сервиса из frontier; конвейер не хранит
+        число отзывов, поэтому такие записи загружаются заново"""
+        service_info = self._frontier_data("service", service_url)
+        if service_info is None or "total_votes" not in service_info:
+            return None
+        return service_info
 
-            review_container = soup.select_one("div.item.review-wrap")
-            user_info = review_container.select_one("div.user-info")
+    def _frontier_mark(self, kind: str, url: str, state: str, data=None, source=None):
+        if self._frontier is not None:
+            self._frontier.mark(kind, url, state, data, source)
 
-            login = (
-                user_info.select_one("a.user-login.fit-with-ava.url.fn")
-                .find("span", {"itemprop": "name"})
-                .get_text()
+    def _frontier_data(self, kind: str, url: str):
+        if self._frontier is None:
+            return None
+        return self._frontier.data(kind, url)
+
+    def _frontier_is_parsed(self, kind: str, url: str) -> bool:
+        return self._frontier is not None and self._frontier.is_parsed(kind, url)
+
+    def _is_review_done(self, review_url: str) -> bool:
+        """Отзыв уже сохранен или слишком много раз не разобрался"""
+        if review_url in self._processed_reviews:
+            return True
+        if self._frontier is None:
+            return False
+        record = self._frontier.get("review", review_url)
+        return record is not None and record["failures"] >= self._max_failures
+
+    def _complete_service(self, service_url: str, complete: bool):
+        """Сбрасывает буфер хранилища и отмечает сервис обойденным, если все
+        его страницы и отзывы разобрались; иначе сервис остается в frontier
+        незавершенным, и продолженный обход вернется к пропущенному"""
+        if self._frontier is None:
+            return
+        if hasattr(self._saver, "flush"):
+            self._saver.flush()
+        if not complete:
+            logger.warning("Service left pending, pages failed: %s", service_url)
+            return
+        self._frontier.mark("service", service_url, PARSED)
+
+    def _complete_crawl(self):
+        """Обход завершен: очищает frontier для следующего запуска"""
+        if self._frontier is not None:
+            self._frontier.clear()
+
+    def _reached_known_reviews(self, service_url: str, review_urls: list[str]) -> bool:
+        """Проверяет, что дальше по выдаче сервиса новых отзывов нет: среди
+        отзывов страницы есть самый новый отзыв последнего полного обхода.
+        То, что все отзывы страницы уже сохранены, признаком не считается:
+        после обхода с ошибками глубже могут остаться пропущенные отзывы"""
+        mark = self._state.get(service_url)
+        return mark is not None and mark["newest_review_url"] in review_urls
+
+    def _update_state(
+        self,
+        service_url: str,
+        newest_review_url: Optional[str],
+        newest_date: Optional[str],
+        complete: bool,
+    ):
+        """Сдвигает отметку сервиса, только если все страницы до точки
+        остановки загрузились и все отзывы с них сохранены; иначе следующий
+        инкрементальный запуск остановился бы на пропущенных отзывах"""
+        if newest_review_url is None:
+            return
+        if not complete:
+            logger.warning(
+                "Crawl state not updated, service incomplete: %s", service_url
             )
-            result_dict["Логин"] = login
-
-            rep = user_info.select_one("div.karma").get_text()
-            result_dict["Репутация пользователя"] = int(rep)
-
-            location = user_info.select_one("div.user-location").get_text()
-            result_dict["Локация пользователя"] = location
-
-            total_reviews = user_info.select_one(".reviews-counter").get_text()
-            result_dict["Все отзывы пользователя"] = int(total_reviews)
-
-            date = review_container.select_one("span.review-postdate.dtreviewed").find(
-                "abbr", {"class": "value", "title": True}
-            )["title"]
-            result_dict["Дата"] = date
-
-            review_liked = review_container.select_one(
-                "span.review-btn.review-yes.tooltip-top"
-            ).get_text()
-            result_dict["Лайки"] = int(review_liked)
-
-            review_coms = review_container.select_one(
-                "a.review-btn.review-comments.tooltip-top"
-            ).get_text()
-            result_dict["Комментарии к отзыву"] = int(review_coms)
-
-            advantages = (
-                review_container.select_one("div.item-right")
-                .select_one("div.review-plus")
-                .get_text()
+            return
+        self._state.update(service_url, newest_review_url, newest_date)
+
+    async def aget_reviews_by_service(self):
+        """Асинхронный вариант get_reviews_by_service: сервисы, страницы
+        и отзывы загружаются параллельно в пределах лимитов"""
+        tasks = [
+            asyncio.ensure_future(self._aget_reviews_of_service(service_url))
+            async for service_url in self.aiter_all_services()
+        ]
+        await asyncio.gather(*tasks)
+        self._complete_crawl()
+
+    async def _aget_reviews_of_service(self, service_url: str):
+        """Собирает отзывы одного сервиса; каждый отзыв сохраняется сразу
+        после загрузки, поэтому при сбое теряются только отзывы в работе"""
+        if self._frontier_is_parsed("service", service_url):
+            logger.info("Already completed: %s", service_url)
+            return
+        logger.info("Category: %s", service_url)
+        service_info = self._stored_service_info(service_url)
+        if service_info is None:
+            service_info = self._parse_service_page(
+                service_url, await self.amake_request(service_url)
             )
-            result_dict["Достоинства"] = advantages.removeprefix("Достоинства:").strip()
+        if service_info is None:
+            return
 
-            disadvantages = (
-                review_container.select_one("div.item-right")
-                .select_one("div.review-minus")
-                .get_text()
-            )
-            result_dict["Недостатки"] = disadvantages.removeprefix(
-                "Недостатки:"
-            ).strip()
-
-            review_text = (
-                review_container.select_one("div.item-right")
-                .select_one("div.review-body.description")
-                .get_text()
-            )
-            result_dict["Отзыв"] = review_text
+        pages = service_info["pages"]
+        total_votes = service_info["total_votes"]
+        vote_num = 1
 
-            general_impression = review_container.find(
-                "span", {"class": "summary", "itemprop": "name"}
-            ).get_text()
-            result_dict["Общее впечатление"] = general_impression
+        if self._incremental:
+            pages_review_urls = []
+            for page in pages:
+                page_review_urls = await self.aget_all_reviews_by_page(
+                    page, service_url
+                )
+                pages_review_urls.append(page_review_urls)
+                if page_review_urls is not None and self._reached_known_reviews(
+                    service_url, page_review_urls
+                ):
+                    break
+        else:
+            pages_review_urls = await asyncio.gather(
+                *(self.aget_all_reviews_by_page(page, service_url) for page in pages)
+            )
+        complete = None not in pages_review_urls
+        pages_review_urls = [urls for urls in pages_review_urls if urls is not None]
+        newest_review_url = next((urls[0] for urls in pages_review_urls if urls), None)
+        newest_date = None
+        review_urls = []
+        for page_review_urls in pages_review_urls:
+            for review_url in page_review_urls:
+                if (
+                    self._is_review_done(review_url)
+                    or review_url in self._pending_reviews
+                ):
+                    logger.debug("Already processed: %s", review_url)
+                    continue
+                self._pending_reviews.add(review_url)
+                review_urls.append(review_url)
+
+        async def parse(review_url):
+            return review_url, await self.aparse_review(review_url)
+
+        for future in asyncio.as_completed([parse(url) for url in review_urls]):
+            review_url, review_result = await future
+            self._pending_reviews.discard(review_url)
+            if review_result is None:
+                complete = False
+                continue
+            self._saver.save_review(service_url, review_result)
+            self._processed_reviews.add(review_url)
+            self.metrics.count("reviews")
+            if review_url == newest_review_url:
+                newest_date = review_result["Дата"]
+            logger.info("Saved review: %s, %s/%s", review_url, vote_num, total_votes)
+            vote_num += 1
+
+        self._update_state(service_url, newest_review_url, newest_date, complete)
+        self._complete_service(service_url, complete)
+
+    def run_async(self):
+        """Запускает асинхронный сбор отзывов"""
+        asyncio.run(self._run_async())
+
+    async def _run_async(self):
+        self._executor = ThreadPoolExecutor(max_workers=self._concurrency)
+        self._global_limit = asyncio.Semaphore(self._concurrency)
+        self._proxy_limits = defaultdict(
+            lambda: asyncio.Semaphore(self._per_proxy_limit)
+        )
+        try:
+            await self.aget_reviews_by_service()
+        finally:
+            self._executor.shutdown(wait=True)
+            self._executor = None
 
-            score = review_container.select_one(
-                "div.rating-score.tooltip-right"
-            ).get_text()
-            result_dict["Оценка"] = int(score)
+    def run_pipeline(
+        self, fetchers: int = 16, parsers: Optional[int] = None, queue_size: int = 100
+    ):
+        """Запускает сбор отзывов конвейером: загрузка в потоках, разбор
+        HTML в пуле процессов, запись в одном потоке"""
+        Pipeline(self, fetchers, parsers, queue_size).run()
+
+    def get_all_reviews_by_page(self, page_url, service_url=None):
+        review_urls = self._frontier_data("listing", page_url)
+        if review_urls is not None:
+            return review_urls
+        return self._parse_listing(page_url, self.make_request(page_url), service_url)
+
+    async def aget_all_reviews_by_page(self, page_url, service_url=None):
+        """Асинхронный вариант get_all_reviews_by_page"""
+        review_urls = self._frontier_data("listing", page_url)
+        if review_urls is not None:
+            return review_urls
+        response = await self.amake_request(page_url)
+        return self._parse_listing(page_url, response, service_url)
+
+    def _parse_listing(
+        self, page_url: str, response: Optional[requests.Response], service_url=None
+    ) -> Optional[list[str]]:
+        """Извлекает ссылки на отзывы и запоминает их во frontier; None,
+        если страницу загрузить не удалось"""
+        if response is None:
+            logger.warning("Failed to get page: %s", page_url)
+            self._frontier_mark("listing", page_url, FAILED, source=service_url)
+            return None
+        review_urls = get_review_urls(BeautifulSoup(response.text, "lxml"))
+        self._frontier_mark("listing", page_url, PARSED, review_urls, service_url)
+        self.metrics.count("pages")
+        return review_urls
 
-            recomendation = review_container.select_one("td.recommend-ratio").get_text()
-            result_dict["Рекомендую друзьям"] = recomendation
+    def _extract_review(self, html: str, review_url: str) -> dict:
+        start = time.perf_counter()
+        review_result = extract_review(html, review_url)
+        self.metrics.observe_parse(time.perf_counter() - start)
+        return review_result
 
-            return result_dict
+    def parse_review(self, review_url):
+        try:
+            response = self.make_request(review_url)
+            review_result = self._extract_review(response.text, review_url)
+        except Exception as e:
+            logger.error("Error parsing review %s: %s", review_url, e)
+            review_result = None
+        self._frontier_mark("review", review_url, PARSED if review_result else FAILED)
+        return review_result
 
+    async def aparse_review(self, review_url):
+        """Асинхронный вариант parse_review"""
+        try:
+            response = await self.amake_request(review_url)
+            review_result = self._extract_review(response.text, review_url)
         except Exception as e:
-            print("\033[91m" + f"Error parsing review {review_url}: {e}" + "\033[0m")
-            return None
+            logger.error("Error parsing review %s: %s", review_url, e)
+            review_result = None
+        self._frontier_mark("review", review_url, PARSED if review_result else FAILED)
+        return review_result
 
 
 companies_pages = [
@@ -413,6 +734,13 @@ assert len(categories_pages) == len(set(categories_pages))
 assert len(companies_pages) == len(set(companies_pages))
 
 
-parser = Parser(companies_pages, categories_pages)
-parser.get_reviews_by_service()
-# print(parser.parse_review("https://otzovik.com/review_13787815.html"))
+if __name__ == "__main__":
+    # python -m ParserOtzovik.parser из корня репозитория; proxies.txt и
+    # файлы обхода лежат в папке парсера
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    setup_logging()
+    parser = Parser(companies_pages, categories_pages, metrics_file="metrics.prom")
+    parser.run_async()
+    # parser.run_pipeline()
+    # parser.get_reviews_by_service()
+    # print(parser.parse_review("https://otzovik.com/review_13787815.html"))
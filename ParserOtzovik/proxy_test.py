@@ -1,28 +1,252 @@
-import requests
+import argparse
+import asyncio
+import base64
+import os
+import ssl
+import sys
+import statistics
+import time
+from datetime import datetime
+from typing import Optional
+from urllib.parse import unquote, urlsplit
 
+from CrawlerCore.FetchCore import read_proxy_file
 
-def test_proxy(proxy_url):
+
+class ProxyCheckError(Exception):
+    pass
+
+
+class ProxyCheck:
+    """Результаты нескольких проверок одного прокси"""
+
+    def __init__(self, entry: str, proxy_url: str):
+        self.entry = entry
+        self.proxy_url = proxy_url
+        self.connect_times = []
+        self.total_times = []
+        self.attempts = 0
+        self.error: Optional[str] = None
+
+    @property
+    def address(self) -> str:
+        """ip:port без логина и пароля"""
+        return ":".join(self.entry.split(":")[:2])
+
+    @property
+    def successes(self) -> int:
+        return len(self.total_times)
+
+    @property
+    def connect(self) -> Optional[float]:
+        return statistics.median(self.connect_times) if self.connect_times else None
+
+    @property
+    def latency(self) -> Optional[float]:
+        return statistics.median(self.total_times) if self.total_times else None
+
+    def rank(self) -> tuple:
+        """Сначала надежные, затем быстрые по полной задержке и соединению"""
+        return (
+            -self.successes,
+            self.latency if self.latency is not None else float("inf"),
+            self.connect if self.connect is not None else float("inf"),
+        )
+
+    def annotated(self) -> str:
+        """Строка файла прокси. Нерабочий прокси остается в файле с
+        пометкой failed, чтобы следующий запуск проверил его снова"""
+        if not self.successes:
+            return f"{self.entry}  # failed: {self.error}"
+        return (
+            f"{self.entry}  # latency={self.latency:.3f} "
+            f"connect={self.connect:.3f} ok={self.successes}/{self.attempts}"
+        )
+
+
+def read_proxies(filename: str) -> list[tuple[str, str]]:
+    """Читает файл прокси через read_proxy_file и возвращает пары
+    (строка файла ip:port[:login:password], URL прокси)"""
+    proxies = []
+    for proxy_url in read_proxy_file(filename):
+        credentials, _, address = urlsplit(proxy_url).netloc.rpartition("@")
+        entry = f"{address}:{credentials}" if credentials else address
+        proxies.append((entry, proxy_url))
+    return proxies
+
+
+async def read_status(reader: asyncio.StreamReader) -> int:
+    """Читает строку статуса и заголовки ответа, возвращает код"""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ProxyCheckError("connection closed")
+    try:
+        status = int(status_line.split()[1])
+    except (IndexError, ValueError):
+        raise ProxyCheckError(f"bad response: {status_line[:40]!r}")
+    while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+        pass
+    return status
+
+
+async def probe(proxy_url: str, target: str, ssl_context) -> tuple[float, float]:
+    """Одна проверка: время установки TCP-соединения с прокси и полное время
+    получения ответа цели. Для https открывается туннель CONNECT + TLS"""
+    proxy, url = urlsplit(proxy_url), urlsplit(target)
+    headers = ""
+    if proxy.username:
+        credentials = f"{unquote(proxy.username)}:{unquote(proxy.password or '')}"
+        token = base64.b64encode(credentials.encode()).decode()
+        headers = f"Proxy-Authorization: Basic {token}\r\n"
+    start = time.perf_counter()
+    reader, writer = await asyncio.open_connection(proxy.hostname, proxy.port)
+    connect = time.perf_counter() - start
     try:
-        response = requests.get(
-            "https://httpbin.org/ip",
-            proxies={"http": proxy_url, "https": proxy_url},
-            timeout=10,
+        path = url.path or "/"
+        if url.query:
+            path += "?" + url.query
+        if url.scheme == "https":
+            address = f"{url.hostname}:{url.port or 443}"
+            writer.write(
+                f"CONNECT {address} HTTP/1.1\r\nHost: {address}\r\n{headers}\r\n".encode()
+            )
+            status = await read_status(reader)
+            if status != 200:
+                raise ProxyCheckError(f"CONNECT status {status}")
+            await writer.start_tls(ssl_context, server_hostname=url.hostname)
+            request = f"GET {path} HTTP/1.1\r\n"
+        else:
+            request = f"GET {target} HTTP/1.1\r\n{headers}"
+        writer.write(
+            (
+                f"{request}Host: {url.netloc}\r\nUser-Agent: proxy_test\r\n"
+                "Accept: */*\r\nConnection: close\r\n\r\n"
+            ).encode()
         )
-        return response.status_code == 200
-    except:
-        return False
+        status = await read_status(reader)
+        await reader.read()
+        if status != 200:
+            raise ProxyCheckError(f"status {status}")
+        return connect, time.perf_counter() - start
+    finally:
+        writer.close()
 
 
-with open("proxies.txt", encoding="utf-8") as file:
-    for line in file:
-        proxy = line.rstrip().split(":")
-        if len(proxy) == 4:
-            ip, port, login, password = proxy
-            proxy_url = f"http://{login}:{password}@{ip}:{port}"
+async def check_proxy(
+    check: ProxyCheck,
+    target: str,
+    attempts: int,
+    timeout: float,
+    limit: asyncio.Semaphore,
+    ssl_context,
+) -> ProxyCheck:
+    for _ in range(attempts):
+        check.attempts += 1
+        try:
+            async with limit:
+                connect, total = await asyncio.wait_for(
+                    probe(check.proxy_url, target, ssl_context), timeout
+                )
+        except asyncio.TimeoutError:
+            check.error = "timeout"
+        except (OSError, ssl.SSLError, ProxyCheckError) as e:
+            check.error = str(e) or type(e).__name__
         else:
-            ip, port = proxy
-            proxy_url = f"http://{ip}:{port}"
-        if test_proxy(proxy_url):
-            print(f"Working proxy: {proxy_url}")
+            check.connect_times.append(connect)
+            check.total_times.append(total)
+    return check
+
+
+async def check_all(
+    proxies: list[tuple[str, str]],
+    target: str,
+    attempts: int = 3,
+    timeout: float = 10.0,
+    concurrency: int = 256,
+    verify: bool = True,
+) -> list[ProxyCheck]:
+    """Проверяет все прокси одновременно и возвращает их по рейтингу"""
+    limit = asyncio.Semaphore(concurrency)
+    ssl_context = ssl.create_default_context()
+    if not verify:
+        ssl_context.check_hostname = False
+        ssl_context.verify_mode = ssl.CERT_NONE
+    checks = await asyncio.gather(
+        *(
+            check_proxy(
+                ProxyCheck(entry, proxy_url),
+                target,
+                attempts,
+                timeout,
+                limit,
+                ssl_context,
+            )
+            for entry, proxy_url in proxies
+        )
+    )
+    return sorted(checks, key=ProxyCheck.rank)
+
+
+def write_proxies(filename: str, checks: list[ProxyCheck], target: str):
+    """Атомарно записывает прокси по рейтингу с задержками в комментариях"""
+    tmp_filename = filename + ".tmp"
+    with open(tmp_filename, "w", encoding="utf-8") as file:
+        file.write(f"# Проверено {datetime.now():%Y-%m-%d %H:%M:%S} через {target}\n")
+        for check in checks:
+            file.write(check.annotated() + "\n")
+    os.replace(tmp_filename, filename)
+
+
+if __name__ == "__main__":
+    argparser = argparse.ArgumentParser(
+        description="Проверяет прокси и сортирует их по скорости"
+    )
+    argparser.add_argument("--input", default="proxies.txt")
+    argparser.add_argument(
+        "--output",
+        help="куда записать рейтинг, по умолчанию в файл --input; если не "
+        "работает ни один прокси, файл не перезаписывается",
+    )
+    argparser.add_argument(
+        "--target",
+        default="https://httpbin.org/ip",
+        help="адрес для проверки, например локальная копия сайта",
+    )
+    argparser.add_argument("--attempts", type=int, default=3)
+    argparser.add_argument("--timeout", type=float, default=10.0)
+    argparser.add_argument("--concurrency", type=int, default=256)
+    argparser.add_argument(
+        "--insecure", action="store_true", help="не проверять сертификат цели"
+    )
+    args = argparser.parse_args()
+
+    start = time.perf_counter()
+    checks = asyncio.run(
+        check_all(
+            read_proxies(args.input),
+            args.target,
+            args.attempts,
+            args.timeout,
+            args.concurrency,
+            not args.insecure,
+        )
+    )
+    for check in checks:
+        if check.successes:
+            print(
+                f"\033[92mWorking proxy: {check.address} latency {check.latency:.3f} s, "
+                f"connect {check.connect:.3f} s, "
+                f"ok {check.successes}/{check.attempts}\033[0m"
+            )
         else:
-            print(f"Not working: {proxy_url}")
+            print(f"\033[91mNot working: {check.address} ({check.error})\033[0m")
+    working = sum(1 for check in checks if check.successes)
+    print(
+        f"Рабочих прокси: {working} из {len(checks)}, "
+        f"проверка заняла {time.perf_counter() - start:.1f} с"
+    )
+    if not working:
+        # Скорее всего недоступна сеть или цель, а не все прокси сразу
+        print("\033[91mНи один прокси не работает, файл не изменен\033[0m")
+        sys.exit(1)
+    write_proxies(args.output or args.input, checks, args.target)